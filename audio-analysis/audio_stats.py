@@ -0,0 +1,168 @@
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# the mp3 decoder is loaded from the analyser's own modules
+sys.path.insert(0, str(Path(__file__).resolve().parent / "mp3_structureanalysis_src"))
+from decoder.ID3_Parser import ID3
+from decoder.MP3_Parser import MP3Parser
+from decoder.util import map_file
+
+# records (frames) decoded at once, about 1.2 M samples per channel
+MP3_WINDOW = 1024
+# samples per channel read at once from wav files
+WAV_BLOCK = 1 << 20
+# the decoder writes float samples, they have no integer bit depth (the Bit Depth column is N/A)
+MP3_BITS = None
+
+
+### ────────────────────── Block Readers ────────────────────── ###
+def iter_mp3(path):
+    """Float blocks (samples, channels) of an mp3 file, without bits per sample."""
+    file_data = map_file(path)
+    id3v2 = ID3(file_data, False, False)
+    for pcm in MP3Parser(file_data, id3v2.offset if id3v2.is_valid else 0).iter_pcm(window=MP3_WINDOW):
+        yield pcm, MP3_BITS
+
+
+def iter_wav(path):
+    """Float blocks (samples, channels) of a PCM wav file and the bits per sample."""
+    with wave.open(str(path), "rb") as wav:
+        width, channels = wav.getsampwidth(), wav.getnchannels()
+        while True:
+            data = wav.readframes(WAV_BLOCK)
+            if not data:
+                break
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, width)
+            if width == 1:
+                # 8 bit wav samples are unsigned
+                values = raw[:, 0].astype(np.int32) - 128
+            else:
+                # little endian, sign extended from the most significant byte
+                values = raw[:, -1].astype(np.int8).astype(np.int32)
+                for byte in range(width - 2, -1, -1):
+                    values = (values << 8) | raw[:, byte]
+            yield (values / float(1 << (8 * width - 1))).reshape(-1, channels), 8 * width
+
+
+PCM_READERS = {
+    ".mp3": iter_mp3,
+    ".wav": iter_wav,
+}
+
+
+### ────────────────────── Statistics ────────────────────── ###
+class AudioStats:
+    """
+    Running statistics of PCM blocks, like `sox <file> -n stats`. Every block is processed with vectorized operations,
+    only the last sample and the state of the runs at the peak levels are carried to the next block.
+
+    The flat factor is 20 * log10 of the average length of the runs of consecutive samples at the minimum or maximum
+    level (0 for a signal that never stays at its peak).
+    """
+
+    def __init__(self):
+        self.samples = 0
+        # bits per sample of integer PCM, None for the float samples of the decoder
+        self.bits = 0
+        self.total = None
+        self.squares = None
+        self.min = None
+        self.max = None
+        self.max_delta = 0.0
+        self.last = None
+        # OR of all samples as integers, the lowest set bit gives the bit depth in use
+        self.used_bits = 0
+        # per channel and level (min, max): samples at the level, runs at the level, last sample at the level
+        self.peak_count = None
+        self.peak_runs = None
+        self.at_peak = None
+
+    def update(self, block, bits):
+        block = np.asarray(block, dtype=np.float64)
+        if len(block) == 0:
+            return
+        channels = block.shape[1]
+        if self.total is None:
+            self.total, self.squares = np.zeros(channels), np.zeros(channels)
+            self.min, self.max = np.full(channels, np.inf), np.full(channels, -np.inf)
+            self.peak_count, self.peak_runs = np.zeros((2, channels), dtype=np.int64), np.zeros((2, channels), dtype=np.int64)
+            self.at_peak = np.zeros((2, channels), dtype=np.bool_)
+        self.samples += len(block)
+        self.total += block.sum(axis=0)
+        self.squares += (block ** 2).sum(axis=0)
+
+        previous = block[:1] if self.last is None else self.last[None]
+        delta = np.abs(np.diff(block, axis=0, prepend=previous))
+        self.max_delta = max(self.max_delta, float(delta.max()))
+        self.last = block[-1].copy()
+
+        if bits is None:
+            # decoded samples are floats, the bit depth is only measured for integer PCM
+            self.bits = None
+        elif self.bits is not None:
+            self.bits = max(self.bits, bits)
+            integers = np.abs(np.round(block * float(1 << (bits - 1)))).astype(np.int64)
+            self.used_bits |= int(np.bitwise_or.reduce(integers, axis=None))
+
+        for level, (extreme, current) in enumerate(((block.min(axis=0), self.min), (block.max(axis=0), self.max))):
+            beyond = extreme < current if level == 0 else extreme > current
+            # a new peak level: the runs at the old level do not count any more
+            self.peak_count[level][beyond], self.peak_runs[level][beyond] = 0, 0
+            self.at_peak[level][beyond] = False
+            current[beyond] = extreme[beyond]
+            equal = block == current
+            starts = equal & ~np.concatenate([self.at_peak[level][None], equal[:-1]])
+            self.peak_count[level] += equal.sum(axis=0)
+            self.peak_runs[level] += starts.sum(axis=0)
+            self.at_peak[level] = equal[-1]
+
+    def result(self):
+        """The statistics over all channels, the RMS level is also given per channel."""
+        if self.samples == 0:
+            return {}
+        rms_channels = np.sqrt(self.squares / self.samples)
+        rms = float(np.sqrt(self.squares.sum() / (self.samples * len(self.squares))))
+        peak = float(max(-self.min.min(), self.max.max()))
+        # runs at the peak level of the whole signal only
+        at_level = np.concatenate([-self.min == peak, self.max == peak])
+        runs = int(np.concatenate(self.peak_runs)[at_level].sum())
+        count = int(np.concatenate(self.peak_count)[at_level].sum())
+        trailing_zeros = (self.used_bits & -self.used_bits).bit_length() - 1 if self.used_bits else self.bits
+        return {
+            "DC Offset": round(float(self.total.sum() / (self.samples * len(self.total))), 6),
+            "Min Level": round(float(self.min.min()), 6),
+            "Max Level": round(float(self.max.max()), 6),
+            "Max Delta": round(self.max_delta, 6),
+            "Peak Level (dB)": decibel(peak),
+            "RMS Level (dB)": decibel(rms),
+            "RMS Level per Channel (dB)": [decibel(value) for value in rms_channels],
+            "Crest Factor": round(peak / rms, 2) if rms > 0 else "N/A",
+            # a silent signal has no peak to stay at
+            "Flat Factor": decibel(count / runs) if runs > 0 and peak > 0 else 0.0,
+            "Bit Depth": f"{self.bits - trailing_zeros}/{self.bits}" if self.bits is not None else "N/A",
+        }
+
+
+def decibel(value):
+    # silence is "-inf" as text, an infinite float is not valid JSON
+    # + 0.0 turns the -0.0 of full scale into 0.0
+    return round(float(20 * np.log10(value)), 2) + 0.0 if value > 0 else "-inf"
+
+
+STATS_COLUMNS = ["DC Offset", "Min Level", "Max Level", "Max Delta", "Peak Level (dB)", "RMS Level (dB)",
+                 "RMS Level per Channel (dB)", "Crest Factor", "Flat Factor", "Bit Depth"]
+
+
+def compute_stats(filepath):
+    """The statistics of an mp3 or wav file in one pass over its decoded blocks, N/A for other formats."""
+    reader = PCM_READERS.get(Path(filepath).suffix.lower())
+    if reader is None:
+        return {column: "N/A" for column in STATS_COLUMNS}
+    stats = AudioStats()
+    for block, bits in reader(filepath):
+        stats.update(block, bits)
+    result = stats.result()
+    return {column: result.get(column, "N/A") for column in STATS_COLUMNS}
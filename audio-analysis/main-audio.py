@@ -1,63 +1,85 @@
 import argparse
+import asyncio
+import concurrent.futures
+import contextlib
 import csv
-import glob
 import hashlib
-import http.server
 import json
 import os
-import socketserver
 import subprocess
 import sys
-import threading
-import webbrowser
+from pathlib import Path
 from tabulate import tabulate
 
+from audio_stats import STATS_COLUMNS, compute_stats
+from result_cache import DEFAULT_CACHE_FILE, ResultCache, file_identity
+
+# the file discovery and the report server are shared with the png analyzer
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from discovery import add_discovery_arguments, discover_from_args
+from report_server import serve_report
+
+# the in-process mp3 probe is loaded from the analyser's own modules
+sys.path.insert(0, str(Path(__file__).resolve().parent / "mp3_structureanalysis_src"))
+from decoder.MP3_Probe import probe_mp3
+from decoder.util import map_file
+
+# probed in-process, all other formats (and files without MPEG audio frames) are probed by ffprobe
+MP3_EXTENSIONS = {".mp3", ".mp2", ".mpga"}
+# digests that can be computed for every file and their result columns, all in one pass over the file
+DIGEST_COLUMNS = {"sha256": "SHA256", "md5": "MD5", "sha1": "SHA1", "blake2b": "BLAKE2b"}
+DEFAULT_DIGESTS = ["sha256"]
+# bytes fed to the digests at once, hashlib releases the GIL while hashing large buffers
+HASH_BLOCK = 1 << 20
+# version of the result columns, has to be increased with every change of the analysis (invalidates cached results)
+RESULT_VERSION = 1
+# results per worker that may be held back while an earlier file is still analyzed (--jobs)
+REORDER_WINDOW = 4
+# file signatures accepted by --magic: (offset, bytes); MPEG audio frames start with a sync word
+AUDIO_SIGNATURES = [(0, b"ID3"), (0, b"RIFF"), (0, b"fLaC"), (0, b"OggS"), (0, b"FORM"), (4, b"ftyp"), (0, b"\x30\x26\xb2\x75")] + \
+                   [(0, bytes([0xFF, second])) for second in range(0xE2, 0x100) if second & 0x06]
+
 
 ### ────────────────────── Argument Parsing ────────────────────── ###
 def parse_args():
-    parser = argparse.ArgumentParser(description="Audio forensic analyzer using ffprobe.")
-    parser.add_argument("files", nargs="+", help="Paths to one or more audio files (supports wildcards)")
+    parser = argparse.ArgumentParser(description="Audio forensic analyzer (in-process probe for MP3, ffprobe for other formats).")
+    parser.add_argument("files", nargs="*", help="Paths to audio files or directories (supports wildcards)")
+    add_discovery_arguments(parser)
 
     output_group = parser.add_mutually_exclusive_group()
     output_group.add_argument("--json", action="store_true", help="Output as JSON")
     output_group.add_argument("--csv", action="store_true", help="Output as CSV")
     output_group.add_argument("--pretty", action="store_true", help="Pretty printed table view")
     output_group.add_argument("--serve", action="store_true", help="Serve HTML report via localhost (default)")
+    parser.add_argument("--stream", action="store_true", help="Write every result as soon as it is ready (--json as NDJSON, --csv row by row) with a fixed set of columns")
+    parser.add_argument("--stats", action="store_true", help="Add sox-like statistics (decodes every file, about 10x slower than probing)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of files analyzed concurrently (default: 1, serial)")
+    parser.add_argument("--digests", default=",".join(DEFAULT_DIGESTS),
+                        help=f"Comma separated digests computed in one pass over each file ({', '.join(DIGEST_COLUMNS)}; default: %(default)s)")
+
+    parser.add_argument("--cache", action="store_true", help="Reuse the results of unchanged files from earlier runs (and store the new ones)")
+    parser.add_argument("--cache-file", default=str(DEFAULT_CACHE_FILE), help="SQLite file of the result cache (default: %(default)s)")
+    parser.add_argument("--refresh", action="store_true", help="Analyze every file again and replace its cached result (implies --cache)")
 
     args = parser.parse_args()
-    expanded_files = []
-    for pattern in args.files:
-        expanded_files.extend(glob.glob(pattern))
-    args.files = expanded_files
+    args.digests = [name.strip().lower() for name in args.digests.split(",") if name.strip()]
+    unknown = [name for name in args.digests if name not in DIGEST_COLUMNS]
+    if unknown:
+        parser.error(f"unknown digest: {', '.join(unknown)}")
+    if args.stream and not (args.json or args.csv):
+        parser.error("--stream requires --json or --csv")
+    args.files = discover_from_args(parser, args, AUDIO_SIGNATURES)
     return args
 
 
 ### ────────────────────── Core File Analyzer ────────────────────── ###
-def analyze_file(filepath):
+def analyze_file(filepath, stats=False, digests=DEFAULT_DIGESTS):
     result = {"File": filepath}
     try:
-        ffprobe_data = run_ffprobe(filepath)
-        stream = ffprobe_data["streams"][0]
-        fmt = ffprobe_data["format"]
-
-        duration = float(fmt.get("duration", 0))
-        sample_rate = int(stream.get("sample_rate", 0))
-        num_samples = int(duration * sample_rate) if duration and sample_rate else "N/A"
-
-        result.update({
-            "Size": format_filesize(os.path.getsize(filepath)),
-            "Duration (s)": duration,
-            "Number of Samples": num_samples,
-            "Format": fmt.get("format_long_name", "Unknown"),
-            "Channels": stream.get("channels", "Unknown"),
-            "SHA256": compute_sha256(filepath),
-            "Bit Rate": fmt.get("bit_rate", "Unknown"),
-            "Writing Library": fmt.get("tags", {}).get("encoder", "Unknown"),
-            "Channel Layout": stream.get("channel_layout", "Unknown"),
-            #"Codec": stream.get("codec_long_name", "Unknown"),
-            #"Sample Rate": sample_rate,
-            
-        })
+        ffprobe_data = probe_file(filepath)
+        result.update(describe(filepath, ffprobe_data, compute_digests(filepath, digests)))
+        if stats:
+            result.update(compute_stats(filepath))
 
     except Exception as e:
         result["Error"] = str(e)
@@ -65,8 +87,49 @@ def analyze_file(filepath):
     return result
 
 
-def run_ffprobe(filepath):
-    cmd = [
+def describe(filepath, ffprobe_data, digests):
+    stream = ffprobe_data["streams"][0]
+    fmt = ffprobe_data["format"]
+
+    duration = float(fmt.get("duration", 0))
+    sample_rate = int(stream.get("sample_rate", 0))
+    num_samples = int(duration * sample_rate) if duration and sample_rate else "N/A"
+
+    return {
+        "Size": format_filesize(os.path.getsize(filepath)),
+        "Duration (s)": duration,
+        "Number of Samples": num_samples,
+        "Format": fmt.get("format_long_name", "Unknown"),
+        "Channels": stream.get("channels", "Unknown"),
+        **{DIGEST_COLUMNS[name]: value for name, value in digests.items()},
+        "Bit Rate": fmt.get("bit_rate", "Unknown"),
+        "Writing Library": fmt.get("tags", {}).get("encoder", "Unknown"),
+        "Channel Layout": stream.get("channel_layout", "Unknown"),
+        #"Codec": stream.get("codec_long_name", "Unknown"),
+        #"Sample Rate": sample_rate,
+    }
+
+
+def result_columns(stats=False, digests=DEFAULT_DIGESTS):
+    # every column a result can hold, in the order of analyze_file (the schema of the streamed output)
+    columns = ["File", "Size", "Duration (s)", "Number of Samples", "Format", "Channels"]
+    columns += [DIGEST_COLUMNS[name] for name in digests]
+    columns += ["Bit Rate", "Writing Library", "Channel Layout"]
+    if stats:
+        columns += STATS_COLUMNS
+    return columns + ["Error"]
+
+
+def probe_file(filepath):
+    if Path(filepath).suffix.lower() in MP3_EXTENSIONS:
+        probe = probe_mp3(map_file(filepath))
+        if probe is not None:
+            return probe
+    return run_ffprobe(filepath)
+
+
+def ffprobe_command(filepath):
+    return [
         "ffprobe", "-v", "error", "-select_streams", "a:0",
         "-show_entries",
         "format=filename,format_name,format_long_name,duration,size,bit_rate,format_tags=encoder,"
@@ -74,22 +137,167 @@ def run_ffprobe(filepath):
         "-show_streams",
         "-of", "json", filepath
     ]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def run_ffprobe(filepath):
+    result = subprocess.run(ffprobe_command(filepath), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     return json.loads(result.stdout)
 
 
-def compute_sha256(filepath):
-    sha256_hash = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(block)
-    return sha256_hash.hexdigest()
+def compute_digests(filepath, digests=DEFAULT_DIGESTS):
+    # the file is mapped once (shared with the probe through the page cache), every block updates all digests
+    hashes = {name: hashlib.new(name) for name in digests}
+    data = map_file(filepath)
+    for start in range(0, len(data), HASH_BLOCK):
+        block = data[start:start + HASH_BLOCK]
+        for h in hashes.values():
+            h.update(block)
+    return {name: h.hexdigest() for name, h in hashes.items()}
 
 
 def format_filesize(size_bytes):
     return f"{size_bytes} bytes ({round(size_bytes / 1024, 1)} KB)"
 
 
+### ────────────────────── Concurrent Execution ────────────────────── ###
+async def analyze_file_async(filepath, stats, digests, executor):
+    # same result as analyze_file: ffprobe runs as asyncio subprocess, probing, hashing and statistics in the pool
+    loop = asyncio.get_running_loop()
+    result = {"File": filepath}
+    try:
+        ffprobe_data = None
+        if Path(filepath).suffix.lower() in MP3_EXTENSIONS:
+            ffprobe_data = await loop.run_in_executor(executor, lambda: probe_mp3(map_file(filepath)))
+        if ffprobe_data is None:
+            ffprobe_data = await run_ffprobe_async(filepath)
+        hashes = await loop.run_in_executor(executor, compute_digests, filepath, digests)
+        result.update(describe(filepath, ffprobe_data, hashes))
+        if stats:
+            result.update(await loop.run_in_executor(executor, compute_stats, filepath))
+
+    except Exception as e:
+        result["Error"] = str(e)
+
+    return result
+
+
+async def run_ffprobe_async(filepath):
+    process = await asyncio.create_subprocess_exec(*ffprobe_command(filepath), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    stdout, _ = await process.communicate()
+    return json.loads(stdout.decode())
+
+
+async def analyze_files_async(filepaths, stats, digests, jobs, cache):
+    # a fixed number of workers takes the next path, at most jobs files are in flight; results are yielded in the input
+    # order, the workers pause while REORDER_WINDOW * jobs results wait for a slower file
+    pending = enumerate(filepaths)
+    finished = {}
+    ready = asyncio.Condition()
+    window = asyncio.Semaphore(REORDER_WINDOW * jobs)
+
+    async def worker():
+        try:
+            while True:
+                await window.acquire()
+                item = next(pending, None)
+                if item is None:
+                    break
+                i, path = item
+                try:
+                    identity, result = cache_lookup(cache, path)
+                    if result is None:
+                        result = await analyze_file_async(path, stats, digests, executor)
+                        cache_store(cache, identity, result)
+                except Exception as e:
+                    # raised in the input order, the results of the earlier files are yielded first
+                    result = e
+                async with ready:
+                    finished[i] = result
+                    ready.notify_all()
+        finally:
+            async with ready:
+                ready.notify_all()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        workers = [asyncio.create_task(worker()) for _ in range(jobs)]
+        try:
+            index = 0
+            while True:
+                async with ready:
+                    # a worker failing outside a file (e.g. the discovery) would leave the others waiting forever
+                    await ready.wait_for(lambda: index in finished or any(failed(w) for w in workers)
+                                         or all(w.done() for w in workers))
+                if index not in finished:
+                    for w in workers:
+                        if failed(w):
+                            raise w.exception()
+                    break
+                result = finished.pop(index)
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+                window.release()
+                index += 1
+        finally:
+            for w in workers:
+                w.cancel()
+
+
+def failed(task):
+    return task.done() and not task.cancelled() and task.exception() is not None
+
+
+def analyze_files(filepaths, stats=False, digests=DEFAULT_DIGESTS, jobs=1, cache=None):
+    # generator of the results in the order of filepaths, which can be a lazy iterable (see discovery.discover)
+    if jobs > 1:
+        yield from iter_async(analyze_files_async(filepaths, stats, digests, jobs, cache))
+        return
+    for path in filepaths:
+        identity, result = cache_lookup(cache, path)
+        if result is None:
+            result = analyze_file(path, stats=stats, digests=digests)
+            cache_store(cache, identity, result)
+        yield result
+
+
+def iter_async(generator):
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(generator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(generator.aclose())
+        loop.close()
+
+
+### ────────────────────── Result Cache ────────────────────── ###
+def open_cache(args):
+    if not (args.cache or args.refresh):
+        return None
+    options = {"version": RESULT_VERSION, "stats": args.stats, "digests": args.digests}
+    return ResultCache(args.cache_file, options, refresh=args.refresh)
+
+
+def cache_lookup(cache, filepath):
+    # the identity is taken before the analysis, a file that changes meanwhile is analyzed again by the next run
+    if cache is None:
+        return None, None
+    try:
+        identity = file_identity(filepath)
+    except OSError:
+        # the analysis reports the error
+        return None, None
+    return identity, cache.get(filepath, identity)
+
+
+def cache_store(cache, identity, result):
+    if cache is not None and identity is not None:
+        cache.put(identity, result)
+
+
 ### ────────────────────── Output Formatters ────────────────────── ###
 def get_all_keys(results):
     seen, keys = set(), []
@@ -113,6 +321,20 @@ def output_csv(results):
         writer.writerow({k: row.get(k, "") for k in headers})
 
 
+def stream_ndjson(results, columns, output):
+    for row in results:
+        output.write(json.dumps({k: row.get(k) for k in columns}) + "\n")
+        output.flush()
+
+
+def stream_csv(results, columns, output):
+    writer = csv.DictWriter(output, fieldnames=columns)
+    writer.writeheader()
+    for row in results:
+        writer.writerow({k: row.get(k, "") for k in columns})
+        output.flush()
+
+
 def output_pretty(results):
     headers = get_all_keys(results)
     rows = [[r.get(k, "") for k in headers] for r in results]
@@ -120,70 +342,28 @@ def output_pretty(results):
 
 
 def serve_html(results, port=8000):
-    headers = get_all_keys(results)
-
-    def escape(val):
-        return str(val).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-    html = [
-        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
-        "<style>",
-        "body { font-family: sans-serif; padding: 1em; margin: 0; }",
-        ".scroll-wrap { overflow-x: auto; padding-bottom: 0.5em; }",
-        "table { border-collapse: collapse; width: max-content; min-width: 100%; }",
-        "th, td { border: 1px solid #ccc; padding: 6px; font-family: monospace; white-space: nowrap; }",
-        "td:hover { background: #eef; cursor: pointer; }",
-        "</style>",
-        "<script>",
-        "function copyText(e) {",
-        "  const text = e.target.innerText;",
-        "  navigator.clipboard.writeText(text);",
-        "  e.target.style.backgroundColor = '#cfc';",
-        "  setTimeout(() => e.target.style.backgroundColor = '', 300);",
-        "}",
-        "</script></head><body>",
-        "<h2>Audio Analysis Report</h2>",
-        "<div class='scroll-wrap'><table><thead><tr>",
-    ]
-
-    html.extend(f"<th>{escape(k)}</th>" for k in headers)
-    html.append("</tr></thead><tbody>")
-    for row in results:
-        html.append("<tr>")
-        html.extend(f"<td onclick='copyText(event)'>{escape(row.get(k, ''))}</td>" for k in headers)
-        html.append("</tr>")
-    html.extend(["</tbody></table></div></body></html>"])
-    content = "\n".join(html).encode("utf-8")
-
-    class ReportHandler(http.server.SimpleHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.send_header("Content-type", "text/html; charset=utf-8")
-            self.send_header("Content-length", str(len(content)))
-            self.end_headers()
-            self.wfile.write(content)
-
-        def log_message(self, *args):
-            pass  # Suppress logging
-
-    try:
-        with socketserver.TCPServer(("", port), ReportHandler) as httpd:
-            url = f"http://localhost:{port}"
-            print(f"[✓] Serving report at {url} (Press Ctrl+C to stop)")
-            threading.Timer(1, lambda: webbrowser.open(url)).start()
-            try:
-                httpd.serve_forever()
-            except KeyboardInterrupt:
-                print("\n[✓] Server stopped cleanly.")
-    except OSError:
-        print(f"[!] Port {port} is in use. Try a different one.")
+    serve_report(results, "Audio Analysis Report", port)
 
 
 ### ─────────────────────────── Main ─────────────────────────── ###
 def main():
     args = parse_args()
-    results = [analyze_file(path) for path in args.files]
-
+    cache = open_cache(args)
+    results = analyze_files(args.files, stats=args.stats, digests=args.digests, jobs=args.jobs, cache=cache)
+    # JSON and CSV on stdout stay parseable: the messages of the mp3 parser go to stderr during the analysis
+    output = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr if args.json or args.csv else output):
+        if args.stream:
+            columns = result_columns(stats=args.stats, digests=args.digests)
+            (stream_ndjson if args.json else stream_csv)(results, columns, output)
+        else:
+            results = list(results)
+    if cache is not None:
+        cache.close()
+        print(cache.summary(), file=sys.stderr)
+
+    if args.stream:
+        return
     if args.json:
         output_json(results)
     elif args.csv:
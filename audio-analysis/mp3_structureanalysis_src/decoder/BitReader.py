@@ -0,0 +1,115 @@
+BYTE_LENGTH = 8
+# number of bytes loaded into the cache of the reader at once
+CACHE_SIZE = 32
+
+
+class BitReader:
+    """
+    Stateful MSB-first bit reader over a byte buffer. The buffer is never copied, reads past the end are padded with
+    zero bits (the same behaviour as util.get_bits).
+
+    :param buffer: buffer of bytes (bytes, bytearray, memoryview, mmap or a list of ints)
+    :param start: byte offset of the first bit to read
+    :type start: int
+    """
+
+    def __init__(self, buffer, start: int = 0):
+        self.__buffer = buffer
+        self.__length: int = len(buffer)
+        self.__position: int = start * BYTE_LENGTH
+        # bits [cache_start, cache_end) of the buffer as one integer, refilled on demand
+        self.__cache: int = 0
+        self.__cache_start: int = 0
+        self.__cache_end: int = 0
+
+    def __fill(self, count: int):
+        """
+        Load the bytes around the cursor into the cache, at least count bits.
+        """
+        start_byte = self.__position >> 3
+        end_byte = max(start_byte + CACHE_SIZE, (self.__position + count + 7) >> 3)
+        chunk = int.from_bytes(self.__buffer[start_byte:min(end_byte, self.__length)], byteorder="big")
+        if end_byte > self.__length:
+            # pad with zeros
+            chunk <<= BYTE_LENGTH * (end_byte - max(start_byte, self.__length))
+        self.__cache = chunk
+        self.__cache_start = start_byte << 3
+        self.__cache_end = end_byte << 3
+
+    def read_bits(self, count: int) -> int:
+        """
+        Read count bits and advance the cursor.
+
+        :param count: number of bits to read
+        :type count: int
+
+        :return: the bits as unsigned integer
+        :rtype: int
+        """
+        end = self.__position + count
+        if self.__position < self.__cache_start or end > self.__cache_end:
+            self.__fill(count)
+        self.__position = end
+        return (self.__cache >> (self.__cache_end - end)) & ((1 << count) - 1)
+
+    def peek_bits(self, count: int) -> int:
+        """
+        Read count bits without advancing the cursor.
+
+        :param count: number of bits to read
+        :type count: int
+
+        :return: the bits as unsigned integer
+        :rtype: int
+        """
+        end = self.__position + count
+        if self.__position < self.__cache_start or end > self.__cache_end:
+            self.__fill(count)
+        return (self.__cache >> (self.__cache_end - end)) & ((1 << count) - 1)
+
+    def read_flag(self) -> bool:
+        """
+        :return: the next bit as boolean
+        :rtype: bool
+        """
+        return self.read_bits(1) == 1
+
+    def skip_bits(self, count: int):
+        """
+        Advance the cursor by count bits.
+
+        :param count: number of bits to skip
+        :type count: int
+        """
+        self.__position += count
+
+    def align(self):
+        """
+        Advance the cursor to the next byte boundary.
+        """
+        self.__position = (self.__position + 7) & ~7
+
+    def seek(self, bit_position: int):
+        """
+        Move the cursor to an absolute bit position.
+
+        :param bit_position: the bit position, relative to the beginning of the buffer
+        :type bit_position: int
+        """
+        self.__position = bit_position
+
+    @property
+    def position(self) -> int:
+        return self.__position
+
+    @property
+    def byte_position(self) -> int:
+        return self.__position >> 3
+
+    @property
+    def bits_left(self) -> int:
+        return self.__length * BYTE_LENGTH - self.__position
+
+    @property
+    def buffer(self):
+        return self.__buffer
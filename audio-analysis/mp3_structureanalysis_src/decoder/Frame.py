@@ -1,10 +1,13 @@
 import numpy as np
 
 from decoder.FrameHeader import *
+from decoder.BitReader import BitReader
 from decoder.FrameSideInformation import FrameSideInformation
 
 NUM_PREV_FRAMES = 9
 NUM_OF_SAMPLES = 576
+# initial number of frames of the huffman table selections, doubled when full
+HUFFMAN_TABLES_CAPACITY = 1024
 
 SQRT2 = math.sqrt(2)
 PI = math.pi
@@ -17,22 +20,24 @@ class Frame:
     def __init__(self):
         # Declarations
         self.__pcm: np.ndarray = np.array([])
-        self.__buffer: list = []
+        self.__buffer: memoryview = memoryview(b"")
         self.__prev_frame_size: np.ndarray = np.zeros(NUM_PREV_FRAMES)
         self.__frame_size: int = 0
         self.__side_info: FrameSideInformation = FrameSideInformation()
         self.__header: FrameHeader = FrameHeader()
         self.__samples_per_frame = 0
-        self.all_huffman_tables: list = []
+        # table selections of every frame initialised so far, indexed [frame][channel][granule][region]
+        self.__huffman_tables: np.ndarray = np.zeros((HUFFMAN_TABLES_CAPACITY, 2, 2, 3), dtype=np.uint8)
+        self.__num_of_huffman_tables: int = 0
 
-    def init_frame_params(self, buffer: list, file_data: list, curr_offset: int):
+    def init_frame_params(self, buffer: memoryview, file_data: memoryview, curr_offset: int):
         """
         Init the mp3 frame.
 
         :param buffer: buffer that contains the bytes of the mp3 frame.
-        :type buffer: list
+        :type buffer: memoryview
         :param file_data: buffer that contains the bytes of the mp3 file.
-        :type file_data: list
+        :type file_data: memoryview
         :param curr_offset: the offset of the file_data to the beginning of the frame.
         :type curr_offset: int
         """
@@ -41,10 +46,9 @@ class Frame:
         self.__pcm = np.zeros((2 * NUM_OF_SAMPLES, self.__header.channels))
 
         starting_side_info_idx = 6 if self.__header.crc == 0 else 4
-        #PERF_OVERHAUL: added 32 as limit to speed up performance!
-        self.__side_info.set_side_info(self.__buffer[starting_side_info_idx:starting_side_info_idx+32], self.__header)
+        self.__side_info.set_side_info(BitReader(self.__buffer, starting_side_info_idx), self.__header.channel_mode)
 
-        self.all_huffman_tables.append(self.__get_frame_huffman_tables())
+        self.__store_frame_huffman_tables()
 
     def set_frame_size(self):
         """
@@ -120,13 +124,30 @@ class Frame:
     def get_bitrate(self):
         return self.__header.bit_rate
 
-    def __get_frame_huffman_tables(self):
+    def clear_huffman_tables(self):
         """
-        :return: list that contains all the huffman tables used in that frame
+        Forget the huffman table selections of all frames initialised so far.
         """
-        tmp = []
-        for ch in range(self.__header.channels):
-            for gr in range(2):
-                for region in range(3):
-                    tmp.append(int(self.__side_info.table_select[gr][ch][region]))
-        return tmp
+        self.__num_of_huffman_tables = 0
+
+    @property
+    def all_huffman_tables(self) -> np.ndarray:
+        """
+        :return: the huffman tables used in every frame initialised so far, indexed [frame][channel][granule][region]
+         (zero for channels not present in a frame), see decoder.util.bits_from_table_select
+        :rtype: np.ndarray
+        """
+        return self.__huffman_tables[:self.__num_of_huffman_tables]
+
+    def __store_frame_huffman_tables(self):
+        """
+        Store the huffman tables used in that frame.
+        """
+        if self.__num_of_huffman_tables == len(self.__huffman_tables):
+            self.__huffman_tables = np.concatenate([self.__huffman_tables, np.zeros_like(self.__huffman_tables)])
+        tables = self.__huffman_tables[self.__num_of_huffman_tables]
+        tables[:] = 0
+        channels = self.__header.channels
+        # the side info is indexed [granule][channel][region]
+        tables[:channels] = np.swapaxes(self.__side_info.table_select[:, :channels], 0, 1)
+        self.__num_of_huffman_tables += 1
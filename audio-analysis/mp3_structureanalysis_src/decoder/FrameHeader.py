@@ -38,7 +38,7 @@ class FrameHeader:
 
     def __init__(self):
         # Declarations
-        self.__buffer: list = []
+        self.__buffer: memoryview = memoryview(b"")
         self.__mpeg_version: float = 0.0
         self.__layer: int = 0
         self.__crc: bool = False
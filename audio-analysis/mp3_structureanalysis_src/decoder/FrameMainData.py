@@ -0,0 +1,361 @@
+from decoder.FrameHeader import *
+from decoder.FrameScanner import HEADER_SIZE
+from decoder.tables import band_index_table, big_value_linbit, big_value_max, big_value_table, quad_table_1
+
+#http://www.mp3-tech.org/programmer/docs/mp3_theory.pdf s. 21
+
+NUM_OF_LINES = 576
+# main_data_begin has 9 bits, the bit reservoir reaches back at most 511 bytes
+MAX_MAIN_DATA_BEGIN = 511
+# bits of a lookup entry: code length | x << 8 | y << 16 (big values) or | vwxy << 8 (count1)
+ENTRY_LENGTH_MASK = 0xff
+# zero bytes behind the main data, the bit windows read up to 8 bytes ahead
+WINDOW_PADDING = 8
+ALL_BITS = np.uint64(0xffffffffffffffff)
+
+# Quantized spectrum of a frame, the granule fields are indexed [granule][channel] like SIDE_INFO_DTYPE.
+SPECTRUM_DTYPE = np.dtype([
+    ("complete", np.bool_),  # main data and bit reservoir of the frame are available
+    ("part2_length", np.uint16, (2, 2)),
+    ("scale_fac_l", np.uint8, (2, 2, 22)),
+    ("scale_fac_s", np.uint8, (2, 2, 3, 13)),  # [granule][channel][window][sfb]
+    ("nonzero", np.uint16, (2, 2)),  # number of lines in front of the zero region
+    ("quantized", np.int16, (2, 2, NUM_OF_LINES)),
+])
+
+# scale factor bands of the sampling rates 44100, 48000 and 32000 Hz (MPEG-1)
+SAMPLING_RATES = np.array([44100, 48000, 32000])
+BAND_INDEX_LONG = np.array([band_index_table.long_44, band_index_table.long_48, band_index_table.long_32], dtype=np.int64)
+BAND_INDEX_SHORT = np.array([band_index_table.short_44, band_index_table.short_48, band_index_table.short_32], dtype=np.int64)
+
+
+def sampling_rate_index(sampling_rate: np.ndarray) -> np.ndarray:
+    """
+    :param sampling_rate: sampling rates of MPEG-1 frames in Hz
+    :type sampling_rate: np.ndarray
+
+    :return: index into SAMPLING_RATES, BAND_INDEX_LONG and BAND_INDEX_SHORT
+    :rtype: np.ndarray
+    """
+    return np.argmax(np.asarray(sampling_rate)[:, None] == SAMPLING_RATES, axis=1)
+
+
+def _build_big_value_lookup() -> tuple:
+    """
+    Unpack the code tables of decoder.tables into one flat lookup array. The entry of a table is found by peeking
+    width bits: lookup[base + peek], every code fills all entries that start with it.
+
+    :return: lookup array, base and width of every table number
+    :rtype: tuple
+    """
+    bases = np.zeros(len(big_value_table), dtype=np.int64)
+    widths = np.ones(len(big_value_table), dtype=np.int64)
+    chunks = [np.zeros(2, dtype=np.int32)]  # table 0 (and the unused tables 4 and 14): no bits, values zero
+    size = 2
+    unpacked = {}
+    for t, table in enumerate(big_value_table):
+        if big_value_max[t] == 0 or len(table) <= 2:
+            continue
+        if id(table) not in unpacked:
+            width = max(table[1::2])
+            lookup = np.zeros(1 << width, dtype=np.int32)
+            for i in range(len(table) // 2):
+                code, length = table[2 * i], table[2 * i + 1]
+                start = (code >> (32 - length)) << (width - length)
+                lookup[start:start + (1 << (width - length))] = length | (i // big_value_max[t]) << 8 | (i % big_value_max[t]) << 16
+            unpacked[id(table)] = (size, width)
+            chunks.append(lookup)
+            size += len(lookup)
+        bases[t], widths[t] = unpacked[id(table)]
+    return np.concatenate(chunks), bases, widths
+
+
+def _build_quad_lookup() -> np.ndarray:
+    """
+    :return: 6 bit lookup of count1 table A, table B is the inverted 4 bit value
+    :rtype: np.ndarray
+    """
+    lookup = np.zeros(1 << 6, dtype=np.int32)
+    for value, (code, length) in enumerate(zip(quad_table_1.h_cod, quad_table_1.h_len)):
+        start = (code >> (32 - length)) << (6 - length)
+        lookup[start:start + (1 << (6 - length))] = length | value << 8
+    return lookup
+
+
+BIG_VALUE_LOOKUP, BIG_VALUE_BASE, BIG_VALUE_WIDTH = _build_big_value_lookup()
+BIG_VALUE_LINBITS = np.array(big_value_linbit, dtype=np.int64)
+QUAD_LOOKUP = _build_quad_lookup()
+
+
+def _build_scale_factor_layouts() -> tuple:
+    """
+    Order of the scale factors in part2 for long, short and mixed blocks (MPEG-1). Every slot is described by
+    (short, sfb, window, slen2, scfsi band), padded with empty slots (sfb -1).
+
+    :return: int array of shape (3, slots, 5)
+    :rtype: np.ndarray
+    """
+    long_slots = [(0, sfb, 0, sfb >= 11, 0 if sfb < 6 else 1 if sfb < 11 else 2 if sfb < 16 else 3) for sfb in range(21)]
+    short_slots = [(1, sfb, window, sfb >= 6, -1) for sfb in range(12) for window in range(3)]
+    mixed_slots = [(0, sfb, 0, False, -1) for sfb in range(8)] + [(1, sfb, window, sfb >= 6, -1) for sfb in range(3, 12) for window in range(3)]
+    slots = max(len(long_slots), len(short_slots), len(mixed_slots))
+    layouts = np.full((3, slots, 5), -1, dtype=np.int64)
+    for i, layout in enumerate((long_slots, short_slots, mixed_slots)):
+        layouts[i, :len(layout)] = layout
+    return layouts
+
+
+SCALE_FACTOR_LAYOUTS = _build_scale_factor_layouts()
+
+
+def _words(data: np.ndarray) -> np.ndarray:
+    """
+    :param data: uint8 array, padded with WINDOW_PADDING zero bytes
+
+    :return: the 8 bytes starting at every byte position as big endian uint64
+    :rtype: np.ndarray
+    """
+    n = len(data) - WINDOW_PADDING
+    words = np.zeros(n, dtype=np.uint64)
+    for k in range(8):
+        words |= data[k:k + n].astype(np.uint64) << np.uint64(56 - 8 * k)
+    return words
+
+
+def _window(words: np.ndarray, bit_positions: np.ndarray, ends: np.ndarray = None) -> np.ndarray:
+    """
+    :param ends: optional bit position of every window from which on all bits are read as zero
+
+    :return: at least 57 bits starting at every bit position, aligned to the most significant bit
+    :rtype: np.ndarray
+    """
+    window = words[np.minimum(bit_positions >> 3, len(words) - 1)] << (bit_positions & 7).astype(np.uint64)
+    if ends is not None:
+        # a corrupt granule never reads the bits of the following granules
+        remaining = np.clip(ends - bit_positions, 0, 64)
+        window &= np.where(remaining == 64, ALL_BITS, ~(ALL_BITS >> np.minimum(remaining, 63).astype(np.uint64)))
+    return window
+
+
+def _field(window: np.ndarray, offset: np.ndarray, width: np.ndarray) -> np.ndarray:
+    """
+    :return: the unsigned value of width bits at offset of every window, 0 for width 0
+    :rtype: np.ndarray
+    """
+    value = (window << np.asarray(offset, dtype=np.uint64)) >> np.asarray(64 - np.maximum(width, 1), dtype=np.uint64)
+    return np.where(np.asarray(width) > 0, value, np.uint64(0)).astype(np.int64)
+
+
+def decode_scale_factors(words: np.ndarray, starts: np.ndarray, layouts: np.ndarray, slen1: np.ndarray,
+                         slen2: np.ndarray, reuse: np.ndarray) -> tuple:
+    """
+    Read the scale factors (part2) of many granules at once.
+
+    :param words: the main data, see _words
+    :type words: np.ndarray
+    :param starts: bit position of part2 of every granule
+    :type starts: np.ndarray
+    :param layouts: 0 for long, 1 for short and 2 for mixed blocks
+    :type layouts: np.ndarray
+    :param slen1: bits of the scale factors of the lower bands
+    :type slen1: np.ndarray
+    :param slen2: bits of the scale factors of the upper bands
+    :type slen2: np.ndarray
+    :param reuse: boolean array of shape (granules, 4), scale factors of the scfsi bands copied from the first granule
+    :type reuse: np.ndarray
+
+    :return: the long and short scale factors and the length of part2 in bits
+    :rtype: tuple
+    """
+    slots = SCALE_FACTOR_LAYOUTS[layouts]
+    widths = np.where(slots[:, :, 3] == 1, slen2[:, None], slen1[:, None])
+    widths[slots[:, :, 1] < 0] = 0
+    widths[np.take_along_axis(reuse, np.maximum(slots[:, :, 4], 0), axis=1) & (slots[:, :, 4] >= 0)] = 0
+    offsets = starts[:, None] + np.cumsum(widths, axis=1) - widths
+    values = _field(_window(words, offsets), 0, widths)
+
+    scale_fac_l = np.zeros((len(starts), 22), dtype=np.uint8)
+    scale_fac_s = np.zeros((len(starts), 3, 13), dtype=np.uint8)
+    rows = np.arange(len(starts))
+    for slot in range(slots.shape[1]):
+        short, sfb, window = slots[:, slot, 0], slots[:, slot, 1], slots[:, slot, 2]
+        long_rows, short_rows = (short == 0) & (sfb >= 0), short == 1
+        scale_fac_l[rows[long_rows], sfb[long_rows]] = values[long_rows, slot]
+        scale_fac_s[rows[short_rows], window[short_rows], sfb[short_rows]] = values[short_rows, slot]
+    return scale_fac_l, scale_fac_s, widths.sum(axis=1)
+
+
+def decode_huffman(words: np.ndarray, starts: np.ndarray, ends: np.ndarray, big_values: np.ndarray,
+                   table_select: np.ndarray, region1_start: np.ndarray, region2_start: np.ndarray,
+                   count1_table: np.ndarray) -> tuple:
+    """
+    Decode the big values and count1 regions of many granules at once. The granules are independent, so they are
+    decoded in lockstep: every step decodes one pair (or quadruple) of all granules that are not finished yet.
+
+    :param words: the main data, see _words
+    :type words: np.ndarray
+    :param starts: bit position of the huffman code of every granule (behind part2)
+    :type starts: np.ndarray
+    :param ends: bit position behind part3 of every granule
+    :type ends: np.ndarray
+    :param big_values: number of pairs in the big values region
+    :type big_values: np.ndarray
+    :param table_select: huffman table of the three big value regions, shape (granules, 3)
+    :type table_select: np.ndarray
+    :param region1_start: first line of region 1
+    :type region1_start: np.ndarray
+    :param region2_start: first line of region 2
+    :type region2_start: np.ndarray
+    :param count1_table: True for count1 table B
+    :type count1_table: np.ndarray
+
+    :return: quantized values of shape (granules, 576) and the number of lines in front of the zero region
+    :rtype: tuple
+    """
+    n = len(starts)
+    quantized = np.zeros((n, NUM_OF_LINES), dtype=np.int16)
+    positions = np.asarray(starts, dtype=np.int64).copy()
+    pairs = np.minimum(big_values, NUM_OF_LINES // 2).astype(np.int64)
+
+    # big values: the granules with the most pairs first, so the active granules of a step are a prefix
+    order = np.argsort(-pairs, kind="stable")
+    steps = np.arange(int(pairs.max()) if n > 0 else 0)
+    active_counts = n - np.searchsorted(pairs[order[::-1]], steps, side="right")
+    for step, count in enumerate(active_counts):
+        idx = order[:count]
+        line = 2 * step
+        region = (line >= region1_start[idx]).astype(np.int64) + (line >= region2_start[idx])
+        table = table_select[idx, region]
+        window = _window(words, positions[idx], ends[idx])
+        width = BIG_VALUE_WIDTH[table]
+        entry = BIG_VALUE_LOOKUP[BIG_VALUE_BASE[table] + (window >> (64 - width).astype(np.uint64)).astype(np.int64)]
+        offset = (entry & ENTRY_LENGTH_MASK).astype(np.int64)
+        linbits = BIG_VALUE_LINBITS[table]
+        for shift, target in ((8, line), (16, line + 1)):
+            value = ((entry >> shift) & 0xff).astype(np.int64)
+            escape = (value == 15) & (linbits > 0)
+            value += _field(window, offset, np.where(escape, linbits, 0))
+            offset += np.where(escape, linbits, 0)
+            negative = _field(window, offset, (value != 0).astype(np.int64)) == 1
+            offset += value != 0
+            quantized[idx, target] = np.where(negative, -value, value)
+        positions[idx] += offset
+
+    # count1: until the end of part3, a quadruple that overruns it is dropped
+    lines = 2 * pairs
+    idx = np.flatnonzero((positions < ends) & (lines <= NUM_OF_LINES - 4))
+    while len(idx) > 0:
+        window = _window(words, positions[idx], ends[idx])
+        entry = np.where(count1_table[idx], 4 | (15 - (window >> np.uint64(60)).astype(np.int64)) << 8,
+                         QUAD_LOOKUP[(window >> np.uint64(58)).astype(np.int64)])
+        offset = (entry & ENTRY_LENGTH_MASK).astype(np.int64)
+        values = []
+        for bit in (3, 2, 1, 0):
+            value = (entry >> (8 + bit)) & 1
+            negative = _field(window, offset, value) == 1
+            offset += value
+            values.append(np.where(negative, -value, value))
+        fits = positions[idx] + offset <= ends[idx]
+        idx, offset, values = idx[fits], offset[fits], [value[fits] for value in values]
+        for k, value in enumerate(values):
+            quantized[idx, lines[idx] + k] = value
+        positions[idx] += offset
+        lines[idx] += 4
+        idx = idx[(positions[idx] < ends[idx]) & (lines[idx] <= NUM_OF_LINES - 4)]
+    return quantized, lines
+
+
+class MainDataDecoder:
+    """
+    Huffman decoder of the main data of MPEG-1 Layer III frames. The main data of a frame starts main_data_begin
+    bytes in front of its side information, in the main data of the previous frames (bit reservoir). The decoder
+    keeps the end of the main data of the last table, so the tables of a file have to be decoded in file order.
+
+    :param file_data: view of the whole file
+    :type file_data: memoryview
+    """
+
+    def __init__(self, file_data: memoryview):
+        self.__bytes: np.ndarray = np.frombuffer(file_data, dtype=np.uint8)
+        self.__reservoir: np.ndarray = np.zeros(0, dtype=np.uint8)
+
+    def reset(self):
+        """
+        Forget the bit reservoir, e.g. before decoding a table that does not follow the last one.
+        """
+        self.__reservoir = np.zeros(0, dtype=np.uint8)
+
+    def decode(self, table) -> np.ndarray:
+        """
+        :param table: the next records of the file
+        :type table: FrameTable
+
+        :return: structured array of SPECTRUM_DTYPE, one row per record (zeros for awkward data and frames which are
+         not MPEG-1 Layer III or whose main data is not available)
+        :rtype: np.ndarray
+        """
+        records, headers, side_info = table.records, table.headers, table.side_info
+        spectrum = np.zeros(len(records), dtype=SPECTRUM_DTYPE)
+        decodable = records["is_frame"] & (headers["version"] == 3) & (headers["layer"] == 3)
+
+        # main data of all frames, behind the kept reservoir; awkward data breaks the reservoir
+        main_start = records["position"] + np.where(headers["crc"], HEADER_SIZE, HEADER_SIZE + 2) + side_info["side_info_length"]
+        main_end = np.minimum(records["position"] + records["length"], len(self.__bytes))
+        main_length = np.where(decodable, np.maximum(main_end - main_start, 0), 0)
+        offsets = len(self.__reservoir) + np.cumsum(main_length) - main_length
+        floor = np.maximum.accumulate(np.where(decodable, 0, offsets)) if len(records) > 0 else offsets
+        gather = np.repeat(main_start - offsets + len(self.__reservoir), main_length) + np.arange(int(main_length.sum()))
+        data = np.concatenate([self.__reservoir, self.__bytes[gather], np.zeros(WINDOW_PADDING, dtype=np.uint8)])
+        size = len(data) - WINDOW_PADDING
+        tail = int(floor[-1]) if len(records) > 0 else 0
+        self.__reservoir = data[max(size - MAX_MAIN_DATA_BEGIN, tail):size].copy()
+        if not np.any(decodable):
+            return spectrum
+
+        # granules of all frames in the order of the bit stream, [frame][granule][channel]
+        begin = offsets - side_info["main_data_begin"]
+        part2_3_length = side_info["part2_3_length"].reshape(-1, 4).astype(np.int64)
+        granule_starts = 8 * begin[:, None] + np.cumsum(part2_3_length, axis=1) - part2_3_length
+        frame_ends = 8 * begin + part2_3_length.sum(axis=1)
+        # the main data of a frame ends in the frame itself
+        spectrum["complete"] = decodable & (begin >= floor) & (frame_ends <= 8 * (offsets + main_length))
+        frames = np.flatnonzero(spectrum["complete"])
+        channels = np.where(headers["channel_mode"][frames] == ChannelMode.Mono.value, 1, 2)
+        granules = (frames[:, None] * 4 + np.arange(4)).reshape(-1)
+        granules = granules[(granules % 2 < np.repeat(channels, 4))]
+        frame, gr, ch = granules // 4, granules // 2 % 2, granules % 2
+        words = _words(data)
+        starts = granule_starts.reshape(-1)[granules]
+
+        def column(name: str) -> np.ndarray:
+            return side_info[name][frame, gr, ch].astype(np.int64)
+
+        window_switching = side_info["window_switching"][frame, gr, ch]
+        short = window_switching & (column("block_type") == 2)
+        layouts = np.where(short, np.where(side_info["mixed_block_flag"][frame, gr, ch], 2, 1), 0)
+        reuse = side_info["scfsi"][frame, ch] & (gr == 1)[:, None]
+        scale_fac_l, scale_fac_s, part2_length = decode_scale_factors(words, starts, layouts, column("slen1"),
+                                                                      column("slen2"), reuse)
+        spectrum["part2_length"][frame, gr, ch] = part2_length
+        spectrum["scale_fac_s"][frame, gr, ch] = scale_fac_s
+        # the scale factors of the scfsi bands are taken over from the first granule
+        copied = np.zeros((len(granules), 22), dtype=np.bool_)
+        copied[:, :21] = reuse.repeat([6, 5, 5, 5], axis=1) & (layouts == 0)[:, None]
+        spectrum["scale_fac_l"][frame, gr, ch] = scale_fac_l
+        second = np.flatnonzero(gr == 1)
+        spectrum["scale_fac_l"][frame[second], 1, ch[second]] = np.where(copied[second], spectrum["scale_fac_l"][frame[second], 0, ch[second]],
+                                                                         scale_fac_l[second])
+
+        # regions of the big values
+        band_index = BAND_INDEX_LONG[sampling_rate_index(headers["sampling_rate"][frame])]
+        region0_count, region1_count = column("region0_count"), column("region1_count")
+        rows = np.arange(len(granules))
+        region1_start = np.where(window_switching, 36, band_index[rows, np.minimum(region0_count + 1, 22)])
+        region2_start = np.where(window_switching, NUM_OF_LINES, band_index[rows, np.minimum(region0_count + region1_count + 2, 22)])
+
+        quantized, nonzero = decode_huffman(words, starts + part2_length, starts + part2_3_length.reshape(-1)[granules],
+                                            column("big_value"), side_info["table_select"][frame, gr, ch].astype(np.int64),
+                                            region1_start, region2_start, side_info["count1table_select"][frame, gr, ch])
+        spectrum["quantized"][frame, gr, ch] = quantized
+        spectrum["nonzero"][frame, gr, ch] = nonzero
+        return spectrum
@@ -0,0 +1,271 @@
+import numpy as np
+
+from decoder.tables import bit_rate_table, sampling_rate_table, samples_per_frame_table
+
+# Number of bytes scanned for sync words at once, bounds the memory used by the scan arrays.
+SCAN_BLOCK_SIZE = 1 << 22
+
+HEADER_SIZE = 4
+
+# Decoded frame header fields, one record per sync word candidate.
+HEADER_DTYPE = np.dtype([
+    ("position", np.int64),
+    ("version", np.uint8),  # version bits, see tables.mpeg_version_value
+    ("layer", np.uint8),
+    ("crc", np.bool_),  # protection bit, if it is not set two bytes of CRC follow the header
+    ("bit_rate_index", np.uint8),
+    ("bit_rate", np.int32),
+    ("sampling_rate", np.int32),
+    ("padding", np.bool_),
+    ("private", np.bool_),
+    ("channel_mode", np.uint8),
+    ("mode_extension", np.uint8),
+    ("copyright", np.bool_),
+    ("original", np.bool_),
+    ("emphasis", np.uint8),
+    ("samples", np.int16),
+    ("frame_size", np.int32),
+])
+
+# Position and kind of every record (frame or awkward data) of the file, see FrameTable.
+RECORD_DTYPE = np.dtype([
+    ("position", np.int64),
+    ("length", np.int32),
+    ("is_frame", np.bool_),
+    ("encoder", np.uint8),  # index into FrameTable.ENCODERS
+    ("stego_signatures", np.uint32),  # bit mask of StegoSignatures.STEGO_SIGNATURES
+])
+
+
+def scan_headers(data: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    Find all frame header candidates in data[start:end] and decode them at once. A candidate starts with the 11 bit
+    sync word 0xFFE and uses no reserved version, layer, bitrate or sampling rate.
+
+    :param data: the file as uint8 array
+    :type data: np.ndarray
+    :param start: first position to look at
+    :type start: int
+    :param end: end of the scanned range (exclusive)
+    :type end: int
+
+    :return: structured array of HEADER_DTYPE, sorted by position
+    :rtype: np.ndarray
+    """
+    # a header needs four bytes
+    end = min(end, len(data) - 3)
+    if end <= start:
+        return np.zeros(0, dtype=HEADER_DTYPE)
+
+    b1 = data[start + 1:end + 1]
+    hits = np.flatnonzero((data[start:end] == 0xFF) & (b1 >= 0xE0))
+    b1 = b1[hits]
+    b2 = data[start + 2:end + 2][hits]
+    b3 = data[start + 3:end + 3][hits]
+
+    version = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bit_rate_index = b2 >> 4
+    bit_rate = bit_rate_table[version, layer_bits, bit_rate_index]
+    sampling_rate = sampling_rate_table[version, (b2 >> 2) & 0x03]
+    # reserved values are zero in the tables
+    valid = (bit_rate > 0) & (sampling_rate > 0)
+
+    headers = np.zeros(np.count_nonzero(valid), dtype=HEADER_DTYPE)
+    headers["position"] = hits[valid] + start
+    headers["version"] = version[valid]
+    headers["layer"] = 4 - layer_bits[valid]
+    headers["crc"] = (b1[valid] & 0x01) != 0
+    headers["bit_rate_index"] = bit_rate_index[valid]
+    headers["bit_rate"] = bit_rate[valid]
+    headers["sampling_rate"] = sampling_rate[valid]
+    headers["padding"] = (b2[valid] & 0x02) != 0
+    headers["private"] = (b2[valid] & 0x01) != 0
+    headers["channel_mode"] = b3[valid] >> 6
+    headers["mode_extension"] = (b3[valid] >> 4) & 0x03
+    headers["copyright"] = (b3[valid] & 0x08) != 0
+    headers["original"] = (b3[valid] & 0x04) != 0
+    headers["emphasis"] = b3[valid] & 0x03
+    headers["samples"] = samples_per_frame_table[version[valid], layer_bits[valid]]
+    headers["frame_size"] = frame_sizes(headers)
+    return headers
+
+
+def frame_sizes(headers: np.ndarray) -> np.ndarray:
+    """
+    :param headers: structured array of HEADER_DTYPE
+
+    :return: the size in bytes of every frame, including the header
+    :rtype: np.ndarray
+    """
+    bit_rate = headers["bit_rate"].astype(np.int64)
+    sampling_rate = headers["sampling_rate"].astype(np.int64)
+    padding = headers["padding"].astype(np.int64)
+    # layer I counts in slots of four bytes
+    slots = (headers["samples"].astype(np.int64) // 8) * bit_rate // sampling_rate + padding
+    layer1 = (12 * bit_rate // sampling_rate + padding) * 4
+    return np.where(headers["layer"] == 1, layer1, slots).astype(np.int32)
+
+
+def chain_headers(headers: np.ndarray) -> np.ndarray:
+    """
+    Confirm the frame chain: a frame is chained if its predicted next offset (position + frame size) is again a
+    header candidate.
+
+    :param headers: structured array of HEADER_DTYPE, sorted by position
+
+    :return: for each candidate the index of the candidate at its next offset, -1 if there is none
+    :rtype: np.ndarray
+    """
+    next_position = headers["position"] + headers["frame_size"]
+    successors = np.searchsorted(headers["position"], next_position)
+    found = successors < len(headers)
+    found[found] = headers["position"][successors[found]] == next_position[found]
+    return np.where(found, successors, -1)
+
+
+def confirm_chains(headers: np.ndarray, successors: np.ndarray, count: int, tail: int, scanned_end: int) -> tuple:
+    """
+    Follow the frame chain of every candidate for up to count headers at once.
+
+    :param headers: structured array of HEADER_DTYPE, sorted by position
+    :param successors: the successor of every candidate, see chain_headers
+    :param count: number of chained headers that confirm a candidate
+    :type count: int
+    :param tail: end of the frame data, a shorter chain that reaches it is confirmed as well
+    :type tail: int
+    :param scanned_end: end of the scanned range, a chain that leaves it can not be followed
+    :type scanned_end: int
+
+    :return: two boolean arrays, the confirmed candidates and the candidates whose chain leaves the scanned range
+     before it is confirmed
+    :rtype: tuple
+    """
+    next_position = headers["position"] + headers["frame_size"]
+    confirmed = np.zeros(len(headers), dtype=np.bool_)
+    undetermined = np.zeros(len(headers), dtype=np.bool_)
+    current = np.arange(len(headers))
+    alive = np.ones(len(headers), dtype=np.bool_)
+    for _ in range(count - 1):
+        ended = alive & (successors[current] < 0)
+        confirmed |= ended & (next_position[current] >= tail)
+        undetermined |= ended & (next_position[current] < tail) & (next_position[current] >= scanned_end)
+        alive &= ~ended
+        current = np.where(alive, successors[current], current)
+    return confirmed | alive, undetermined
+
+
+class FrameScanner:
+    """
+    Scans the file block by block for frame headers. Only the headers of the current block are held in memory, the
+    block moves along with the requested positions.
+
+    :param data: the file as uint8 array
+    :type data: np.ndarray
+    :param block_size: number of bytes scanned at once
+    :type block_size: int
+    """
+
+    def __init__(self, data: np.ndarray, block_size: int = SCAN_BLOCK_SIZE):
+        self.__data: np.ndarray = data
+        self.__block_size: int = block_size
+        self.__block_start: int = 0
+        self.__block_end: int = 0
+        self.__headers: np.ndarray = np.zeros(0, dtype=HEADER_DTYPE)
+        # contiguous copy of the positions, searched for every lookup
+        self.__positions: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.__successors: list = []
+        self.__frame_sizes: list = []
+        # (count, tail, confirmed, indices of the confirmed or undetermined headers) of the current block, see sync
+        self.__chains: tuple = None
+
+    def scan(self, start: int):
+        """
+        Scan the block beginning at start.
+
+        :param start: first position of the block
+        :type start: int
+        """
+        self.__block_start = start
+        self.__block_end = min(start + self.__block_size, len(self.__data))
+        self.__headers = scan_headers(self.__data, self.__block_start, self.__block_end)
+        self.__positions = np.ascontiguousarray(self.__headers["position"])
+        self.__successors = chain_headers(self.__headers).tolist()
+        self.__frame_sizes = self.__headers["frame_size"].tolist()
+        self.__chains = None
+
+    def find(self, position: int) -> int:
+        """
+        :param position: position in the file
+        :type position: int
+
+        :return: index of the header at position in headers, -1 if there is no valid header at position
+        :rtype: int
+        """
+        if not self.__block_start <= position < self.__block_end:
+            self.scan(position)
+        idx = int(np.searchsorted(self.__positions, position))
+        if idx < len(self.__positions) and self.__positions[idx] == position:
+            return idx
+        return -1
+
+    def sync(self, position: int, count: int, tail: int) -> int:
+        """
+        Find the first header at or behind position that starts a chain of count headers (or a shorter chain that
+        reaches tail). The search moves the block along, every byte is scanned about once.
+
+        :param position: first position to look at
+        :type position: int
+        :param count: number of chained headers that confirm a header
+        :type count: int
+        :param tail: end of the frame data
+        :type tail: int
+
+        :return: index of the header in headers, -1 if there is none up to the end of the data
+        :rtype: int
+        """
+        if not self.__block_start <= position < self.__block_end:
+            self.scan(position)
+        while True:
+            if self.__chains is None or self.__chains[0:2] != (count, tail):
+                # headers behind the block are unknown, unless the block reaches the end of the data
+                scanned_end = self.__block_end if self.__block_end < len(self.__data) else len(self.__data) + 1
+                confirmed, undetermined = confirm_chains(self.__headers, np.array(self.__successors, dtype=np.int64), count, tail, scanned_end)
+                self.__chains = (count, tail, confirmed, np.flatnonzero(confirmed | undetermined))
+            confirmed, candidates = self.__chains[2:]
+
+            first = int(np.searchsorted(self.__positions, position))
+            first = int(np.searchsorted(candidates, first))
+            if first < len(candidates):
+                idx = int(candidates[first])
+                candidate_position = int(self.__positions[idx])
+                if confirmed[idx] or candidate_position == self.__block_start:
+                    return idx
+                # the chain leaves the block, follow it in a block beginning at the candidate
+                position = candidate_position
+                self.scan(position)
+            elif self.__block_end < len(self.__data):
+                position = self.__block_end
+                self.scan(position)
+            else:
+                return -1
+
+    @property
+    def headers(self) -> np.ndarray:
+        return self.__headers
+
+    @property
+    def successors(self) -> list:
+        return self.__successors
+
+    @property
+    def frame_sizes(self) -> list:
+        return self.__frame_sizes
+
+    @property
+    def block_start(self) -> int:
+        return self.__block_start
+
+    @property
+    def block_end(self) -> int:
+        return self.__block_end
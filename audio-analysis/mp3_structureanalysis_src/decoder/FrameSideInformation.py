@@ -1,8 +1,115 @@
 from decoder.FrameHeader import *
 from decoder.util import *
+from decoder.BitReader import BitReader
 
 #http://www.mp3-tech.org/programmer/docs/mp3_theory.pdf s. 20
 
+MAX_SIDE_INFO_LENGTH = 32
+# Bits of one granule/channel block, the same with and without window switching.
+GRANULE_INFO_BITS = 59
+
+# Side information of a frame, the granule fields are indexed [granule][channel].
+SIDE_INFO_DTYPE = np.dtype([
+    ("side_info_length", np.uint8),
+    ("main_data_begin", np.uint16),
+    ("private_bits", np.uint8),
+    ("scfsi", np.bool_, (2, 4)),
+    ("part2_3_length", np.uint16, (2, 2)),
+    ("big_value", np.uint16, (2, 2)),
+    ("global_gain", np.uint8, (2, 2)),
+    ("scale_fac_compress", np.uint8, (2, 2)),
+    ("slen1", np.uint8, (2, 2)),
+    ("slen2", np.uint8, (2, 2)),
+    ("window_switching", np.bool_, (2, 2)),
+    ("block_type", np.uint8, (2, 2)),
+    ("mixed_block_flag", np.bool_, (2, 2)),
+    ("table_select", np.uint8, (2, 2, 3)),
+    ("sub_block_gain", np.uint8, (2, 2, 3)),
+    ("region0_count", np.uint8, (2, 2)),
+    ("region1_count", np.uint8, (2, 2)),
+    ("pre_flag", np.bool_, (2, 2)),
+    ("scale_fac_scale", np.bool_, (2, 2)),
+    ("count1table_select", np.bool_, (2, 2)),
+])
+
+
+def _read_field(bits: np.ndarray, offset: int, width: int) -> np.ndarray:
+    """
+    :return: the unsigned value of bits[:, offset:offset + width] for every row
+    """
+    return bits[:, offset:offset + width] @ (1 << np.arange(width - 1, -1, -1))
+
+
+def decode_side_info(data: np.ndarray, positions: np.ndarray, crc: np.ndarray, mono: np.ndarray) -> np.ndarray:
+    """
+    Batch version of FrameSideInformation.set_side_info, decodes the side information of many frames at once.
+    Fields which are not transmitted (second channel of mono frames, third region and sub block gains) are zero.
+
+    :param data: the file as uint8 array
+    :type data: np.ndarray
+    :param positions: positions of the frame headers
+    :type positions: np.ndarray
+    :param crc: protection bits of the frame headers, if unset two bytes of CRC precede the side info
+    :type crc: np.ndarray
+    :param mono: True for frames in single channel mode
+    :type mono: np.ndarray
+
+    :return: structured array of SIDE_INFO_DTYPE, one record per frame
+    :rtype: np.ndarray
+    """
+    side_info = np.zeros(len(positions), dtype=SIDE_INFO_DTYPE)
+    starts = np.asarray(positions, dtype=np.int64) + np.where(crc, 4, 6)
+    bits = np.unpackbits(gather_bytes(data, starts, MAX_SIDE_INFO_LENGTH), axis=1).astype(np.int64)
+    slen_table = np.array(slen)
+
+    for channels in (1, 2):
+        rows = np.flatnonzero(mono == (channels == 1))
+        if len(rows) == 0:
+            continue
+        group = bits[rows]
+        info = np.zeros(len(rows), dtype=SIDE_INFO_DTYPE)
+        info["side_info_length"] = 17 if channels == 1 else 32
+        info["main_data_begin"] = _read_field(group, 0, 9)
+        info["private_bits"] = _read_field(group, 9, 5 if channels == 1 else 3)
+        offset = 14 if channels == 1 else 12
+        for ch in range(channels):
+            info["scfsi"][:, ch] = group[:, offset:offset + 4]
+            offset += 4
+
+        for gr in range(2):
+            for ch in range(channels):
+                info["part2_3_length"][:, gr, ch] = _read_field(group, offset, 12)
+                info["big_value"][:, gr, ch] = _read_field(group, offset + 12, 9)
+                info["global_gain"][:, gr, ch] = _read_field(group, offset + 21, 8)
+                scale_fac_compress = _read_field(group, offset + 29, 4)
+                info["scale_fac_compress"][:, gr, ch] = scale_fac_compress
+                info["slen1"][:, gr, ch] = slen_table[scale_fac_compress, 0]
+                info["slen2"][:, gr, ch] = slen_table[scale_fac_compress, 1]
+                window_switching = group[:, offset + 33] == 1
+                info["window_switching"][:, gr, ch] = window_switching
+
+                # window switching: block type, mixed block flag, two table selects and three sub block gains
+                block_type = np.where(window_switching, _read_field(group, offset + 34, 2), 0)
+                info["block_type"][:, gr, ch] = block_type
+                info["mixed_block_flag"][:, gr, ch] = window_switching & (group[:, offset + 36] == 1)
+                region0_count = np.where(block_type == 2, 8, 7)
+                info["region0_count"][:, gr, ch] = np.where(window_switching, region0_count, _read_field(group, offset + 49, 4))
+                info["region1_count"][:, gr, ch] = np.where(window_switching, 20 - region0_count, _read_field(group, offset + 53, 3))
+                for region in range(3):
+                    table_select = np.where(window_switching, _read_field(group, offset + 37 + region * 5, 5), _read_field(group, offset + 34 + region * 5, 5))
+                    info["table_select"][:, gr, ch, region] = np.where(window_switching & (region == 2), 0, table_select)
+                for window in range(3):
+                    info["sub_block_gain"][:, gr, ch, window] = np.where(window_switching, _read_field(group, offset + 47 + window * 3, 3), 0)
+
+                info["pre_flag"][:, gr, ch] = group[:, offset + 56] == 1
+                info["scale_fac_scale"][:, gr, ch] = group[:, offset + 57] == 1
+                info["count1table_select"][:, gr, ch] = group[:, offset + 58] == 1
+                offset += GRANULE_INFO_BITS
+        side_info[rows] = info
+
+    return side_info
+
+
 class FrameSideInformation:
     """
     The frame side information class, contains all the information of the side information of a frame in mp3 file.
@@ -41,48 +148,41 @@ class FrameSideInformation:
 
         self.__raw_data = None
 
-    def set_side_info(self, buffer: list, header: FrameHeader):
+    def set_side_info(self, reader: BitReader, channel_mode: ChannelMode):
         """
         The side information contains information on how to decode the main_data.
 
-        :param buffer: buffer that contains the mp3 file, from the first byte of the side info.
-        :param header: The frame header.
+        :param reader: bit reader positioned on the first byte of the side info.
+        :param channel_mode: The channel mode of the frame header.
         """
-        mono_channel = header.channel_mode == ChannelMode.Mono
+        mono_channel = channel_mode == ChannelMode.Mono
+        channels = 1 if mono_channel else 2
         self.__side_info_length = 17 if mono_channel else 32
-        self.__raw_data = buffer[0:self.__side_info_length]
-        offset = 0
+        self.__raw_data = reader.buffer[reader.byte_position:reader.byte_position + self.__side_info_length]
 
         # Get main data begin pointer from buffer
-        self.__main_data_begin = get_bits(buffer, 0, 9)
-        offset += 9
+        self.__main_data_begin = reader.read_bits(9)
         # Skip private bits
-        self.__private_bits = get_bits(buffer, offset, 5 if mono_channel else 3)
-        offset += 5 if mono_channel else 3
+        self.__private_bits = reader.read_bits(5 if mono_channel else 3)
 
         # Scale factor selection info:
         # If scfsi[scfsi_band] == 1, then scale factors for 1st granule are reused in the 2nd granule.
         # Else, each granule has its own scale factors.
         # scfsi_band indicates what group of scaling factors are reused (1-4)
-        for ch in range(header.channels):
+        for ch in range(channels):
             for scfsi_band in range(4):
-                self.__scfsi[ch][scfsi_band] = get_bits(buffer, offset, 1) != 0
-                offset += 1
+                self.__scfsi[ch][scfsi_band] = reader.read_bits(1) != 0
 
         for gr in range(2):
-            for ch in range(header.channels):
+            for ch in range(channels):
                 # Length of scaling factors and main data in bits.
-                self.__part2_3_length[gr][ch] = get_bits(buffer, offset, 12)
-                offset += 12
+                self.__part2_3_length[gr][ch] = reader.read_bits(12)
                 # Number of values is each big_region.
-                self.__big_value[gr][ch] = get_bits(buffer, offset, 9)
-                offset += 9
+                self.__big_value[gr][ch] = reader.read_bits(9)
                 # Quantizer step size.
-                self.__global_gain[gr][ch] = get_bits(buffer, offset, 8)
-                offset += 8
+                self.__global_gain[gr][ch] = reader.read_bits(8)
                 # Used to determine the values of slen1 and slen2.
-                self.__scale_fac_compress[gr][ch] = get_bits(buffer, offset, 4)
-                offset += 4
+                self.__scale_fac_compress[gr][ch] = reader.read_bits(4)
                 # Number of bits given to a range of scale factors.
                 # - Normal blocks: slen1 0 - 10, slen2 11-20
                 # - Short blocks: Short blocks && mixed_block_flag == 1: slen1 0 - 5, slen2 6-11
@@ -90,16 +190,13 @@ class FrameSideInformation:
                 self.__slen1[gr][ch] = slen[int(self.__scale_fac_compress[gr][ch])][0]
                 self.__slen2[gr][ch] = slen[int(self.__scale_fac_compress[gr][ch])][1]
                 # If set, a not normal window is being used.
-                self.__window_switching[gr][ch] = get_bits(buffer, offset, 1) == 1
-                offset += 1
+                self.__window_switching[gr][ch] = reader.read_bits(1) == 1
 
                 if self.__window_switching[gr][ch]:
                     # Window type for the granule: 0=reserved, 1=start block, 2=3 short blocks, 3=end block
-                    self.__block_type[gr][ch] = get_bits(buffer, offset, 2)
-                    offset += 2
+                    self.__block_type[gr][ch] = reader.read_bits(2)
                     # Number of scale factor bands before window switching.
-                    self.__mixed_block_flag[gr][ch] = get_bits(buffer, offset, 1) == 1
-                    offset += 1
+                    self.__mixed_block_flag[gr][ch] = reader.read_bits(1) == 1
                     if self.__mixed_block_flag[gr][ch]:
                         self.__switch_point_l[gr][ch] = 8
                         self.__switch_point_s[gr][ch] = 3
@@ -111,11 +208,9 @@ class FrameSideInformation:
 
                     for region in range(2):
                         # Huffman table number for a big region
-                        self.__table_select[gr][ch][region] = get_bits(buffer, offset, 5)
-                        offset += 5
+                        self.__table_select[gr][ch][region] = reader.read_bits(5)
                     for window in range(3):
-                        self.__sub_block_gain[gr][ch][window] = get_bits(buffer, offset, 3)
-                        offset += 3
+                        self.__sub_block_gain[gr][ch][window] = reader.read_bits(3)
 
                 else:
                     # Set by default if window_switching not set.
@@ -123,26 +218,20 @@ class FrameSideInformation:
                     self.__mixed_block_flag[gr][ch] = False
 
                     for region in range(3):
-                        self.__table_select[gr][ch][region] = get_bits(buffer, offset, 5)
-                        offset += 5
+                        self.__table_select[gr][ch][region] = reader.read_bits(5)
 
                     # Number of scale factor bands in the first big value region.
-                    self.__region0_count[gr][ch] = get_bits(buffer, offset, 4)
-                    offset += 4
+                    self.__region0_count[gr][ch] = reader.read_bits(4)
                     # Number of scale factor bands in the third big value region.
-                    self.__region1_count[gr][ch] = get_bits(buffer, offset, 3)
-                    offset += 3
+                    self.__region1_count[gr][ch] = reader.read_bits(3)
                     # scale factor bands is 12*3 = 36
 
                 # if set, adds values from a table to the scaling factor
-                self.__pre_flag[gr][ch] = get_bits(buffer, offset, 1)
-                offset += 1
+                self.__pre_flag[gr][ch] = reader.read_bits(1)
                 # Determines the step size.
-                self.__scale_fac_scale[gr][ch] = get_bits(buffer, offset, 1)
-                offset += 1
+                self.__scale_fac_scale[gr][ch] = reader.read_bits(1)
                 # Table that determines which count1 table is used.
-                self.__count1table_select[gr][ch] = get_bits(buffer, offset, 1)
-                offset += 1
+                self.__count1table_select[gr][ch] = reader.read_bits(1)
 
     @property
     def main_data_begin(self):
@@ -0,0 +1,334 @@
+from decoder.FrameHeader import *
+from decoder.FrameMainData import BAND_INDEX_LONG, BAND_INDEX_SHORT, NUM_OF_LINES, MainDataDecoder, sampling_rate_index
+
+#http://www.mp3-tech.org/programmer/docs/mp3_theory.pdf s. 22-30
+
+NUM_OF_SUBBANDS = 32
+SUBBAND_SAMPLES = 18
+# slots of subband samples of the last granules needed by the polyphase filterbank (16 slots, one of them is new)
+SYNTH_HISTORY = 15
+# slots filtered at once by the polyphase filterbank, keeps the lagged copies of the subband samples small
+SYNTH_BLOCK = 1024
+# largest quantized value: 15 + 13 linbits
+MAX_QUANTIZED = 15 + (1 << 13)
+
+LAYOUT_LONG, LAYOUT_SHORT, LAYOUT_MIXED = 0, 1, 2
+
+POW43 = (np.arange(MAX_QUANTIZED + 1, dtype=np.float64) ** (4 / 3)).astype(np.float32)
+PRE_TAB = np.append(pre_tab, 0)
+
+# butterflies of the alias reduction between two subbands
+_ALIAS_C = np.array([-0.6, -0.535, -0.33, -0.185, -0.095, -0.041, -0.0142, -0.0037])
+ALIAS_CS = (1 / np.sqrt(1 + _ALIAS_C ** 2)).astype(np.float32)
+ALIAS_CA = (_ALIAS_C / np.sqrt(1 + _ALIAS_C ** 2)).astype(np.float32)
+
+# intensity stereo: share of the left and right channel of every is_pos (7 is not allowed and ignored)
+_IS_RATIO = np.tan(np.arange(7) * np.pi / 12)
+IS_LEFT = np.append(np.where(np.arange(7) == 6, 1.0, _IS_RATIO / (1 + _IS_RATIO)), 1.0).astype(np.float32)
+IS_RIGHT = np.append(np.where(np.arange(7) == 6, 0.0, 1 / (1 + _IS_RATIO)), 0.0).astype(np.float32)
+
+# IMDCT of the long (18 -> 36) and short (6 -> 12) blocks
+IMDCT_LONG = np.cos(np.pi / 72 * (2 * np.arange(36)[None, :] + 1 + 18) * (2 * np.arange(18)[:, None] + 1)).astype(np.float32)
+IMDCT_SHORT = np.cos(np.pi / 24 * (2 * np.arange(12)[None, :] + 1 + 6) * (2 * np.arange(6)[:, None] + 1)).astype(np.float32)
+
+
+def _build_imdct_windows() -> np.ndarray:
+    """
+    :return: the windows of the long blocks indexed by block type (0 normal, 1 start, 3 stop; 2 is the short window
+     of 12 samples, padded with zeros)
+    :rtype: np.ndarray
+    """
+    i = np.arange(36)
+    windows = np.zeros((4, 36))
+    windows[0] = np.sin(np.pi / 36 * (i + 0.5))
+    windows[1, :18] = windows[0, :18]
+    windows[1, 18:24] = 1
+    windows[1, 24:30] = np.sin(np.pi / 12 * (i[24:30] - 18 + 0.5))
+    windows[3, 6:12] = np.sin(np.pi / 12 * (i[6:12] - 6 + 0.5))
+    windows[3, 12:18] = 1
+    windows[3, 18:] = windows[0, 18:]
+    windows[2, :12] = np.sin(np.pi / 12 * (i[:12] + 0.5))
+    return windows
+
+
+IMDCT_WINDOWS = _build_imdct_windows().astype(np.float32)
+
+# matrixing of the polyphase filterbank, V = S @ SYNTH_MATRIX
+SYNTH_MATRIX = np.cos((16 + np.arange(64)[None, :]) * (2 * np.arange(NUM_OF_SUBBANDS)[:, None] + 1) * np.pi / 64)
+
+
+def _build_synth_filter() -> np.ndarray:
+    """
+    The polyphase filterbank as one matrix: the output of a slot only depends on the subband samples of the last 16
+    slots, out = S[t - 15], ..., S[t] @ SYNTH_FILTER. Slot t - 2i contributes with the first and slot t - 2i - 1 with
+    the second half of V, both weighted by their part of synth_window.
+
+    :return: float32 array of shape (32 * 16, 32), row 16 * subband + 15 - lag
+    :rtype: np.ndarray
+    """
+    lags = np.empty((16, NUM_OF_SUBBANDS, NUM_OF_SUBBANDS))
+    for i in range(8):
+        lags[2 * i] = SYNTH_MATRIX[:, :32] * synth_window[64 * i:64 * i + 32]
+        lags[2 * i + 1] = SYNTH_MATRIX[:, 32:] * synth_window[64 * i + 32:64 * i + 64]
+    return lags[::-1].transpose(1, 0, 2).reshape(16 * NUM_OF_SUBBANDS, NUM_OF_SUBBANDS).astype(np.float32)
+
+
+SYNTH_FILTER = _build_synth_filter()
+
+
+def _build_line_layouts() -> tuple:
+    """
+    Scale factor band and window of every line, and the order of the lines after reordering the short blocks, for
+    every sampling rate (see FrameMainData.SAMPLING_RATES) and layout (long, short and mixed blocks).
+
+    :return: int arrays of shape (3, 3, 576): sfb, window (-1 for lines of long blocks) and source line
+    :rtype: tuple
+    """
+    line_sfb = np.zeros((3, 3, NUM_OF_LINES), dtype=np.int64)
+    line_window = np.full((3, 3, NUM_OF_LINES), -1, dtype=np.int64)
+    reorder = np.tile(np.arange(NUM_OF_LINES), (3, 3, 1))
+    for rate in range(3):
+        long_index, short_index = BAND_INDEX_LONG[rate], BAND_INDEX_SHORT[rate]
+        for sfb in range(22):
+            line_sfb[rate, :, long_index[sfb]:long_index[sfb + 1]] = sfb
+        # mixed blocks are long below line 36 (long sfb 8, short sfb 3)
+        for layout, first_sfb in ((LAYOUT_SHORT, 0), (LAYOUT_MIXED, 3)):
+            for sfb in range(first_sfb, 13):
+                width, start = short_index[sfb + 1] - short_index[sfb], 3 * short_index[sfb]
+                for window in range(3):
+                    lines = start + window * width + np.arange(width)
+                    line_sfb[rate, layout, lines] = sfb
+                    line_window[rate, layout, lines] = window
+                    reorder[rate, layout, start + 3 * np.arange(width) + window] = lines
+    return line_sfb, line_window, reorder
+
+
+LINE_SFB, LINE_WINDOW, REORDER = _build_line_layouts()
+# scale factor of every line in the table of a granule: 22 long bands, then 13 short bands per window
+LINE_SCALE = np.where(LINE_WINDOW < 0, LINE_SFB, 22 + 13 * LINE_WINDOW + LINE_SFB)
+
+
+def requantize(quantized: np.ndarray, global_gain: np.ndarray, sub_block_gain: np.ndarray, scale_fac_l: np.ndarray,
+               scale_fac_s: np.ndarray, scale_fac_scale: np.ndarray, pre_flag: np.ndarray,
+               line_scale: np.ndarray) -> np.ndarray:
+    """
+    Requantize many granules at once: xr = sign(is) * |is|^(4/3) * 2^(gain / 4) * 2^-(scale factor). The exponents
+    are computed per scale factor band in quarter steps and gathered for the lines.
+
+    :param quantized: quantized values of shape (granules, 576), see FrameMainData.SPECTRUM_DTYPE
+    :param global_gain: global gain of every granule
+    :param sub_block_gain: gain of the short windows, shape (granules, 3)
+    :param scale_fac_l: long scale factors, shape (granules, 22)
+    :param scale_fac_s: short scale factors, shape (granules, 3, 13)
+    :param scale_fac_scale: step of the scale factors (0.5 or 1)
+    :param pre_flag: add PRE_TAB to the long scale factors
+    :param line_scale: band of every line, see LINE_SCALE, shape (granules, 576)
+
+    :return: the spectrum of every granule, float32 array of shape (granules, 576)
+    :rtype: np.ndarray
+    """
+    step = 2 * (1 + scale_fac_scale.astype(np.int32))[:, None]
+    gain = global_gain.astype(np.int32)[:, None] - 210
+    long_bands = gain - step * (scale_fac_l + pre_flag[:, None] * PRE_TAB)
+    short_bands = (gain - 8 * sub_block_gain.astype(np.int32))[:, :, None] - step[:, :, None] * scale_fac_s
+    bands = np.concatenate([long_bands, short_bands.reshape(-1, 39)], axis=1).astype(np.float32)
+    exponent = np.take_along_axis(bands, line_scale, axis=1)
+    return np.copysign(POW43[np.abs(quantized)], quantized) * np.exp2(0.25 * exponent)
+
+
+def stereo(xr: np.ndarray, mode_extension: np.ndarray, scale_fac_l: np.ndarray, scale_fac_s: np.ndarray,
+           line_sfb: np.ndarray, line_window: np.ndarray, mixed: np.ndarray):
+    """
+    Joint stereo processing of many granules at once, in place: mid/side stereo and intensity stereo (above the last
+    non-zero band of the right channel, separately for every short window). Lines in front of the reordering.
+
+    :param xr: spectrum of the left and right channel, shape (granules, 2, 576)
+    :param mode_extension: mode extension of the frame of every granule
+    :param scale_fac_l: long scale factors of the right channel (intensity positions), shape (granules, 22)
+    :param scale_fac_s: short scale factors of the right channel, shape (granules, 3, 13)
+    :param line_sfb: sfb of every line of the right channel, shape (granules, 576)
+    :param line_window: window of every line of the right channel (-1 for long blocks), shape (granules, 576)
+    :param mixed: True for mixed blocks in the right channel, they use intensity stereo only in the short blocks
+    """
+    intensity = np.zeros(xr.shape[::2], dtype=np.bool_)
+    is_pos = np.full(intensity.shape, 7, dtype=np.int64)
+    rows = np.flatnonzero(mode_extension & 1)
+    if len(rows) > 0:
+        sfb, window = line_sfb[rows], line_window[rows]
+        last_sfb = np.where(xr[rows, 1] != 0, sfb, -1)
+        for group in range(-1, 3):
+            in_group = window == group
+            last = np.max(np.where(in_group, last_sfb, -1), axis=1)
+            if group >= 0:
+                # the long part of mixed blocks is never coded with intensity stereo
+                last = np.where(mixed[rows], np.maximum(last, 2), last)
+            intensity[rows] |= in_group & (sfb > last[:, None]) & ~((group < 0) & mixed[rows])[:, None]
+        # the last band has no scale factor of its own and uses the one below
+        positions = np.where(window < 0, np.take_along_axis(scale_fac_l[rows], np.minimum(sfb, 20), axis=1),
+                             np.take_along_axis(scale_fac_s[rows].reshape(-1, 39), np.maximum(window, 0) * 13 + np.minimum(sfb, 11), axis=1))
+        is_pos[rows] = np.where(intensity[rows], positions, 7)
+        intensity &= is_pos < 7
+
+    rows = np.flatnonzero(mode_extension & 2)
+    if len(rows) > 0:
+        left, right, keep = xr[rows, 0], xr[rows, 1], intensity[rows]
+        xr[rows, 0] = np.where(keep, left, (left + right) * np.float32(np.sqrt(0.5)))
+        xr[rows, 1] = np.where(keep, right, (left - right) * np.float32(np.sqrt(0.5)))
+    rows = np.flatnonzero(intensity.any(axis=1))
+    if len(rows) > 0:
+        left, right, positions = xr[rows, 0], xr[rows, 1], is_pos[rows]
+        xr[rows, 0] = np.where(intensity[rows], left * IS_LEFT[positions], left)
+        xr[rows, 1] = np.where(intensity[rows], left * IS_RIGHT[positions], right)
+
+
+def alias_reduction(xr: np.ndarray, layouts: np.ndarray):
+    """
+    Alias reduction between the subbands of the long blocks of many granules at once, in place.
+
+    :param xr: reordered spectrum, shape (granules, 576)
+    :param layouts: LAYOUT_LONG (all 31 subband borders), LAYOUT_MIXED (the border of the two long subbands) or
+     LAYOUT_SHORT (none)
+    """
+    subbands = xr.reshape(-1, NUM_OF_SUBBANDS, SUBBAND_SAMPLES)
+    butterfly = np.arange(8)
+    for layout, borders in ((LAYOUT_LONG, NUM_OF_SUBBANDS - 1), (LAYOUT_MIXED, 1)):
+        rows = np.flatnonzero(layouts == layout)
+        if len(rows) == 0:
+            continue
+        block = subbands[rows]
+        lower, upper = block[:, :borders, 17 - butterfly], block[:, 1:borders + 1, butterfly]
+        block[:, :borders, 17 - butterfly] = lower * ALIAS_CS - upper * ALIAS_CA
+        block[:, 1:borders + 1, butterfly] = upper * ALIAS_CS + lower * ALIAS_CA
+        subbands[rows] = block
+
+
+def imdct(xr: np.ndarray, block_type: np.ndarray, layouts: np.ndarray) -> np.ndarray:
+    """
+    IMDCT and windowing of many granules at once.
+
+    :param xr: reordered and alias reduced spectrum, shape (granules, 576)
+    :param block_type: block type of every granule, the window of the long blocks
+    :param layouts: LAYOUT_LONG, LAYOUT_SHORT or LAYOUT_MIXED (two long subbands of block type 0)
+
+    :return: 36 samples of every subband, the second half overlaps with the next granule, shape (granules, 32, 36)
+    :rtype: np.ndarray
+    """
+    subbands = xr.reshape(-1, NUM_OF_SUBBANDS, SUBBAND_SAMPLES)
+    short = (layouts == LAYOUT_SHORT)[:, None] | ((layouts == LAYOUT_MIXED)[:, None] & (np.arange(NUM_OF_SUBBANDS) >= 2))
+    long_window = IMDCT_WINDOWS[np.where(layouts == LAYOUT_LONG, block_type, 0)]
+    samples = (subbands @ IMDCT_LONG) * long_window[:, None, :]
+    if np.any(short):
+        rows, subband = np.nonzero(short)
+        # reordered short lines are interleaved: line 3 * k + window
+        windows = (subbands[rows, subband].reshape(-1, 6, 3).transpose(0, 2, 1) @ IMDCT_SHORT) * IMDCT_WINDOWS[2, :12]
+        short_samples = np.zeros((len(rows), 36), dtype=np.float32)
+        for window in range(3):
+            short_samples[:, 6 + 6 * window:18 + 6 * window] += windows[:, window]
+        samples[rows, subband] = short_samples
+    return samples
+
+
+def synthesize(subband_samples: np.ndarray, history: np.ndarray) -> tuple:
+    """
+    Polyphase synthesis filterbank over all time slots at once, block by block as one product of the lagged subband
+    samples with SYNTH_FILTER.
+
+    :param subband_samples: samples of the 32 subbands, shape (slots, 32)
+    :param history: subband samples of the last SYNTH_HISTORY slots, shape (SYNTH_HISTORY, 32)
+
+    :return: 32 PCM samples per slot (flattened) and the history for the next slots
+    :rtype: tuple
+    """
+    samples = np.concatenate([history, subband_samples])
+    slots = len(subband_samples)
+    pcm = np.empty((slots, NUM_OF_SUBBANDS), dtype=np.float32)
+    for start in range(0, slots, SYNTH_BLOCK):
+        lagged = np.lib.stride_tricks.sliding_window_view(samples[start:start + SYNTH_BLOCK + SYNTH_HISTORY], SYNTH_HISTORY + 1, axis=0)
+        pcm[start:start + SYNTH_BLOCK] = lagged.reshape(len(lagged), -1) @ SYNTH_FILTER
+    return pcm.reshape(-1), samples[len(samples) - SYNTH_HISTORY:]
+
+
+class PCMDecoder:
+    """
+    Decoder of MPEG-1 Layer III frames to PCM: Huffman decoding (see FrameMainData), requantization, stereo processing,
+    reordering, alias reduction, IMDCT and the polyphase filterbank. Every stage works on all granules of a table at
+    once, only the overlap of the IMDCT and the history of the filterbank are carried from one table to the next, so
+    the tables of a file have to be decoded in file order.
+
+    :param file_data: view of the whole file
+    :type file_data: memoryview
+    """
+
+    def __init__(self, file_data: memoryview):
+        self.__main_data: MainDataDecoder = MainDataDecoder(file_data)
+        # number of output channels and sampling rate, taken from the first frame
+        self.__channels: int = 0
+        self.__sampling_rate: int = 0
+        self.__overlap: np.ndarray = np.zeros((2, NUM_OF_SUBBANDS, SUBBAND_SAMPLES), dtype=np.float32)
+        self.__history: np.ndarray = np.zeros((2, SYNTH_HISTORY, NUM_OF_SUBBANDS), dtype=np.float32)
+
+    def decode(self, table) -> np.ndarray:
+        """
+        :param table: the next records of the file
+        :type table: FrameTable
+
+        :return: float32 PCM samples (full scale 1, not clipped) of the frames of the table, shape (samples,
+         channels). Frames without main data are decoded as silence, awkward data and frames which are not MPEG-1
+         Layer III are skipped.
+        :rtype: np.ndarray
+        """
+        spectrum = self.__main_data.decode(table)
+        headers, side_info = table.headers, table.side_info
+        frames = np.flatnonzero(table.records["is_frame"] & (headers["version"] == 3) & (headers["layer"] == 3))
+        if len(frames) == 0:
+            return np.zeros((0, max(self.__channels, 1)), dtype=np.float32)
+        if self.__channels == 0:
+            self.__channels = 1 if headers["channel_mode"][frames[0]] == ChannelMode.Mono.value else 2
+            self.__sampling_rate = int(headers["sampling_rate"][frames[0]])
+        spectrum, headers, side_info = spectrum[frames], headers[frames], side_info[frames]
+
+        # granules [frame][granule][channel]
+        rate = np.repeat(sampling_rate_index(headers["sampling_rate"]), 4)
+        window_switching = side_info["window_switching"].reshape(-1)
+        block_type = np.where(window_switching, side_info["block_type"].reshape(-1), 0)
+        mixed = window_switching & side_info["mixed_block_flag"].reshape(-1) & (block_type == 2)
+        layouts = np.where(block_type == 2, np.where(mixed, LAYOUT_MIXED, LAYOUT_SHORT), LAYOUT_LONG)
+        xr = requantize(spectrum["quantized"].reshape(-1, NUM_OF_LINES), side_info["global_gain"].reshape(-1),
+                        side_info["sub_block_gain"].reshape(-1, 3), spectrum["scale_fac_l"].reshape(-1, 22),
+                        spectrum["scale_fac_s"].reshape(-1, 3, 13), side_info["scale_fac_scale"].reshape(-1),
+                        side_info["pre_flag"].reshape(-1), LINE_SCALE[rate, layouts])
+
+        # joint stereo, on the pairs of channels of a granule
+        joint = np.repeat(headers["channel_mode"] == ChannelMode.JointStereo.value, 2)
+        if np.any(joint):
+            pairs = xr.reshape(-1, 2, NUM_OF_LINES)[joint]
+            right = np.flatnonzero(joint) * 2 + 1
+            stereo(pairs, np.repeat(headers["mode_extension"].astype(np.int64), 2)[joint],
+                   spectrum["scale_fac_l"].reshape(-1, 22)[right], spectrum["scale_fac_s"].reshape(-1, 3, 13)[right],
+                   LINE_SFB[rate[right], layouts[right]], LINE_WINDOW[rate[right], layouts[right]], mixed[right])
+            xr.reshape(-1, 2, NUM_OF_LINES)[joint] = pairs
+
+        rows = np.flatnonzero(layouts != LAYOUT_LONG)
+        xr[rows] = np.take_along_axis(xr[rows], REORDER[rate[rows], layouts[rows]], axis=1)
+        alias_reduction(xr, layouts)
+        samples = imdct(xr, block_type, layouts).reshape(len(frames), 2, 2, NUM_OF_SUBBANDS, 36)
+
+        mono = headers["channel_mode"] == ChannelMode.Mono.value
+        pcm = np.zeros((len(frames) * 2 * SUBBAND_SAMPLES * NUM_OF_SUBBANDS, self.__channels), dtype=np.float32)
+        for ch in range(self.__channels):
+            # the only channel of mono frames is played on both channels
+            channel = samples[np.arange(len(frames)), :, np.where(mono, 0, ch)].reshape(-1, NUM_OF_SUBBANDS, 36)
+            overlapped = channel[:, :, :SUBBAND_SAMPLES] + np.concatenate([self.__overlap[ch][None], channel[:-1, :, SUBBAND_SAMPLES:]])
+            self.__overlap[ch] = channel[-1, :, SUBBAND_SAMPLES:]
+            # frequency inversion of the odd subbands
+            overlapped[:, 1::2, 1::2] *= -1
+            pcm[:, ch], self.__history[ch] = synthesize(overlapped.transpose(0, 2, 1).reshape(-1, NUM_OF_SUBBANDS), self.__history[ch])
+        return pcm
+
+    @property
+    def channels(self) -> int:
+        return self.__channels
+
+    @property
+    def sampling_rate(self) -> int:
+        return self.__sampling_rate
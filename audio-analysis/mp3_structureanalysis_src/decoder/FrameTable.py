@@ -0,0 +1,282 @@
+from decoder.FrameHeader import *
+from decoder.FrameScanner import HEADER_DTYPE, HEADER_SIZE, RECORD_DTYPE
+from decoder.FrameSideInformation import SIDE_INFO_DTYPE
+from decoder.StegoSignatures import STEGO_SIGNATURES, select, summarize
+from decoder.util import bits_from_table_select
+
+import numpy as np
+
+# Encoders detected in the main data of a frame, stored as index into this list.
+ENCODERS = [None, "Xing", "LAME"]
+
+
+def global_header_info(records: np.ndarray, headers: np.ndarray) -> dict:
+    """
+    :param records: structured array of RECORD_DTYPE
+    :type records: np.ndarray
+    :param headers: structured array of HEADER_DTYPE, one row per record
+    :type headers: np.ndarray
+
+    :return: statistics of the frame headers
+    :rtype: dict
+    """
+    headers = headers[records["is_frame"]]
+    layer3 = headers["layer"] == 3
+    return {
+        "length": mp3utils.array_statistics(records["length"]),
+        "samples": mp3utils.array_statistics(headers["samples"]),
+        "version": mp3utils.array_categorical(np.array(mpeg_version_value)[headers["version"]], [1, 2, 2.5]),
+        "layer": mp3utils.array_categorical(headers["layer"], [1, 2, 3]),
+        "crc": mp3utils.array_categorical(headers["crc"], [0, 1]),
+        "bitrate": mp3utils.array_statistics(headers["bit_rate"]),
+        "samplerate": mp3utils.array_statistics(headers["sampling_rate"]),
+        "padding": mp3utils.array_categorical(headers["padding"], [0, 1]),
+        "private": mp3utils.array_categorical(headers["private"], [0, 1]),
+        "mode": mp3utils.array_categorical(headers["channel_mode"], [mode.value for mode in ChannelMode], [str(mode) for mode in ChannelMode]),
+        "modeExt": mp3utils.array_categorical(np.where(layer3, headers["mode_extension"], ModeExtension.NONE.value), [ext.value for ext in ModeExtension], [str(ext) for ext in ModeExtension]),
+        "copyright": mp3utils.array_categorical(headers["copyright"], [0, 1]),
+        "original": mp3utils.array_categorical(headers["original"], [0, 1]),
+        "emphasis": mp3utils.array_categorical(headers["emphasis"], [emphasis.value for emphasis in Emphasis], [str(emphasis) for emphasis in Emphasis])
+    }
+
+
+class FrameTable:
+    """
+    Array backed table of the records (frames and awkward data) of an mp3 file. Every column is a typed numpy array,
+    the nested dict of a record (as exported to JSON) is only built on access.
+
+    :param file_data: view of the whole file, the records refer to it by position
+    :type file_data: memoryview
+    :param records: structured array of RECORD_DTYPE
+    :type records: np.ndarray
+    :param headers: structured array of HEADER_DTYPE, one row per record (zeros for awkward data)
+    :type headers: np.ndarray
+    :param side_info: structured array of SIDE_INFO_DTYPE, one row per record (zeros for awkward data)
+    :type side_info: np.ndarray
+    :param flag_data: include the main data in the records
+    :type flag_data: bool
+    :param flag_hex: store binary data as hex
+    :type flag_hex: bool
+    :param base: position of the first byte of file_data in the file, if file_data only holds a part of it
+    :type base: int
+    """
+
+    def __init__(self, file_data: memoryview, records: np.ndarray, headers: np.ndarray, side_info: np.ndarray,
+                 flag_data: bool = False, flag_hex: bool = False, base: int = 0):
+        self.__file_data: memoryview = file_data
+        self.__base: int = base
+        self.__records: np.ndarray = records
+        self.__headers: np.ndarray = headers
+        self.__side_info: np.ndarray = side_info
+        self.__flag_data: bool = flag_data
+        self.__flag_hex: bool = flag_hex
+
+    @staticmethod
+    def empty(file_data: memoryview, flag_data: bool = False, flag_hex: bool = False):
+        """
+        :return: a table without records
+        :rtype: FrameTable
+        """
+        return FrameTable(file_data, np.zeros(0, dtype=RECORD_DTYPE), np.zeros(0, dtype=HEADER_DTYPE),
+                          np.zeros(0, dtype=SIDE_INFO_DTYPE), flag_data, flag_hex)
+
+    @staticmethod
+    def concatenate(tables: list):
+        """
+        :param tables: tables of the same file, in file order
+        :type tables: list
+
+        :return: one table holding the records of all tables
+        :rtype: FrameTable
+        """
+        first = tables[0]
+        return FrameTable(first.file_data,
+                          np.concatenate([table.records for table in tables]),
+                          np.concatenate([table.headers for table in tables]),
+                          np.concatenate([table.side_info for table in tables]),
+                          first.flag_data, first.flag_hex, first.base)
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return FrameTable(self.__file_data, self.__records[item], self.__headers[item], self.__side_info[item],
+                              self.__flag_data, self.__flag_hex, self.__base)
+        if item < 0:
+            item += len(self.__records)
+        if not 0 <= item < len(self.__records):
+            raise IndexError("record index out of range")
+        return self.record(item)
+
+    def __iter__(self):
+        for i in range(len(self.__records)):
+            yield self.record(i)
+
+    def __raw(self, data: memoryview) -> str:
+        return data.hex() if self.__flag_hex else str(bytes(data))
+
+    def record(self, i: int) -> dict:
+        """
+        :param i: index of the record
+        :type i: int
+
+        :return: the description of the record, as exported to JSON
+        :rtype: dict
+        """
+        position = int(self.__records["position"][i])
+        length = int(self.__records["length"][i])
+        # position of the record in file_data
+        start = position - self.__base
+
+        if not self.__records["is_frame"][i]:
+            return {
+                "position": position,
+                "length": length,
+                "raw": self.__raw(self.__file_data[start:start + length])
+            }
+
+        header = self.__headers[i]
+        side_info = self.__side_info[i]
+        side_info_length = int(side_info["side_info_length"])
+        side_info_start = start + (4 if header["crc"] else 6)
+        channel_mode = ChannelMode(int(header["channel_mode"]))
+        channels = 1 if channel_mode == ChannelMode.Mono else 2
+        granules = {name: side_info[name].tolist() for name in SIDE_INFO_DTYPE.names}
+        window_switching = granules["window_switching"]
+        signatures = int(self.__records["stego_signatures"][i])
+
+        def values(name: str, g: int) -> list:
+            return [float(granules[name][g][c]) for c in range(channels)]
+
+        def flags(name: str, g: int) -> list:
+            return [bool(granules[name][g][c]) for c in range(channels)]
+
+        return {
+            "position": position,
+            "length": length,
+            "samples": int(header["samples"]),
+            "header": {
+                "bitstring": " ".join([mp3utils.byteToBits(byte) for byte in self.__file_data[start:start + HEADER_SIZE]]),
+                "version": mpeg_version_value[header["version"]],
+                "layer": int(header["layer"]),
+                "crc": bool(header["crc"]),
+                "bitrate": int(header["bit_rate"]),
+                "samplerate": int(header["sampling_rate"]),
+                "padding": bool(header["padding"]),
+                "private": bool(header["private"]),
+                "mode": str(channel_mode),
+                "modeExt": str(ModeExtension(int(header["mode_extension"]) if header["layer"] == 3 else 4)),
+                "copyright": bool(header["copyright"]),
+                "original": bool(header["original"]),
+                "emphasis": str(Emphasis(int(header["emphasis"])))
+            },
+            "side_info": {
+                "bitstring": " ".join([mp3utils.byteToBits(byte) for byte in self.__file_data[side_info_start:side_info_start + side_info_length]]),
+                "position": position + 4,
+                "length": side_info_length,
+                "main_data_begin": granules["main_data_begin"],
+                "scfsi": [
+                    "".join(["1" if b else "0" for b in granules["scfsi"][c]]) for c in range(channels)
+                ],
+                "granule_info": [{
+                    "part2_3_length": values("part2_3_length", g),
+                    "big_value": values("big_value", g),
+                    "global_gain": values("global_gain", g),
+                    "scalefac_compress": values("scale_fac_compress", g),
+                    "slen1": values("slen1", g),
+                    "slen2": values("slen2", g),
+                    "windows_switching_flag": flags("window_switching", g),
+                    "block_type": values("block_type", g),
+                    "mixed_block_flag": flags("mixed_block_flag", g),
+                    "table_select": [[float(granules["table_select"][g][c][r]) for r in range(2 if window_switching[g][c] else 3)] for c in range(channels)],
+                    "subblock_gain": [[float(granules["sub_block_gain"][g][c][w]) for w in range(3)] if window_switching[g][c] else None for c in range(channels)],
+                    "region0_count": values("region0_count", g),
+                    "region1_count": values("region1_count", g),
+                    "pre_flag": flags("pre_flag", g),
+                    "scale_fac_scale": flags("scale_fac_scale", g),
+                    "count1table_select": flags("count1table_select", g)
+                } for g in range(2)]
+            },
+            "main_data": {
+                "position": position + 4 + side_info_length,
+                "length": length - side_info_length - 4,
+                "raw": self.__raw(self.__file_data[start + side_info_length + 4:start + length]) if self.__flag_data else None,
+                "encoder": ENCODERS[self.__records["encoder"][i]]
+            },
+            "stego_signatures": {sig: True for bit, sig in enumerate(STEGO_SIGNATURES) if signatures & (1 << bit)}
+        }
+
+    def global_header_info(self) -> dict:
+        """
+        :return: statistics of the frame headers, computed on the columns
+        :rtype: dict
+        """
+        return global_header_info(self.__records, self.__headers)
+
+    def table_select(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        :param start: index of the first frame (awkward data is not counted)
+        :type start: int
+        :param stop: index behind the last frame, None for all frames
+        :type stop: int
+
+        :return: the huffman tables used in the frames, indexed [frame][channel][granule][region]
+        :rtype: np.ndarray
+        """
+        frames = np.flatnonzero(self.__records["is_frame"])[start:stop]
+        return np.swapaxes(self.__side_info["table_select"][frames], 1, 2)
+
+    def table_select_bits(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        :param start: index of the first frame (awkward data is not counted)
+        :type start: int
+        :param stop: index behind the last frame, None for all frames
+        :type stop: int
+
+        :return: the bits hidden in the huffman table selection of the frames, see decoder.util.bits_from_table_select
+        :rtype: np.ndarray
+        """
+        return bits_from_table_select(self.table_select(start, stop))
+
+    def stego_signatures(self, detectors: list = None) -> dict:
+        """
+        :param detectors: the detectors that ran, None for all registered detectors
+        :type detectors: list
+
+        :return: number of frames per stego signature, grouped by tool
+        :rtype: dict
+        """
+        return summarize(self.__records, self.__headers, select() if detectors is None else detectors)[0]
+
+    @property
+    def file_data(self) -> memoryview:
+        return self.__file_data
+
+    @property
+    def records(self) -> np.ndarray:
+        return self.__records
+
+    @property
+    def headers(self) -> np.ndarray:
+        return self.__headers
+
+    @property
+    def side_info(self) -> np.ndarray:
+        return self.__side_info
+
+    @property
+    def flag_data(self) -> bool:
+        return self.__flag_data
+
+    @property
+    def flag_hex(self) -> bool:
+        return self.__flag_hex
+
+    @property
+    def base(self) -> int:
+        return self.__base
+
+    @property
+    def frame_count(self) -> int:
+        return int(np.count_nonzero(self.__records["is_frame"]))
@@ -1,6 +1,7 @@
 from enum import Enum
 
 from decoder import util
+from decoder.BitReader import BitReader
 import mp3utils
 
 MPEG_VERSION = 2
@@ -37,15 +38,15 @@ class ID3Frame:
     The id3 frame class, contains all the information of a current id3 frame in mp3 file.
 
     :param frame_id: current id3 frame id.
-    :type frame_id: list
+    :type frame_id: bytes
     :param flags: some flags from the id3 section.
     :type flags: int
     :param content: the id3 content in bytes.
     :type content: bytes
     """
 
-    def __init__(self, frame_id: list, position: int, flags: int, content: bytes, raw: bytes | None, flag_hex: bool):
-        self.__frame_id: list = frame_id
+    def __init__(self, frame_id: bytes, position: int, flags: int, content: bytes, raw: bytes | None, flag_hex: bool):
+        self.__frame_id: bytes = frame_id
         self.__position = position
         self.__content: bytes = content
         self.__frame_flags: list = []
@@ -115,13 +116,13 @@ class ID3:
     the first MP3 header.
     | Header | Additional header (optional) | Meta Data | Footer (optional) |
 
-    :param buffer: buffet that contains bytes of id3 section in mp3 file
-    :type buffer: list
+    :param buffer: buffer that contains the bytes of the mp3 file, starting with the id3 section
+    :type buffer: memoryview
     """
 
-    def __init__(self, buffer: list, flag_data: bool, flag_hex: bool):
+    def __init__(self, buffer: memoryview, flag_data: bool, flag_hex: bool):
         # Declarations
-        self.__buffer: list = buffer
+        self.__buffer: memoryview = buffer
         self.__offset: int
         self.__valid: bool
         self.__start: int
@@ -132,7 +133,7 @@ class ID3:
         self.__flag_data: bool = flag_data
         self.__flag_hex: bool = flag_hex
 
-        if chr(buffer[0]) == 'I' and chr(buffer[1]) == 'D' and chr(buffer[2]) == '3':
+        if len(buffer) >= 10 and bytes(buffer[0:3]) == b"ID3":
             self.__raw_header: bytes = bytes(buffer[0:10]) if flag_data else None
             self.__set_version(self.__buffer[3], self.__buffer[4])
             if self.__set_flags(self.__buffer[5]):
@@ -179,7 +180,7 @@ class ID3:
 
         valid = True
         while i < size and valid:
-            frame_id = self.__buffer[start + i: start + i + 4]
+            frame_id = bytes(self.__buffer[start + i: start + i + 4])
             tag_position = start + i
             for c in frame_id:
                 if not (chr(c).isupper() or chr(c).isdigit()):  # Check for legal ID
@@ -189,9 +190,9 @@ class ID3:
                 i += 4
                 #field_size = util.char_to_int(self.__buffer[start + i: start + i + 4])  # 4 Bytes
                 #BUG_FIX:
-                field_size = int.from_bytes(bytes(self.__buffer[start + i: start + i + 4]), byteorder = "big")
+                field_size = int.from_bytes(self.__buffer[start + i: start + i + 4], byteorder = "big")
                 i += 4
-                frame_flags = util.get_bits(self.__buffer, util.BYTE_LENGTH * (start + i), 16)  # 2 Bytes
+                frame_flags = BitReader(self.__buffer, start + i).read_bits(16)  # 2 Bytes
                 i += 2
                 frame_content = bytes(self.__buffer[start + i: start + i + field_size])
                 i += field_size
@@ -242,9 +243,9 @@ class ID3:
         return d
 
 class ID3v1:
-    def __init__(self, buffer: list, flag_data: bool, flag_hex: bool):
+    def __init__(self, buffer: memoryview, flag_data: bool, flag_hex: bool):
         # Declarations
-        self.__buffer: list = buffer
+        self.__buffer: memoryview = buffer
         self.__is_valid = len(buffer) >= 128 and bytes(buffer[0:3]) == b"TAG"
         if self.__is_valid:
             tgBytes = bytes(buffer[0:128])
@@ -1,175 +1,241 @@
 from decoder.Frame import *
-
-HEADER_SIZE = 4
+from decoder.FrameScanner import FrameScanner, HEADER_DTYPE, HEADER_SIZE, RECORD_DTYPE, SCAN_BLOCK_SIZE
+from decoder.FrameSideInformation import SIDE_INFO_DTYPE, decode_side_info
+from decoder.FrameSynthesis import PCMDecoder
+from decoder.FrameTable import FrameTable, ENCODERS
+from decoder.StegoSignatures import ANCHOR_MAIN_DATA, STEGO_SIGNATURES, FrameWindow, detect_frames, select
+
+# version of the parsed records, has to be increased with every change of the parsing (invalidates cached analyses)
+PARSER_VERSION = 2
+ID3V1_SIZE = 128
+# number of chained frame headers required to resynchronise behind invalid data
+RESYNC_FRAMES = 3
+# default number of records (frames and awkward data) parsed and held at once by the generators
+PARSE_WINDOW = 4096
 
 class MP3Parser:
     """
     Class for parsing mp3 files into wav file.
 
-    :param file_data: buffer for the file hexadecimal data.
-    :type file_data: list
+    :param file_data: buffer for the file data, usually a memoryview of the mapped file (see decoder.util.map_file).
+    :type file_data: memoryview
     :param offset: offset for the file to begin after the id3.
     :type offset: int
+    :param resync_frames: number of chained frame headers required to continue behind invalid data
+    :type resync_frames: int
+    :param detectors: the stego-signature detectors to run, None for all registered detectors (see StegoSignatures.select)
+    :type detectors: list
     """
 
-    def __init__(self, file_data: list, offset: int):
+    def __init__(self, file_data: memoryview, offset: int, resync_frames: int = RESYNC_FRAMES, detectors: list = None):
         # Declarations
         self.__offset: int = offset
-        self.__curr_frame: Frame = Frame()
-        self.__valid: bool = False
-        # List of integers that contain the file (without ID3) data
-        self.__file_data: list = []
-        self.__buffer: list = []
-        self.__frames: np.array = np.array([])
-        self.__file_length: int = 0
-        # self.__file_path = file_path
-
-        # cut the id3 from hex_data
-        self.__buffer: list = file_data[offset:]
-
-        if self.__buffer[0] == 0xFF and self.__buffer[1] >= 0xE0:
-            self.__valid: bool = True
-            self.__file_data: list = file_data
-            self.__file_length: int = len(file_data)
-            self.__init_curr_header()
-            self.__curr_frame.set_frame_size()
-        else:
-            self.__valid: bool = False
-
-    def __init_curr_header(self):
-        if self.__buffer[0] == 0xFF and self.__buffer[1] >= 0xE0:
-            self.__curr_frame.init_header_params(self.__buffer)
-        else:
-            self.__valid = False
-
-    def __init_curr_frame(self):
-        self.__curr_frame.init_frame_params(self.__buffer, self.__file_data, self.__offset)
+        self.__bit_rate: int = 0
+        # View of the whole file, frames are addressed by offset and never copied
+        self.__file_data: memoryview = memoryview(file_data)
+        self.__bytes: np.ndarray = np.frombuffer(self.__file_data, dtype=np.uint8)
+        self.__scanner: FrameScanner = FrameScanner(self.__bytes)
+        self.__frames: FrameTable = FrameTable.empty(self.__file_data)
+        self.__file_length: int = len(self.__file_data)
+        self.__num_of_parsed_frames: int = 0
+        self.__resync_frames: int = resync_frames
+        self.__detectors: list = select() if detectors is None else detectors
+        # end of the frame data: a trailing ID3v1 tag is never part of a gap
+        has_id3v1 = self.__file_length >= ID3V1_SIZE and bytes(self.__file_data[-ID3V1_SIZE:-ID3V1_SIZE + 3]) == b"TAG"
+        self.__tail_end: int = self.__file_length - ID3V1_SIZE if has_id3v1 else self.__file_length
+        self.__tail: int = self.__tail_end if has_id3v1 else self.__file_length - HEADER_SIZE
+
+        # junk in front of the first frame is skipped by __walk like any later gap (the first region of awkward data)
+        self.__valid: bool = True
+
+    def __walk(self, window: int) -> list:
+        """
+        Follow the chain of frames through the block of the scanner. A gap in the chain is stored as one region of
+        awkward data, up to the next position where the chain continues (see FrameScanner.sync).
+
+        :param window: maximum number of entries
+        :type window: int
+
+        :return: list of (position, length, header index) tuples, the header index is -1 for awkward data
+        :rtype: list
+        """
+        entries = []
+        idx = -1
+
+        while self.__valid and self.__file_length > self.__offset + HEADER_SIZE and len(entries) < window:
+            if idx < 0:
+                if len(entries) > 0 and not self.__scanner.block_start <= self.__offset < self.__scanner.block_end:
+                    # the header indices of the entries refer to the current block
+                    break
+                idx = self.__scanner.find(self.__offset)
+            if idx >= 0:
+                frame_size = self.__scanner.frame_sizes[idx]
+                entries.append((self.__offset, frame_size, idx))
+                self.__offset += frame_size
+                idx = self.__scanner.successors[idx]
+            else:
+                if len(entries) > 0:
+                    # the search for the next frame moves the block of the scanner
+                    break
+                # skip to the next header that starts a chain of resync_frames headers, the skipped bytes are one region
+                idx = self.__scanner.sync(self.__offset + 1, self.__resync_frames, self.__tail)
+                next_position = int(self.__scanner.headers["position"][idx]) if idx >= 0 else self.__tail_end
+                if next_position > self.__offset:
+                    entries.append((self.__offset, next_position - self.__offset, -1))
+                    self.__offset = next_position
+                if idx < 0:
+                    self.__valid = False
+
+        return entries
+
+    def iter_tables(self, pbar=None, flag_data: bool = False, flag_hex: bool = False, window: int = PARSE_WINDOW):
+        """
+        Parse the file window by window. Only the records of the current window are held in memory, the parsing
+        continues when the next window is requested. The parser can only be iterated once.
+
+        :param pbar: optional progress callback, called with the number of bytes of every window
+        :param flag_data: include the main data in the records
+        :type flag_data: bool
+        :param flag_hex: store binary data as hex
+        :type flag_hex: bool
+        :param window: maximum number of records per table
+        :type window: int
+
+        :return: generator of the FrameTable of every window, in file order
+        """
+        entries = self.__walk(window)
+        while len(entries) > 0:
+            table = self.__table(entries, self.__num_of_parsed_frames, flag_data, flag_hex)
+            self.__num_of_parsed_frames += table.frame_count
+            if pbar is not None:
+                pbar(int(table.records["length"].sum()), skipped=True)
+            yield table
+            entries = self.__walk(window)
+
+    def iter_frames(self, pbar=None, flag_data: bool = False, flag_hex: bool = False, window: int = PARSE_WINDOW):
+        """
+        Like iter_tables, but yields the description of every record (frame or awkward data) on its own.
+
+        :return: generator of the record dicts, in file order
+        """
+        for table in self.iter_tables(pbar, flag_data, flag_hex, window):
+            yield from table
+
+    def iter_pcm(self, pbar=None, window: int = PARSE_WINDOW, decoder: PCMDecoder = None):
+        """
+        Decode the file to PCM window by window, see FrameSynthesis.PCMDecoder. Only MPEG-1 Layer III frames are
+        decoded.
+
+        :param pbar: optional progress callback, see iter_tables
+        :param window: maximum number of records per chunk
+        :type window: int
+        :param decoder: decoder of the file, None for a new one (pass one to read its channels and sampling rate)
+        :type decoder: PCMDecoder
+
+        :return: generator of float32 arrays of shape (samples, channels), in file order
+        """
+        decoder = PCMDecoder(self.__file_data) if decoder is None else decoder
+        for table in self.iter_tables(pbar, window=window):
+            pcm = decoder.decode(table)
+            if len(pcm) > 0:
+                yield pcm
+
+    def decode_pcm(self, pbar=None) -> np.ndarray:
+        """
+        :return: the PCM samples of the whole file as float32 array of shape (samples, channels), see iter_pcm
+        :rtype: np.ndarray
+        """
+        chunks = list(self.iter_pcm(pbar, window=SCAN_BLOCK_SIZE))
+        return np.concatenate(chunks) if len(chunks) > 0 else np.zeros((0, 2), dtype=np.float32)
 
     def parse_file(self, pbar, flag_data, flag_hex) -> int:
         """
         decoding the mp3 file, frame by frame and saves the final pcm data.
+        The frame headers are decoded block-wise by the FrameScanner, the side information of all frames of a block
+        is decoded at once. All records are collected in one FrameTable, see iter_tables for parsing with bounded
+        memory.
 
         :return: the number of parsed frames
         :rtype: int
         """
-        frames_dict = []
-        num_of_parsed_frames = 0
-
-        while self.__valid and self.__file_length > self.__offset + HEADER_SIZE:
-            self.__init_curr_header()
-            if self.__valid:
-                self.__init_curr_frame()
-                __encoder = None
-
-                __main_data_raw = bytes(self.__buffer[self.__curr_frame.side_info.side_info_length + 4:self.__curr_frame.frame_size])
-                if __main_data_raw[0:4] == b"Xing":
-                    __encoder = "Xing"
-                if __main_data_raw[0:4] == b"Info":
-                    print("found main data info header")
-                if __main_data_raw[0:4] == b"LAME":
-                    __encoder = "LAME"
-
-                __stego_signatures = {}
-                if self.__offset + self.__curr_frame.frame_size > self.__file_length:
-                    #mp3stego signature
-                    __stego_signatures["mp3stego_defective_payload_ending"] = True
-                    print("potential stego-signature found: mp3stego")
-                if num_of_parsed_frames == 0 and self.__curr_frame.header.private and self.__curr_frame.header.copyright and self.__curr_frame.header.original and self.__curr_frame.header.emphasis == Emphasis.CCITJ17:
-                    #stegonaut signature
-                    __stego_signatures["stegonaut_header"] = True
-                    print("potential stego-signature found: stegonaut")
-                if __main_data_raw[15:19] == b"XXXX":
-                    #mp3stegz signature
-                    __stego_signatures["mp3stegz_trace"] = True
-                    print("potential stego-signature found: mp3stegz")
-
-                frames_dict.append({
-                    "position": self.__offset,
-                    "length": self.__curr_frame.frame_size,
-                    "samples": self.__curr_frame.samples_per_frame,
-                    "header": {
-                        "bitstring": self.__curr_frame.header.bitstring,
-                        "version": self.__curr_frame.header.mpeg_version,
-                        "layer": self.__curr_frame.header.layer,
-                        "crc": self.__curr_frame.header.crc,
-                        "bitrate": self.__curr_frame.get_bitrate(),
-                        "samplerate": self.__curr_frame.sampling_rate,
-                        "padding": self.__curr_frame.header.padding,
-                        "private": self.__curr_frame.header.private,
-                        "mode": str(self.__curr_frame.header.channel_mode),
-                        "modeExt": str(self.__curr_frame.header.mode_extension),
-                        "copyright": self.__curr_frame.header.copyright,
-                        "original": self.__curr_frame.header.original,
-                        "emphasis": str(self.__curr_frame.header.emphasis)
-                    },
-                    "side_info": {
-                        "bitstring": self.__curr_frame.side_info.bitstring,
-                        "position": self.__offset + 4,
-                        "length": self.__curr_frame.side_info.side_info_length,
-                        "main_data_begin": self.__curr_frame.side_info.main_data_begin,
-                        "scfsi": [
-                            "".join(["1" if b == 1 else "0" for b in self.__curr_frame.side_info.scfsi[c]]) for c in range(self.__curr_frame.header.channels)
-                        ],
-                        "granule_info": [{
-                            "part2_3_length": [self.__curr_frame.side_info.part2_3_length[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "big_value": [self.__curr_frame.side_info.big_value[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "global_gain": [self.__curr_frame.side_info.global_gain[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "scalefac_compress": [self.__curr_frame.side_info.scale_fac_compress[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "slen1": [self.__curr_frame.side_info.slen1[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "slen2": [self.__curr_frame.side_info.slen2[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "windows_switching_flag": [True if self.__curr_frame.side_info.window_switching[g][c] == 1 else False for c in range(self.__curr_frame.header.channels)],
-                            "block_type": [self.__curr_frame.side_info.block_type[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "mixed_block_flag": [True if self.__curr_frame.side_info.mixed_block_flag[g][c] == 1 else False for c in range(self.__curr_frame.header.channels)],
-                            "table_select": [[self.__curr_frame.side_info.table_select[g][c][r] for r in range(2 if self.__curr_frame.side_info.window_switching[g][c] == 1 else 3)] for c in range(self.__curr_frame.header.channels)],
-                            "subblock_gain": [[self.__curr_frame.side_info.sub_block_gain[g][c][w] for w in range(3)] if self.__curr_frame.side_info.window_switching[g][c] == 1 else None for c in range(self.__curr_frame.header.channels)],
-                            "region0_count": [self.__curr_frame.side_info.region0_count[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "region1_count": [self.__curr_frame.side_info.region1_count[g][c] for c in range(self.__curr_frame.header.channels)],
-                            "pre_flag": [True if self.__curr_frame.side_info.pre_flag[g][c] == 1 else False for c in range(self.__curr_frame.header.channels)],
-                            "scale_fac_scale": [True if self.__curr_frame.side_info.scale_fac_scale[g][c] == 1 else False for c in range(self.__curr_frame.header.channels)],
-                            "count1table_select": [True if self.__curr_frame.side_info.count1table_select[g][c] else False for c in range(self.__curr_frame.header.channels)]
-                        } for g in range(2)]
-                    },
-                    "main_data": {
-                        "position": self.__offset + 4 + self.__curr_frame.side_info.side_info_length,
-                        "length": self.__curr_frame.frame_size - self.__curr_frame.side_info.side_info_length - 4,
-                        "raw": (__main_data_raw.hex() if flag_hex else str(__main_data_raw)) if flag_data else None,
-                        "encoder": __encoder
-                    },
-                    "stego_signatures": __stego_signatures
-                })
-                # get all bits from the huffman tables
-                num_of_parsed_frames += 1
-                self.__offset += self.__curr_frame.frame_size
-                #PERF_OVERHAUL: added 6912 (theoretical maximum) as limit to speed up performance!
-                self.__buffer = self.__file_data[self.__offset:min(len(self.__file_data), self.__offset + 6912)]
-
-                pbar(self.__curr_frame.frame_size, skipped=True)
-            else:
-                next_sw = bytes(self.__buffer).find(b"\xff", 1)
-                if next_sw > 0:
-                    awkward_data = bytes(self.__file_data[self.__offset:self.__offset+next_sw])
-                    print(f"found {next_sw} bytes of awkward data behind frame {num_of_parsed_frames}")
-                    frames_dict.append({
-                        "position": self.__offset,
-                        "length": next_sw,
-                        "raw": awkward_data.hex() if flag_hex else str(awkward_data)
-                    })
-                    self.__offset += next_sw
-                    self.__buffer = self.__file_data[self.__offset:min(len(self.__file_data), self.__offset + 6912)]
-                    self.__valid = True
-                    pbar(next_sw, skipped=True)
-
-        self.__frames = np.array(frames_dict)
-
-        return num_of_parsed_frames
+        tables = list(self.iter_tables(pbar, flag_data, flag_hex, window=SCAN_BLOCK_SIZE))
+        self.__frames = FrameTable.concatenate(tables) if len(tables) > 0 else FrameTable.empty(self.__file_data, flag_data, flag_hex)
+
+        return self.__num_of_parsed_frames
+
+    def __table(self, entries: list, num_of_parsed_frames: int, flag_data: bool, flag_hex: bool) -> FrameTable:
+        """
+        :param entries: records of the current block, see __walk
+        :param num_of_parsed_frames: number of frames parsed before this block
+
+        :return: the records of the block
+        :rtype: FrameTable
+        """
+        n = len(entries)
+        header_idx = np.array([idx for _, _, idx in entries], dtype=np.int64)
+        is_frame = header_idx >= 0
+
+        records = np.zeros(n, dtype=RECORD_DTYPE)
+        records["position"] = [position for position, _, _ in entries]
+        records["length"] = [length for _, length, _ in entries]
+        records["is_frame"] = is_frame
+
+        headers = np.zeros(n, dtype=HEADER_DTYPE)
+        headers[is_frame] = self.__scanner.headers[header_idx[is_frame]]
+        side_info = np.zeros(n, dtype=SIDE_INFO_DTYPE)
+        side_info[is_frame] = decode_side_info(self.__bytes, headers["position"][is_frame], headers["crc"][is_frame],
+                                               headers["channel_mode"][is_frame] == ChannelMode.Mono.value)
+
+        window = FrameWindow(self.__bytes, records, headers, side_info, num_of_parsed_frames == 0)
+        # encoder tag at the beginning of the main data
+        tag, tag_complete = window.byte_range(ANCHOR_MAIN_DATA, 0, 4)
+        xing = is_frame & tag_complete & np.all(tag == np.frombuffer(b"Xing", dtype=np.uint8), axis=1)
+        info = is_frame & tag_complete & np.all(tag == np.frombuffer(b"Info", dtype=np.uint8), axis=1)
+        lame = is_frame & tag_complete & np.all(tag == np.frombuffer(b"LAME", dtype=np.uint8), axis=1)
+        records["encoder"][xing] = ENCODERS.index("Xing")
+        records["encoder"][lame] = ENCODERS.index("LAME")
+
+        records["stego_signatures"] = detect_frames(window, self.__detectors)
+
+        # report in file order
+        frame_number = num_of_parsed_frames + np.cumsum(is_frame) - is_frame
+        for i in np.flatnonzero(~is_frame | info | (records["stego_signatures"] != 0)):
+            if not is_frame[i]:
+                if frame_number[i] == 0:
+                    print(f"found {records['length'][i]} bytes of awkward data in front of the first frame")
+                else:
+                    print(f"found {records['length'][i]} bytes of awkward data behind frame {frame_number[i]}")
+                continue
+            if info[i]:
+                print("found main data info header")
+            for bit, sig in enumerate(STEGO_SIGNATURES):
+                if records["stego_signatures"][i] & (1 << bit):
+                    print(f"potential stego-signature found: {sig.split('_')[0]}")
+
+        if np.any(is_frame):
+            self.__bit_rate = int(headers["bit_rate"][is_frame][-1])
+
+        return FrameTable(self.__file_data, records, headers, side_info, flag_data, flag_hex)
 
     def get_bitrate(self) -> int:
         """
         :return: the bitrate of the mp3 file (and the output wav file)
         :rtype: int
         """
-        return self.__curr_frame.get_bitrate()
+        return self.__bit_rate
 
     @property
-    def frames(self):
+    def frames(self) -> FrameTable:
         return self.__frames
+
+    @property
+    def offset(self) -> int:
+        """
+        :return: the parsing offset, behind the last parsed record
+        :rtype: int
+        """
+        return self.__offset
+
+    @property
+    def num_of_parsed_frames(self) -> int:
+        return self.__num_of_parsed_frames
@@ -0,0 +1,175 @@
+from decoder.FrameHeader import *
+from decoder.FrameScanner import FrameScanner, HEADER_SIZE
+from decoder.ID3_Parser import ID3
+
+# number of chained frame headers that confirm the first frame
+PROBE_SYNC_FRAMES = 3
+# bytes of junk accepted in front of the first frame, behind the ID3v2 tag
+PROBE_MAX_JUNK = 1 << 16
+# flags of the Xing/Info header: the fields present behind the flags
+XING_FRAMES, XING_BYTES, XING_TOC, XING_QUALITY = 1, 2, 4, 8
+# the VBRI header (Fraunhofer) is at a fixed offset behind the frame header
+VBRI_OFFSET = 32
+# length of the encoder version behind the Xing/Info header, e.g. LAME3.100
+ENCODER_VERSION_LENGTH = 9
+# names of the format and codecs as reported by ffprobe
+FORMAT_NAME = "mp3"
+FORMAT_LONG_NAME = "MP2/3 (MPEG audio layer 2/3)"
+CODECS = {1: ("mp1", "MP1 (MPEG audio layer 1)"), 2: ("mp2", "MP2 (MPEG audio layer 2)"), 3: ("mp3", "MP3 (MPEG audio layer 3)")}
+# text encodings of ID3v2 text frames
+ID3_TEXT_ENCODINGS = ["latin-1", "utf-16", "utf-16-be", "utf-8"]
+
+
+def side_info_length(header) -> int:
+    """
+    :param header: record of HEADER_DTYPE
+
+    :return: the length of the side information of a layer III frame in bytes
+    :rtype: int
+    """
+    mono = header["channel_mode"] == ChannelMode.Mono.value
+    if mpeg_version_value[header["version"]] == 1:
+        return 17 if mono else 32
+    return 9 if mono else 17
+
+
+def id3_text(id3v2: ID3, frame_id: str) -> str:
+    """
+    :param id3v2: the ID3v2 tag of the file
+    :type id3v2: ID3
+    :param frame_id: id of a text frame, e.g. TSSE
+    :type frame_id: str
+
+    :return: the text of the first frame with the id, None if the tag or the frame is missing
+    :rtype: str
+    """
+    if not id3v2.is_valid:
+        return None
+    for frame in id3v2.id3_frames:
+        if frame.id == frame_id:
+            content = frame.content
+            content = content.encode("utf-8") if isinstance(content, str) else content
+            if len(content) == 0 or content[0] >= len(ID3_TEXT_ENCODINGS):
+                return None
+            return content[1:].decode(ID3_TEXT_ENCODINGS[content[0]], errors="replace").rstrip("\x00")
+    return None
+
+
+def vbr_header(data: np.ndarray, header) -> tuple:
+    """
+    Read the Xing/Info (with the encoder version of LAME and others behind it) or VBRI header in the first frame.
+
+    :param data: the file as uint8 array
+    :type data: np.ndarray
+    :param header: record of HEADER_DTYPE of the first frame
+
+    :return: the kind of the header (Xing, Info or VBRI), number of frames and bytes of the file (None if not given)
+     and the encoder version (None if not given); None if the frame holds no such header
+    :rtype: tuple
+    """
+    position = int(header["position"])
+    end = position + int(header["frame_size"])
+
+    def field(offset: int, length: int) -> bytes:
+        return bytes(data[offset:offset + length]) if offset + length <= min(end, len(data)) else None
+
+    xing = position + HEADER_SIZE + (0 if header["crc"] else 2) + side_info_length(header)
+    kind = field(xing, 4)
+    if kind in (b"Xing", b"Info") and field(xing + 4, 4) is not None:
+        flags = int.from_bytes(field(xing + 4, 4), "big")
+        offset = xing + 8
+        frames = audio_bytes = None
+        if flags & XING_FRAMES and field(offset, 4) is not None:
+            frames = int.from_bytes(field(offset, 4), "big")
+            offset += 4
+        if flags & XING_BYTES and field(offset, 4) is not None:
+            audio_bytes = int.from_bytes(field(offset, 4), "big")
+            offset += 4
+        offset += (100 if flags & XING_TOC else 0) + (4 if flags & XING_QUALITY else 0)
+        version = field(offset, ENCODER_VERSION_LENGTH)
+        encoder = version.rstrip(b"\x00 ").decode("ascii", errors="replace") if version is not None and version[:1].isalpha() else None
+        return kind.decode("ascii"), frames, audio_bytes, encoder or None
+    vbri = position + HEADER_SIZE + VBRI_OFFSET
+    if field(vbri, 4) == b"VBRI" and field(vbri + 10, 8) is not None:
+        return "VBRI", int.from_bytes(field(vbri + 14, 4), "big"), int.from_bytes(field(vbri + 10, 4), "big"), None
+    return None
+
+
+def probe_mp3(file_data: memoryview) -> dict:
+    """
+    Probe an MPEG audio file without decoding it, like ffprobe -show_format -show_streams. The duration and bit rate
+    are taken from the Xing/Info or VBRI header of the first frame, or else from a scan of all frame headers.
+
+    :param file_data: view of the whole file
+    :type file_data: memoryview
+
+    :return: the probe in the layout of the JSON output of ffprobe ("streams" and "format"), None if the file does
+     not start with MPEG audio frames
+    :rtype: dict
+    """
+    data = np.frombuffer(file_data, dtype=np.uint8)
+    id3v2 = ID3(file_data, False, False)
+    offset = id3v2.offset if id3v2.is_valid else 0
+    scanner = FrameScanner(data)
+    idx = scanner.sync(offset, PROBE_SYNC_FRAMES, len(data))
+    if idx < 0 or scanner.headers["position"][idx] > offset + PROBE_MAX_JUNK:
+        return None
+    first = scanner.headers[idx].copy()
+    sampling_rate = int(first["sampling_rate"])
+
+    tag = vbr_header(data, first) if first["layer"] == 3 else None
+    kind, frames, audio_bytes, encoder = tag if tag is not None else (None, None, None, None)
+    bit_rates = None
+    if frames is None:
+        # follow the chain of frames block by block, the frame holding the VBR header carries no audio
+        samples, audio_bytes, bit_rates = 0, 0, set()
+        while idx >= 0:
+            chain = [idx]
+            while scanner.successors[chain[-1]] >= 0:
+                chain.append(scanner.successors[chain[-1]])
+            headers = scanner.headers[chain]
+            samples += int(headers["samples"].sum())
+            audio_bytes += int(headers["frame_size"].sum())
+            bit_rates.update(headers["bit_rate"].tolist())
+            idx = scanner.find(int(headers["position"][-1]) + int(headers["frame_size"][-1]))
+        if tag is not None:
+            samples -= int(first["samples"])
+            audio_bytes -= int(first["frame_size"])
+        duration = samples / sampling_rate
+    else:
+        duration = frames * int(first["samples"]) / sampling_rate
+        if audio_bytes is None:
+            audio_bytes = len(data) - int(first["position"])
+
+    if bit_rates is not None and len(bit_rates) == 1:
+        bit_rate = bit_rates.pop()
+    elif kind == "Info":
+        # Info is the Xing header of constant bit rate files
+        bit_rate = int(first["bit_rate"])
+    else:
+        bit_rate = round(audio_bytes * 8 / duration) if duration > 0 else 0
+
+    mono = first["channel_mode"] == ChannelMode.Mono.value
+    codec_name, codec_long_name = CODECS[int(first["layer"])]
+    format_tags = {}
+    tsse = id3_text(id3v2, "TSSE")
+    if tsse or encoder:
+        format_tags["encoder"] = tsse or encoder
+    return {
+        "streams": [{
+            "index": 0,
+            "codec_name": codec_name,
+            "codec_long_name": codec_long_name,
+            "sample_rate": str(sampling_rate),
+            "channels": 1 if mono else 2,
+            "channel_layout": "mono" if mono else "stereo",
+        }],
+        "format": {
+            "format_name": FORMAT_NAME,
+            "format_long_name": FORMAT_LONG_NAME,
+            "duration": f"{duration:.6f}",
+            "size": str(len(data)),
+            "bit_rate": str(bit_rate),
+            "tags": format_tags,
+        }
+    }
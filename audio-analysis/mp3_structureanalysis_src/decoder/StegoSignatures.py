@@ -0,0 +1,284 @@
+import numpy as np
+
+from decoder.FrameHeader import Emphasis
+from decoder.FrameScanner import HEADER_DTYPE, HEADER_SIZE, RECORD_DTYPE
+from decoder.FrameSideInformation import SIDE_INFO_DTYPE
+from decoder.util import gather_bytes
+
+# anchors of the byte ranges read by the detectors
+ANCHOR_FRAME = "frame"
+ANCHOR_MAIN_DATA = "main_data"
+
+# Registered detectors by tool name, see register.
+DETECTORS: dict = {}
+# Signatures found per frame, the bit i of the stego_signatures column is set for STEGO_SIGNATURES[i].
+STEGO_SIGNATURES: list = []
+
+
+class FrameWindow:
+    """
+    The records of one parser window (or of a whole frame table) as seen by the detectors. Byte ranges are gathered
+    once per window and shared by all detectors that read them.
+
+    :param data: the file as uint8 array
+    :type data: np.ndarray
+    :param records: structured array of RECORD_DTYPE
+    :type records: np.ndarray
+    :param headers: structured array of HEADER_DTYPE, one row per record
+    :type headers: np.ndarray
+    :param side_info: structured array of SIDE_INFO_DTYPE, one row per record
+    :type side_info: np.ndarray
+    :param first_frame: True if the first frame of the window is the first frame of the file
+    :type first_frame: bool
+    """
+
+    def __init__(self, data: np.ndarray, records: np.ndarray, headers: np.ndarray, side_info: np.ndarray,
+                 first_frame: bool = False):
+        self.__data: np.ndarray = data
+        self.__records: np.ndarray = records
+        self.__headers: np.ndarray = headers
+        self.__side_info: np.ndarray = side_info
+        self.__is_frame: np.ndarray = records["is_frame"]
+        self.__first_frame: np.ndarray = np.zeros(len(records), dtype=np.bool_)
+        if first_frame and np.any(self.__is_frame):
+            self.__first_frame[np.argmax(self.__is_frame)] = True
+        self.__byte_ranges: dict = {}
+
+    def byte_range(self, anchor: str, offset: int, count: int) -> tuple:
+        """
+        Bytes of every record, relative to the beginning of the frame or of its main data. Only bytes inside the
+        record (and the file) are read.
+
+        :param anchor: ANCHOR_FRAME or ANCHOR_MAIN_DATA
+        :type anchor: str
+        :param offset: offset to the anchor
+        :type offset: int
+        :param count: number of bytes
+        :type count: int
+
+        :return: uint8 array of shape (records, count) and a boolean array that marks the records holding all bytes
+        :rtype: tuple
+        """
+        key = (anchor, offset, count)
+        if key not in self.__byte_ranges:
+            start = self.__records["position"] + offset
+            if anchor == ANCHOR_MAIN_DATA:
+                start = start + HEADER_SIZE + self.__side_info["side_info_length"]
+            end = np.minimum(self.__records["position"] + self.__records["length"], len(self.__data))
+            self.__byte_ranges[key] = (gather_bytes(self.__data, start, count, end), start + count <= end)
+        return self.__byte_ranges[key]
+
+    @property
+    def records(self) -> np.ndarray:
+        return self.__records
+
+    @property
+    def headers(self) -> np.ndarray:
+        return self.__headers
+
+    @property
+    def side_info(self) -> np.ndarray:
+        return self.__side_info
+
+    @property
+    def is_frame(self) -> np.ndarray:
+        return self.__is_frame
+
+    @property
+    def first_frame(self) -> np.ndarray:
+        return self.__first_frame
+
+    @property
+    def file_length(self) -> int:
+        return len(self.__data)
+
+
+class StegoDetector:
+    """
+    Base class of the stego-signature detectors. A detector looks at a whole window of records at once and returns a
+    boolean array per signature (detect_frames); signatures of the whole file are computed on the columns of all
+    frames (detect_file).
+    """
+
+    # name of the tool, prefix of all signatures
+    tool: str = ""
+    # signatures found per frame
+    frame_signatures: tuple = ()
+    # signatures of the whole file
+    file_signatures: tuple = ()
+    # columns of RECORD_DTYPE, HEADER_DTYPE and SIDE_INFO_DTYPE read by the detector
+    columns: tuple = ()
+    # byte ranges read by the detector, as (anchor, offset, count)
+    byte_ranges: tuple = ()
+
+    def detect_frames(self, window: FrameWindow) -> dict:
+        """
+        :param window: the records to check
+        :type window: FrameWindow
+
+        :return: boolean array over the records of the window for every signature of frame_signatures
+        :rtype: dict
+        """
+        return {}
+
+    def detect_file(self, records: np.ndarray, headers: np.ndarray) -> dict:
+        """
+        :param records: structured array of RECORD_DTYPE, all records of the file
+        :type records: np.ndarray
+        :param headers: structured array of HEADER_DTYPE, one row per record
+        :type headers: np.ndarray
+
+        :return: count for every signature of file_signatures that was found
+        :rtype: dict
+        """
+        return {}
+
+    def score(self, counts: dict) -> float:
+        """
+        :param counts: the number of hits of every signature of the detector that was found
+        :type counts: dict
+
+        :return: the file-level score between 0 (no signature) and 1 (all signatures found)
+        :rtype: float
+        """
+        signatures = self.frame_signatures + self.file_signatures
+        return len([sig for sig in signatures if counts.get(sig, 0) > 0]) / len(signatures) if signatures else 0.0
+
+
+def register(detector_class):
+    """
+    Class decorator that adds a detector to DETECTORS. The frame signatures get the next free bits.
+
+    :param detector_class: subclass of StegoDetector
+    :return: the detector class
+    """
+    detector = detector_class()
+    names = set(RECORD_DTYPE.names) | set(HEADER_DTYPE.names) | set(SIDE_INFO_DTYPE.names)
+    unknown = [column for column in detector.columns if column not in names]
+    unknown += [anchor for anchor, _, _ in detector.byte_ranges if anchor not in (ANCHOR_FRAME, ANCHOR_MAIN_DATA)]
+    if unknown:
+        raise ValueError(f"detector {detector.tool} reads unknown columns or byte ranges {unknown}")
+    if len(STEGO_SIGNATURES) + len(detector.frame_signatures) > RECORD_DTYPE["stego_signatures"].itemsize * 8:
+        raise ValueError(f"no free bits for the signatures of detector {detector.tool}")
+    DETECTORS[detector.tool] = detector
+    STEGO_SIGNATURES.extend(detector.frame_signatures)
+    return detector_class
+
+
+def select(tools: list = None) -> list:
+    """
+    :param tools: names of the tools, None for all registered detectors
+    :type tools: list
+
+    :return: the detectors
+    :rtype: list
+    """
+    if tools is None:
+        return list(DETECTORS.values())
+    unknown = [tool for tool in tools if tool not in DETECTORS]
+    if unknown:
+        raise ValueError(f"unknown stego detectors {unknown}, available: {list(DETECTORS)}")
+    return [DETECTORS[tool] for tool in tools]
+
+
+def detect_frames(window: FrameWindow, detectors: list) -> np.ndarray:
+    """
+    Run the frame detectors over a window.
+
+    :param window: the records to check
+    :type window: FrameWindow
+    :param detectors: the detectors to run
+    :type detectors: list
+
+    :return: the stego_signatures column of the window
+    :rtype: np.ndarray
+    """
+    signatures = np.zeros(len(window.records), dtype=RECORD_DTYPE["stego_signatures"])
+    for detector in detectors:
+        for sig, found in detector.detect_frames(window).items():
+            signatures[found] |= 1 << STEGO_SIGNATURES.index(sig)
+    return signatures
+
+
+def summarize(records: np.ndarray, headers: np.ndarray, detectors: list) -> tuple:
+    """
+    :param records: structured array of RECORD_DTYPE, all records of the file
+    :type records: np.ndarray
+    :param headers: structured array of HEADER_DTYPE, one row per record
+    :type headers: np.ndarray
+    :param detectors: the detectors that ran
+    :type detectors: list
+
+    :return: the number of hits per signature grouped by tool (file signatures first, then the frame signatures in
+     order of the first occurrence) and the score per tool
+    :rtype: tuple
+    """
+    global_signatures_dict = {}
+    for detector in detectors:
+        for sig, count in detector.detect_file(records, headers).items():
+            global_signatures_dict.setdefault(detector.tool, {})[sig] = count
+
+    found = []
+    for detector in detectors:
+        for sig in detector.frame_signatures:
+            hits = np.flatnonzero(records["stego_signatures"] & (1 << STEGO_SIGNATURES.index(sig)))
+            if len(hits) > 0:
+                found.append((int(hits[0]), STEGO_SIGNATURES.index(sig), detector.tool, sig, len(hits)))
+    for _, _, tool, sig, count in sorted(found):
+        global_signatures_dict.setdefault(tool, {})[sig] = count
+
+    scores = {detector.tool: detector.score(global_signatures_dict.get(detector.tool, {})) for detector in detectors}
+    return global_signatures_dict, scores
+
+
+@register
+class MP3StegoDetector(StegoDetector):
+    """
+    MP3Stego writes the last frame beyond the end of the file and encodes with a constant bitrate.
+    """
+
+    tool = "mp3stego"
+    frame_signatures = ("mp3stego_defective_payload_ending",)
+    file_signatures = ("mp3stego_constant_bitrate",)
+    columns = ("position", "length", "is_frame", "bit_rate")
+
+    def detect_frames(self, window: FrameWindow) -> dict:
+        records = window.records
+        return {"mp3stego_defective_payload_ending": window.is_frame & (records["position"] + records["length"] > window.file_length)}
+
+    def detect_file(self, records: np.ndarray, headers: np.ndarray) -> dict:
+        bit_rate = headers["bit_rate"][records["is_frame"]]
+        if len(bit_rate) > 0 and bit_rate.min() == bit_rate.max():
+            return {"mp3stego_constant_bitrate": 1}
+        return {}
+
+
+@register
+class StegonautDetector(StegoDetector):
+    """
+    Stegonaut sets the private, copyright and original bits and the emphasis CCIT J.17 in the first frame.
+    """
+
+    tool = "stegonaut"
+    frame_signatures = ("stegonaut_header",)
+    columns = ("is_frame", "private", "copyright", "original", "emphasis")
+
+    def detect_frames(self, window: FrameWindow) -> dict:
+        headers = window.headers
+        return {"stegonaut_header": window.first_frame & headers["private"] & headers["copyright"] & headers["original"] & (headers["emphasis"] == Emphasis.CCITJ17.value)}
+
+
+@register
+class MP3StegzDetector(StegoDetector):
+    """
+    MP3Stegz leaves the marker XXXX at byte 15 of the main data.
+    """
+
+    tool = "mp3stegz"
+    frame_signatures = ("mp3stegz_trace",)
+    columns = ("position", "length", "is_frame", "side_info_length")
+    byte_ranges = ((ANCHOR_MAIN_DATA, 15, 4),)
+
+    def detect_frames(self, window: FrameWindow) -> dict:
+        trace, complete = window.byte_range(ANCHOR_MAIN_DATA, 15, 4)
+        return {"mp3stegz_trace": window.is_frame & complete & np.all(trace == np.frombuffer(b"XXXX", dtype=np.uint8), axis=1)}
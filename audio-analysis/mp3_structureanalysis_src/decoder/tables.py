@@ -48,6 +48,24 @@ slen = [[0, 0], [0, 1], [0, 2], [0, 3], [3, 0], [1, 1], [1, 2], [1, 3],
 pre_tab = np.array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 3, 3, 3, 2])
 quad_table_1 = QuadTable()
 
+# Frame header tables, indexed by the raw header bits: [version bits][layer bits][bitrate index] etc.
+# version bits: 0 = MPEG 2.5, 1 = reserved, 2 = MPEG 2, 3 = MPEG 1
+# layer bits: 0 = reserved, 1 = layer III, 2 = layer II, 3 = layer I
+mpeg_version_value = [2.5, 0, 2, 1]
+_bit_rate_v1 = [[0] * 16,
+                [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+                [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384, 0],
+                [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448, 0]]
+_bit_rate_v2 = [[0] * 16,
+                [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+                [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+                [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256, 0]]
+bit_rate_table = np.array([_bit_rate_v2, [[0] * 16] * 4, _bit_rate_v2, _bit_rate_v1], dtype=np.int32) * 1000
+sampling_rate_table = np.array([[11025, 12000, 8000, 0], [0, 0, 0, 0],
+                                [22050, 24000, 16000, 0], [44100, 48000, 32000, 0]], dtype=np.int32)
+samples_per_frame_table = np.array([[0, 576, 1152, 384], [0, 0, 0, 0],
+                                    [0, 576, 1152, 384], [0, 1152, 1152, 384]], dtype=np.int32)
+
 
 # The Huffman values are stored within INT types and are shifted towards the most
 def unpack_table(hft):
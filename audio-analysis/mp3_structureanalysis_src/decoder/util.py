@@ -1,6 +1,54 @@
-BYTE_LENGTH = 8
+import mmap
+import os
+
+import numpy as np
+
+from decoder.BitReader import BitReader, BYTE_LENGTH
 
 H0 = {3, 6, 8, 11, 12, 15, 17, 19, 21, 23, 24, 26, 28, 30}
+# hidden bit of every huffman table number (0 for the tables of H0, 1 otherwise), 255 for table 0 that carries none
+TABLE_SELECT_BITS = np.array([255] + [0 if table in H0 else 1 for table in range(1, 32)], dtype=np.uint8)
+
+
+def map_file(path) -> memoryview:
+    """
+    Map a file read-only into memory. The pages are backed by the page cache, the file content is never copied into
+    the python heap.
+
+    :param path: path of the file
+
+    :return: read-only view of the file content
+    :rtype: memoryview
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files can not be mapped
+            return memoryview(b"")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def gather_bytes(data: np.ndarray, starts: np.ndarray, count: int, ends: np.ndarray = None) -> np.ndarray:
+    """
+    Collect count bytes from every start position at once. Bytes behind the end of the data (or behind ends) are zero.
+
+    :param data: the file as uint8 array
+    :type data: np.ndarray
+    :param starts: the start positions
+    :type starts: np.ndarray
+    :param count: number of bytes per position
+    :type count: int
+    :param ends: optional exclusive end position for every start position
+    :type ends: np.ndarray
+
+    :return: uint8 array of shape (len(starts), count)
+    :rtype: np.ndarray
+    """
+    idx = np.asarray(starts, dtype=np.int64)[:, None] + np.arange(count)
+    limit = len(data) if ends is None else np.minimum(np.asarray(ends, dtype=np.int64), len(data))[:, None]
+    outside = idx >= limit
+    result = data[np.minimum(idx, len(data) - 1)] if len(data) > 0 else np.zeros(idx.shape, dtype=np.uint8)
+    result[outside] = 0
+    return result
 
 
 def char_to_int(four_bytes: list) -> int:
@@ -19,9 +67,10 @@ def char_to_int(four_bytes: list) -> int:
     return int(num)
 
 
-def get_bits(buffer: list, start_bit: int, slice_len: int):
+def get_bits(buffer, start_bit: int, slice_len: int):
     """
-    Assumes that end_bit is greater than start_bit and that the result is less than 32 bits, length of an unsigned type.
+    Assumes that end_bit is greater than start_bit. Bits behind the end of the buffer are read as zeros.
+    For sequential reads use decoder.BitReader instead.
 
     :param buffer: buffer of bytes
     :param start_bit: the starting bit
@@ -29,53 +78,33 @@ def get_bits(buffer: list, start_bit: int, slice_len: int):
 
     :return: the bits from buffer[start_bit] to buffer[start_bit + slice_len]. transform the bytes from buffer into bits
     """
-    # exclude the last bit of the slice
-    end_bit = start_bit + slice_len - 1
-
-    start_byte = start_bit >> 3
-    end_byte = end_bit >> 3
-
-    buff_copy = buffer.copy()
-
-    buff_len = len(buffer)
-    if end_byte >= buff_len:
-        # pad with zeros
-        buff_copy.extend([0 for _ in range(end_byte - buff_len + 1)])
-
-    bits = []
-    for idx in range(start_byte, end_byte + 1):
-        num = buff_copy[idx]
-        out = [1 if num & (1 << (BYTE_LENGTH - 1 - n)) else 0 for n in range(BYTE_LENGTH)]
-        bits.extend(out)
-
-    # update to relative positions in the bits array
-    start_bit %= 8
-    end_bit = start_bit + slice_len - 1
+    reader = BitReader(buffer)
+    reader.seek(start_bit)
+    return reader.read_bits(slice_len)
 
-    bit_slice = bits[start_bit:end_bit + 1]
 
-    result = 0
-
-    bit_slice.reverse()
+def bits_from_table_select(table_select: np.ndarray) -> np.ndarray:
+    """
+    calc the bits hidden in the selection of the huffman tables of many frames at once, according to the steganography.
+    Unused regions (table 0) carry no bit.
 
-    for i in range(len(bit_slice)):
-        result += (2 ** i) * bit_slice[i]
+    :param table_select: huffman tables used, indexed [frame][channel][granule][region]
+    :type table_select: np.ndarray
 
-    return result
+    :return: uint8 array of the bits, in the order of the tables
+    :rtype: np.ndarray
+    """
+    bits = TABLE_SELECT_BITS[np.asarray(table_select, dtype=np.uint8).reshape(-1)]
+    return bits[bits != 255]
 
 
 def bit_from_huffman_tables(all_huffman_tables):
     """
-    calc the bits from the huffman tables, according to the steganography
+    calc the bits from the huffman tables of the last frame, according to the steganography
 
-    :param all_huffman_tables: list of huffman tables used.
+    :param all_huffman_tables: huffman tables used, indexed [frame][channel][granule][region] (see Frame.all_huffman_tables)
 
     :return: string contains bits
     """
-
-    s = ""
-    for x in all_huffman_tables[-1]:
-        if x == 0:
-            continue
-        s += "0" if x in H0 else "1"
-    return s
+    bits = bits_from_table_select(all_huffman_tables[-1:])
+    return (bits + ord("0")).tobytes().decode("ascii")
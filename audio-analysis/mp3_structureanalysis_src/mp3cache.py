@@ -0,0 +1,162 @@
+#################### License #########################################
+#
+# BSD-3-Clause / “New BSD License”
+#
+# Copyright 2023 Otto-von-Guericke University Magdeburg, Advanced Multimedia and Security Lab (AMSL), Christian Kraetzer, Bernhard Birnbaum
+# All rights reserved
+#
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote products derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS “AS IS” AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+#
+#######################################################################
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+
+from decoder.MP3_Parser import PARSER_VERSION
+from mp3export import ColumnarAnalysis, ColumnarWriter, COLUMNAR_META
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "mp3filestructureanalyser"
+DEFAULT_CACHE_SIZE = 1 << 30
+# maps the identity of a file (device, inode, size, mtime) to the SHA-256 of its content
+INDEX_FILE = "index.json"
+HASH_CHUNK_SIZE = 1 << 24
+
+
+class AnalysisCache:
+    """
+    On-disk cache of parsed frame tables. An entry is a columnar export (see mp3export.ColumnarWriter, without the
+    data blob) named by the SHA-256 of the file content and the parser version. The hash of a file is looked up by its
+    device, inode, size and mtime first, so unchanged files are never read twice. The least recently used entries are
+    evicted when the cache grows beyond max_size.
+
+    :param directory: directory of the cache
+    :type directory: Path
+    :param max_size: maximum size of all entries in bytes
+    :type max_size: int
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_CACHE_SIZE):
+        self.__directory: Path = Path(directory)
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        self.__max_size: int = max_size
+        self.__index: dict = {}
+        # entry written by the current writer
+        self.__pending: Path = None
+        if (self.__directory / INDEX_FILE).exists():
+            with open(self.__directory / INDEX_FILE, "r") as f:
+                self.__index = json.load(f)
+
+    def __save_index(self):
+        partial_path = self.__directory / (INDEX_FILE + ".part")
+        with open(partial_path, "w") as f:
+            json.dump(self.__index, f)
+        partial_path.replace(self.__directory / INDEX_FILE)
+
+    def __entry(self, path: Path, file_data: memoryview) -> Path:
+        """
+        :return: the directory of the entry of the file (that might not exist)
+        :rtype: Path
+        """
+        stat = os.stat(path)
+        identity = f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+        if identity not in self.__index:
+            digest = hashlib.sha256()
+            for start in range(0, len(file_data), HASH_CHUNK_SIZE):
+                digest.update(file_data[start:start + HASH_CHUNK_SIZE])
+            self.__index[identity] = digest.hexdigest()
+            self.__save_index()
+        return self.__directory / f"{self.__index[identity]}-{PARSER_VERSION}"
+
+    def load(self, path: Path, file_data: memoryview, flag_data: bool, flag_hex: bool) -> ColumnarAnalysis:
+        """
+        :param path: path of the analysed file
+        :type path: Path
+        :param file_data: view of the analysed file
+        :type file_data: memoryview
+        :param flag_data: include the main data in the records
+        :type flag_data: bool
+        :param flag_hex: store binary data as hex
+        :type flag_hex: bool
+
+        :return: the cached analysis of the file, None if there is none
+        :rtype: ColumnarAnalysis
+        """
+        entry = self.__entry(path, file_data)
+        if not (entry / COLUMNAR_META).exists():
+            return None
+        # the modification time of the entry orders the eviction
+        os.utime(entry)
+        return ColumnarAnalysis(entry, flag_data, flag_hex, file_data)
+
+    def writer(self, path: Path, file_data: memoryview) -> ColumnarWriter:
+        """
+        :param path: path of the analysed file
+        :type path: Path
+        :param file_data: view of the analysed file
+        :type file_data: memoryview
+
+        :return: writer for a new entry of the file, it is only visible after store
+        :rtype: ColumnarWriter
+        """
+        self.__pending = self.__entry(path, file_data)
+        return ColumnarWriter(self.__pending.with_name(self.__pending.name + ".part"), file_data, write_data=False)
+
+    def store(self, writer: ColumnarWriter, meta: dict):
+        """
+        Close the writer of the new entry, publish it and evict the least recently used entries.
+
+        :param writer: the writer returned by writer
+        :type writer: ColumnarWriter
+        :param meta: the meta data of the entry
+        :type meta: dict
+        """
+        writer.close(meta)
+        partial_path = self.__pending.with_name(self.__pending.name + ".part")
+        shutil.rmtree(self.__pending, ignore_errors=True)
+        partial_path.rename(self.__pending)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits into max_size.
+        """
+        entries = [entry for entry in self.__directory.iterdir() if entry.is_dir()]
+        sizes = {entry: sum(f.stat().st_size for f in entry.iterdir()) for entry in entries}
+        total = sum(sizes.values())
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.__max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= sizes[entry]
+
+        # forget the hashes of evicted files
+        digests = {entry.name.split("-")[0] for entry in self.__directory.iterdir() if entry.is_dir()}
+        self.__index = {identity: digest for identity, digest in self.__index.items() if digest in digests}
+        self.__save_index()
+
+    def clear(self) -> int:
+        """
+        Remove all entries and the index.
+
+        :return: the number of removed entries
+        :rtype: int
+        """
+        entries = [entry for entry in self.__directory.iterdir() if entry.is_dir()]
+        for entry in entries:
+            shutil.rmtree(entry, ignore_errors=True)
+        self.__index = {}
+        (self.__directory / INDEX_FILE).unlink(missing_ok=True)
+        return len(entries)
@@ -0,0 +1,393 @@
+#################### License #########################################
+#
+# BSD-3-Clause / “New BSD License”
+#
+# Copyright 2023 Otto-von-Guericke University Magdeburg, Advanced Multimedia and Security Lab (AMSL), Christian Kraetzer, Bernhard Birnbaum
+# All rights reserved
+#
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote products derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS “AS IS” AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+#
+#######################################################################
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from decoder.FrameScanner import HEADER_DTYPE
+from decoder.FrameSideInformation import SIDE_INFO_DTYPE
+from decoder.FrameTable import FrameTable, RECORD_DTYPE, HEADER_SIZE
+from decoder.util import map_file
+
+NDJSON_HEADER = "header"
+NDJSON_FRAME = "frame"
+NDJSON_AWKWARD = "awkward"
+NDJSON_TRAILER = "trailer"
+
+# parts of the file structure, as yielded by iter_structure
+STRUCTURE_ID3V2 = "id3v2"
+STRUCTURE_FRAME = "mpeg_frame_data"
+STRUCTURE_ID3V1 = "id3v1.1"
+# number of characters read at once by the incremental JSON reader
+READ_CHUNK_SIZE = 1 << 20
+
+# files of a columnar export directory
+COLUMNAR_META = "meta.json"
+COLUMNAR_RECORDS = "records.npy"
+COLUMNAR_HEADERS = "headers.npy"
+COLUMNAR_SIDE_INFO = "side_info.npy"
+COLUMNAR_MAIN_DATA = "main_data.npy"
+COLUMNAR_DATA = "data.bin"
+
+# index of the main data of every record in the data blob, awkward data has no main data (offset -1)
+MAIN_DATA_DTYPE = np.dtype([
+    ("offset", np.int64),
+    ("length", np.int32),
+])
+
+
+class NDJSONWriter:
+    """
+    Writes the structure of an mp3 file as newline delimited JSON: a header line (file and ID3v2 info), one line per
+    record (frame or awkward data) and a trailer line (ID3v1 info, global header info and stego signatures). Every line
+    carries its kind in the field "type".
+
+    :param path: path of the output file
+    :type path: Path
+    """
+
+    def __init__(self, path: Path):
+        self.__file = open(path, "w")
+        self.__lines: int = 0
+
+    def write(self, record_type: str, record: dict):
+        """
+        :param record_type: kind of the line (NDJSON_HEADER, NDJSON_FRAME, NDJSON_AWKWARD or NDJSON_TRAILER)
+        :type record_type: str
+        :param record: the content of the line
+        :type record: dict
+        """
+        self.__file.write(json.dumps({"type": record_type, **record}))
+        self.__file.write("\n")
+        self.__lines += 1
+
+    def write_records(self, records):
+        """
+        Write the records of a FrameTable (or any iterable of record dicts) and flush them to the file.
+
+        :param records: iterable of record dicts, frames have a "header"
+        """
+        for record in records:
+            self.write(NDJSON_FRAME if "header" in record else NDJSON_AWKWARD, record)
+        self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+    @property
+    def lines(self) -> int:
+        return self.__lines
+
+
+class ColumnarWriter:
+    """
+    Writes the structure of an mp3 file as directory of memory-mappable columns: the records, headers and side info
+    of the FrameTable as .npy files, the raw bytes of all records as one blob (data.bin) with an index of the main data
+    of every frame (main_data.npy) and the remaining analysis (file, ID3 and global info) as meta.json.
+    The blob is written while parsing, the columns when the writer is closed.
+
+    :param path: path of the output directory
+    :type path: Path
+    :param file_data: view of the whole file
+    :type file_data: memoryview
+    :param write_data: write the data blob, without it the export can only be loaded together with the analysed file
+    :type write_data: bool
+    """
+
+    def __init__(self, path: Path, file_data: memoryview, write_data: bool = True):
+        self.__path: Path = Path(path)
+        self.__path.mkdir(parents=True, exist_ok=True)
+        self.__file_data: memoryview = file_data
+        self.__data = open(self.__path / COLUMNAR_DATA, "wb") if write_data else None
+        self.__data_offset: int = -1
+        self.__data_length: int = 0
+        self.__records: list = []
+        self.__headers: list = []
+        self.__side_info: list = []
+        self.__main_data: list = []
+
+    def write_table(self, table: FrameTable):
+        """
+        :param table: the next records of the file, the records of all tables have to be contiguous
+        :type table: FrameTable
+        """
+        if len(table) == 0:
+            return
+        records = table.records
+        start = int(records["position"][0])
+        end = int(records["position"][-1] + records["length"][-1])
+        if self.__data_offset < 0:
+            self.__data_offset = start
+        if self.__data is not None:
+            self.__data.write(self.__file_data[start:end])
+            self.__data_length += end - start
+
+        side_info_length = table.side_info["side_info_length"].astype(np.int64)
+        main_data = np.zeros(len(table), dtype=MAIN_DATA_DTYPE)
+        # without blob the offsets refer to the analysed file
+        base = self.__data_offset if self.__data is not None else 0
+        main_data["offset"] = np.where(records["is_frame"], records["position"] - base + HEADER_SIZE + side_info_length, -1)
+        main_data["length"] = np.where(records["is_frame"], records["length"] - HEADER_SIZE - side_info_length, 0)
+
+        self.__records.append(records)
+        self.__headers.append(table.headers)
+        self.__side_info.append(table.side_info)
+        self.__main_data.append(main_data)
+
+    def close(self, meta: dict):
+        """
+        :param meta: the analysis without the frame data (file, size, global_header_info, ID3 info, ...)
+        :type meta: dict
+        """
+        if self.__data is not None:
+            self.__data.close()
+        np.save(self.__path / COLUMNAR_RECORDS, np.concatenate(self.__records) if self.__records else np.zeros(0, dtype=RECORD_DTYPE))
+        np.save(self.__path / COLUMNAR_HEADERS, np.concatenate(self.__headers) if self.__headers else np.zeros(0, dtype=HEADER_DTYPE))
+        np.save(self.__path / COLUMNAR_SIDE_INFO, np.concatenate(self.__side_info) if self.__side_info else np.zeros(0, dtype=SIDE_INFO_DTYPE))
+        np.save(self.__path / COLUMNAR_MAIN_DATA, np.concatenate(self.__main_data) if self.__main_data else np.zeros(0, dtype=MAIN_DATA_DTYPE))
+        with open(self.__path / COLUMNAR_META, "w") as f:
+            json.dump({**meta, "data_offset": max(self.__data_offset, 0) if self.__data is not None else 0, "data_length": self.__data_length}, f, indent=2)
+
+
+class ColumnarAnalysis:
+    """
+    Loads a directory written by ColumnarWriter. All columns and the data blob are memory mapped, nothing is read
+    before it is accessed.
+
+    :param path: path of the export directory
+    :type path: Path
+    :param flag_data: include the main data in the record dicts of the table
+    :type flag_data: bool
+    :param flag_hex: store binary data as hex in the record dicts of the table
+    :type flag_hex: bool
+    :param file_data: view of the analysed file, replaces the data blob (required if it was not written)
+    :type file_data: memoryview
+    """
+
+    def __init__(self, path: Path, flag_data: bool = True, flag_hex: bool = True, file_data: memoryview = None):
+        path = Path(path)
+        with open(path / COLUMNAR_META, "r") as f:
+            self.__meta: dict = json.load(f)
+        if file_data is not None:
+            # the columns refer to the file itself
+            self.__meta["data_offset"] = 0
+        self.__data: memoryview = map_file(path / COLUMNAR_DATA) if file_data is None else file_data
+        self.__main_data: np.ndarray = np.load(path / COLUMNAR_MAIN_DATA, mmap_mode="r")
+        self.__table: FrameTable = FrameTable(self.__data,
+                                              np.load(path / COLUMNAR_RECORDS, mmap_mode="r"),
+                                              np.load(path / COLUMNAR_HEADERS, mmap_mode="r"),
+                                              np.load(path / COLUMNAR_SIDE_INFO, mmap_mode="r"),
+                                              flag_data, flag_hex, self.__meta["data_offset"])
+
+    def main_data_bytes(self, i: int) -> memoryview:
+        """
+        :param i: index of the record
+        :type i: int
+
+        :return: the main data of the record, empty for awkward data
+        :rtype: memoryview
+        """
+        offset, length = int(self.__main_data["offset"][i]), int(self.__main_data["length"][i])
+        return self.__data[offset:offset + length] if offset >= 0 else self.__data[0:0]
+
+    @property
+    def meta(self) -> dict:
+        return self.__meta
+
+    @property
+    def table(self) -> FrameTable:
+        return self.__table
+
+    @property
+    def main_data(self) -> np.ndarray:
+        return self.__main_data
+
+    @property
+    def data(self) -> memoryview:
+        return self.__data
+
+
+class JSONStream:
+    """
+    Incremental reader for a JSON document: values are decoded one at a time from a sliding buffer, so a single
+    value (e.g. one frame) has to fit into memory, the document does not.
+
+    :param f: text file opened for reading
+    """
+
+    def __init__(self, f):
+        self.__file = f
+        self.__buffer: str = ""
+        self.__index: int = 0
+        self.__eof: bool = False
+        self.__decoder: json.JSONDecoder = json.JSONDecoder()
+
+    def __fill(self) -> bool:
+        """
+        Append the next chunk to the buffer and drop the consumed part.
+
+        :return: False at the end of the file
+        :rtype: bool
+        """
+        if self.__eof:
+            return False
+        chunk = self.__file.read(READ_CHUNK_SIZE)
+        if chunk == "":
+            self.__eof = True
+            return False
+        self.__buffer = self.__buffer[self.__index:] + chunk
+        self.__index = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        :return: the next character that is not whitespace, "" at the end of the file
+        :rtype: str
+        """
+        while True:
+            while self.__index < len(self.__buffer) and self.__buffer[self.__index] in " \t\r\n":
+                self.__index += 1
+            if self.__index < len(self.__buffer) or not self.__fill():
+                return self.__buffer[self.__index:self.__index + 1]
+
+    def expect(self, char: str):
+        """
+        Consume the next character that is not whitespace, it has to be char.
+
+        :param char: the expected character
+        :type char: str
+        """
+        if self.peek() != char:
+            raise ValueError(f"invalid JSON input: expected '{char}' at '{self.__buffer[self.__index:self.__index + 20]}'")
+        self.__index += 1
+
+    def value(self):
+        """
+        :return: the next value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__index)
+                # a number could continue in the next chunk
+                if end < len(self.__buffer) or self.__eof:
+                    self.__index = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise
+            self.__fill()
+
+    def key(self) -> str:
+        """
+        :return: the next key of an object, including the colon
+        :rtype: str
+        """
+        key = self.value()
+        self.expect(":")
+        return key
+
+    def items(self):
+        """
+        Iterate over the object at the cursor. The value of every key has to be consumed before the next key is read.
+
+        :return: generator of the keys
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.expect("}")
+            return
+        while True:
+            yield self.key()
+            if self.peek() == ",":
+                self.expect(",")
+            else:
+                self.expect("}")
+                return
+
+    def elements(self):
+        """
+        Iterate over the values of the array at the cursor.
+
+        :return: generator of the values
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.expect("]")
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.expect(",")
+            else:
+                self.expect("]")
+                return
+
+
+def iter_structure(path: Path):
+    """
+    Read the file structure of a JSON or NDJSON export incrementally.
+
+    :param path: path of the export
+    :type path: Path
+
+    :return: generator of (part, value) tuples: (STRUCTURE_ID3V2, dict or None), (STRUCTURE_FRAME, record dict) for
+     every record, (STRUCTURE_ID3V1, dict or None)
+    """
+    with open(path, "r") as f:
+        first_line = f.readline()
+        try:
+            header = json.loads(first_line)
+        except json.JSONDecodeError:
+            header = None
+
+        if isinstance(header, dict) and header.get("type") == NDJSON_HEADER:
+            yield STRUCTURE_ID3V2, header["id3v2"]
+            for line in f:
+                record = json.loads(line)
+                record_type = record.pop("type")
+                if record_type == NDJSON_TRAILER:
+                    yield STRUCTURE_ID3V1, record["id3v1.1"]
+                else:
+                    yield STRUCTURE_FRAME, record
+            return
+
+        f.seek(0)
+        stream = JSONStream(f)
+        # the ID3v1 tag is held back until all frames are written
+        id3v1 = None
+        for key in stream.items():
+            if key != "structure":
+                stream.value()
+                continue
+            for part in stream.items():
+                if part == STRUCTURE_FRAME:
+                    for record in stream.elements():
+                        yield STRUCTURE_FRAME, record
+                elif part == STRUCTURE_ID3V2:
+                    yield STRUCTURE_ID3V2, stream.value()
+                elif part == STRUCTURE_ID3V1:
+                    id3v1 = stream.value()
+                else:
+                    stream.value()
+        yield STRUCTURE_ID3V1, id3v1
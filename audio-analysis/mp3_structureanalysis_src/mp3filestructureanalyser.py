@@ -20,15 +20,22 @@
 #######################################################################
 
 import argparse
-import ast
 import json
+import os
 from pathlib import Path
+import shutil
 import sys
 
 from alive_progress import alive_bar
 from decoder.ID3_Parser import ID3, ID3v1
-from decoder.MP3_Parser import MP3Parser
+from decoder.FrameTable import FrameTable, ENCODERS, global_header_info
+from decoder.MP3_Parser import MP3Parser, PARSE_WINDOW
+from decoder.StegoSignatures import DETECTORS, select, summarize
+from decoder.util import map_file
+from mp3cache import AnalysisCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from mp3export import ColumnarAnalysis, ColumnarWriter, NDJSONWriter, NDJSON_HEADER, NDJSON_TRAILER, iter_structure, STRUCTURE_ID3V2, STRUCTURE_FRAME
 import mp3utils
+import numpy as np
 from texttable import Texttable
 
 parser = argparse.ArgumentParser(
@@ -36,12 +43,20 @@ parser = argparse.ArgumentParser(
     description="extracts a description of the structure of the analysed mp3 file",
     epilog="MP3 decoder by tomershay100, but heavily tweaked (https://github.com/tomershay100/mp3-steganography-lib)"
 )
-parser.add_argument("-i", "--input", type=str, required=True, help="input has to be the MP3 file to be analysed")
+parser.add_argument("-i", "--input", type=str, default=None, help="input has to be the MP3 file to be analysed (required)")
 parser.add_argument("-o", "--output", type=str, default=None, help="output will be a JSON file with the description of the structure of the analysed file")
 parser.add_argument("-d", "--data", action='store_true', help="include mpeg frame data in output json")
 parser.add_argument("-f", "--force", action='store_true', help="allow overwriting of existing output path")
 parser.add_argument("-r", "--reconstruct", action='store_true', help="restore mp3 file from JSON export (given JSON file must have been generated using --data option)")
 parser.add_argument("--hex", action='store_true', help="store binary data as hex")
+output_format = parser.add_mutually_exclusive_group()
+output_format.add_argument("--ndjson", action='store_true', help="stream the output as newline delimited JSON (header line, one line per frame, trailer line) while parsing")
+parser.add_argument("--cache", action='store_true', help="reuse the parsed frames of an earlier run on the same file content (and store them for later runs)")
+parser.add_argument("--cache-dir", type=str, default=str(DEFAULT_CACHE_DIR), help="directory of the analysis cache")
+parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE >> 20, help="maximum size of the analysis cache in MB, least recently used analyses are evicted")
+parser.add_argument("--clear-cache", action='store_true', help="remove all cached analyses and exit")
+parser.add_argument("--detectors", type=str, default=None, help=f"comma separated stego-signature detectors to run (default: all of {', '.join(DETECTORS)})")
+output_format.add_argument("--columnar", action='store_true', help="store the output as directory of memory-mappable numpy columns plus the raw frame data (output has to be a directory path)")
 
 #TODO:
 # http://www.mp3-tech.org/programmer/docs/mp3_theory.pdf
@@ -50,18 +65,36 @@ parser.add_argument("--hex", action='store_true', help="store binary data as hex
 
 args = parser.parse_args()
 
+if args.clear_cache:
+    print(f"removed {AnalysisCache(Path(args.cache_dir)).clear()} cached analyses from '{Path(args.cache_dir).resolve()}'")
+    sys.exit(0)
+if args.input is None:
+    parser.error("the following arguments are required: -i/--input")
+if args.ndjson and args.output is None:
+    parser.error("--ndjson requires -o/--output")
+if args.columnar and args.output is None:
+    parser.error("--columnar requires -o/--output")
+try:
+    STEGO_DETECTORS = select(args.detectors.split(",") if args.detectors is not None else None)
+except ValueError as e:
+    parser.error(str(e))
+
 INPUT_PATH = Path(args.input).resolve()
 OUTPUT_PATH = Path(args.output).resolve() if args.output is not None else None
 SWITCH_DATA = args.data
 SWITCH_FORCE = args.force
 SWITCH_RECONSTRUCT = args.reconstruct
 SWITCH_HXDATA = args.hex
+SWITCH_NDJSON = args.ndjson
+SWITCH_COLUMNAR = args.columnar
+SWITCH_CACHE = args.cache
+CACHE_PATH = Path(args.cache_dir).resolve()
 
 print("##############################################################################")
 print("#                          MP3FileStructureAnalyzer                          #")
 print("##############################################################################")
 
-print(f"\n  INPUT_PATH = {INPUT_PATH}\n  OUTPUT_PATH = {OUTPUT_PATH}\n  SWITCH_DATA = {'On' if SWITCH_DATA else 'Off'}\n  SWITCH_FORCE = {'On' if SWITCH_FORCE else 'Off'}\n  SWITCH_RECONSTRUCT = {'On' if SWITCH_RECONSTRUCT else 'Off'}\n  SWITCH_HXDATA = {'On' if SWITCH_HXDATA else 'Off'}\n")
+print(f"\n  INPUT_PATH = {INPUT_PATH}\n  OUTPUT_PATH = {OUTPUT_PATH}\n  SWITCH_DATA = {'On' if SWITCH_DATA else 'Off'}\n  SWITCH_FORCE = {'On' if SWITCH_FORCE else 'Off'}\n  SWITCH_RECONSTRUCT = {'On' if SWITCH_RECONSTRUCT else 'Off'}\n  SWITCH_HXDATA = {'On' if SWITCH_HXDATA else 'Off'}\n  SWITCH_NDJSON = {'On' if SWITCH_NDJSON else 'Off'}\n  SWITCH_COLUMNAR = {'On' if SWITCH_COLUMNAR else 'Off'}\n  SWITCH_CACHE = {'On' if SWITCH_CACHE else 'Off'}\n  STEGO_DETECTORS = {', '.join(detector.tool for detector in STEGO_DETECTORS)}\n")
 
 if not INPUT_PATH.exists():
     print(f"ERROR: Could not find input file '{INPUT_PATH}'!")
@@ -72,189 +105,233 @@ if (OUTPUT_PATH is not None) and OUTPUT_PATH.exists() and (not SWITCH_FORCE):
     sys.exit(1)
 
 if SWITCH_RECONSTRUCT:
-    with open(INPUT_PATH, "r") as f:
-        mp3_stream: bytes = b""
-
-        json_dict = json.loads(f.read())
-        id3v2 = json_dict["structure"]["id3v2"]
-        frame_data = json_dict["structure"]["mpeg_frame_data"]
-        id3v1 = json_dict["structure"]["id3v1.1"]
-
-        if id3v2 is not None:
-            if "raw" not in id3v2["data"]:
-                print("ERROR: JSON input file does not contain raw data; make sure the given JSON file was generated using --data option!")
-                sys.exit(1)
-            conv_f = ast.literal_eval if str(id3v2["data"]["raw"])[0:2] == "b'" or str(id3v2["data"]["raw"])[0:2] == "b\"" else bytes.fromhex
+    # the export is read part by part and the restored stream is written right away, into a partial file that
+    # replaces the output only when the reconstruction succeeded
+    partial_path = OUTPUT_PATH.with_name(OUTPUT_PATH.name + ".part") if OUTPUT_PATH is not None else None
+    missing_raw = "JSON input file does not contain raw data; make sure the given JSON file was generated using --data option!"
+    conv_f = None
+    try:
+        with open(partial_path if partial_path is not None else os.devnull, "wb") as mp3_stream:
+            for part, value in iter_structure(INPUT_PATH):
+                if value is None:
+                    continue
+                if part == STRUCTURE_ID3V2:
+                    if "raw" not in value["data"]:
+                        raise ValueError(missing_raw)
+                    # the raw data of the whole export is either the repr of bytes or hex
+                    conv_f = conv_f or mp3utils.rawDecoder(value["data"]["raw"])
 
-            mp3_stream += conv_f(id3v2["data"]["raw"])
+                    mp3_stream.write(conv_f(value["data"]["raw"]))
 
-            for id3tag in id3v2["tags"]:
-                mp3_stream += conv_f(id3tag["data"]["raw"])
+                    for id3tag in value["tags"]:
+                        mp3_stream.write(conv_f(id3tag["data"]["raw"]))
 
-            mp3_stream += conv_f(id3v2["data"]["raw_padding"])
+                    mp3_stream.write(conv_f(value["data"]["raw_padding"]))
+                elif part == STRUCTURE_FRAME:
+                    if "raw" in value:
+                        conv_f = conv_f or mp3utils.rawDecoder(value["raw"])
 
+                        mp3_stream.write(conv_f(value["raw"]))
+                    else:
+                        if value["main_data"]["raw"] is None:
+                            raise ValueError(missing_raw)
+                        conv_f = conv_f or mp3utils.rawDecoder(value["main_data"]["raw"])
 
-        for i, frame in enumerate(frame_data):
-            if "raw" in frame:
-                conv_f = ast.literal_eval if str(frame["raw"])[0:2] == "b'" or str(frame["raw"])[0:2] == "b\"" else bytes.fromhex
-
-                mp3_stream += conv_f(frame["raw"])
-            else:
-                if frame["main_data"]["raw"] is None:
-                    print("ERROR: JSON input file does not contain raw data; make sure the given JSON file was generated using --data option!")
-                    sys.exit(1)
-                conv_f = ast.literal_eval if str(frame["main_data"]["raw"])[0:2] == "b'" or str(frame["main_data"]["raw"])[0:2] == "b\"" else bytes.fromhex
+                        mp3_stream.write(mp3utils.bitsToBytes(value["header"]["bitstring"]))
+                        mp3_stream.write(mp3utils.bitsToBytes(value["side_info"]["bitstring"]))
+                        mp3_stream.write(conv_f(value["main_data"]["raw"]))
+                else:
+                    conv_f = conv_f or mp3utils.rawDecoder(value["data"]["raw"])
 
-                header = b"".join([int(bytestr, 2).to_bytes(1, "big") for bytestr in frame["header"]["bitstring"].split(" ")])
-                side_info = b"".join([int(bytestr, 2).to_bytes(1, "big") for bytestr in frame["side_info"]["bitstring"].split(" ")])
-                main_data = conv_f(frame["main_data"]["raw"])
+                    mp3_stream.write(conv_f(value["data"]["raw"]))
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        if partial_path is not None:
+            partial_path.unlink(missing_ok=True)
+        sys.exit(1)
 
-                mp3_stream += header
-                mp3_stream += side_info
-                mp3_stream += main_data
-
-        if id3v1 is not None:
-            mp3_stream += conv_f(id3v1["data"]["raw"])
-
-        print("\n##############################################################################\n")
-        if OUTPUT_PATH is not None:
-            print(f"Saving MP3 output stream to '{OUTPUT_PATH}'...")
-            with open(OUTPUT_PATH, "wb") as f2:
-                f2.write(mp3_stream)
-                f2.close()
-        f.close()
+    print("\n##############################################################################\n")
+    if OUTPUT_PATH is not None:
+        print(f"Saving MP3 output stream to '{OUTPUT_PATH}'...")
+        partial_path.replace(OUTPUT_PATH)
 else:
-    with open(INPUT_PATH, "rb") as f:
-        hex_data: list = [c for c in f.read()]
+    # the file is mapped, not read: all parsers work on offsets into the page cache
+    file_data: memoryview = map_file(INPUT_PATH)
+    # the streamed output is written into a partial file that replaces the output only when the analysis succeeded
+    ndjson_path: Path = OUTPUT_PATH.with_name(OUTPUT_PATH.name + ".part") if SWITCH_NDJSON else None
+    ndjson_writer: NDJSONWriter = NDJSONWriter(ndjson_path) if SWITCH_NDJSON else None
+    # like the NDJSON stream, the columns are written into a partial directory
+    columnar_path: Path = OUTPUT_PATH.with_name(OUTPUT_PATH.name + ".part") if SWITCH_COLUMNAR else None
+    columnar_writer: ColumnarWriter = ColumnarWriter(columnar_path, file_data) if SWITCH_COLUMNAR else None
+    analysis_cache: AnalysisCache = AnalysisCache(CACHE_PATH, args.cache_size << 20) if SWITCH_CACHE else None
+    with alive_bar(len(file_data), title="Analyzing MP3", length=25) as pbar:
+        id3v2_decoder: ID3 = ID3(file_data, SWITCH_DATA, SWITCH_HXDATA)
+        parsing_offset = 0
+        if id3v2_decoder.is_valid:
+            parsing_offset = id3v2_decoder.offset
+        if parsing_offset > 0:
+            print(f"found {parsing_offset} bytes ID3v2 data")
+            pbar(parsing_offset, skipped=True)
+        id3v2_dict = {
+            "length": id3v2_decoder.offset,
+            "data": id3v2_decoder.json_dict,
+            "tags": [{
+                "id": tag.id,
+                "position": tag.position,
+                "payload": tag.position + 10,
+                "length": len(tag.content),
+                "flags": tag.frame_flags,
+                "data": tag.json_dict
+            } for tag in id3v2_decoder.id3_frames]
+        } if id3v2_decoder.is_valid else None
+        if ndjson_writer is not None:
+            print(f"Streaming NDJSON output to '{OUTPUT_PATH}'...")
+            ndjson_writer.write(NDJSON_HEADER, {"file": INPUT_PATH.name, "size": len(file_data), "id3v2": id3v2_dict})
 
-        with alive_bar(len(hex_data), title="Analyzing MP3", length=25) as pbar:
-            id3v2_decoder: ID3 = ID3(hex_data, SWITCH_DATA, SWITCH_HXDATA)
-            parsing_offset = 0
-            if id3v2_decoder.is_valid:
-                parsing_offset = id3v2_decoder.offset
-            if parsing_offset > 0:
-                print(f"found {parsing_offset} bytes ID3v2 data")
-                pbar(parsing_offset, skipped=True)
-
-            print("mpeg data")
-            mp3_parser: MP3Parser = MP3Parser(hex_data, parsing_offset)
-            parsed_frames = mp3_parser.parse_file(pbar, SWITCH_DATA, SWITCH_HXDATA)
-            print(f"{parsed_frames} mpeg frames parsed")
-            if parsed_frames > 0:
-                id3v1_offset = mp3_parser.frames[-1]["position"] + mp3_parser.frames[-1]["length"]
-                id3v1_decoder: ID3v1 = ID3v1(hex_data[id3v1_offset:], SWITCH_DATA, SWITCH_HXDATA)
-                if id3v1_decoder.is_valid:
-                    print(f"found {128} bytes ID3v1 data")
-                    pbar(128, skipped=True)
+        print("mpeg data")
+        cached_analysis: ColumnarAnalysis = analysis_cache.load(INPUT_PATH, file_data, SWITCH_DATA, SWITCH_HXDATA) if analysis_cache is not None else None
+        cache_writer: ColumnarWriter = None
+        # the cached signature bits are only valid for the same detectors
+        if cached_analysis is not None and cached_analysis.meta.get("detectors") != [detector.tool for detector in STEGO_DETECTORS]:
+            cached_analysis = None
+        if cached_analysis is not None:
+            print(f"found analysis in cache '{CACHE_PATH}'")
+            cached_table = cached_analysis.table
+            pbar(int(cached_table.records["length"].sum()), skipped=True)
+            frame_table_windows = (cached_table[start:start + PARSE_WINDOW] for start in range(0, len(cached_table), PARSE_WINDOW))
+        else:
+            mp3_parser: MP3Parser = MP3Parser(file_data, parsing_offset, detectors=STEGO_DETECTORS)
+            frame_table_windows = mp3_parser.iter_tables(pbar, SWITCH_DATA, SWITCH_HXDATA)
+            if analysis_cache is not None:
+                cache_writer = analysis_cache.writer(INPUT_PATH, file_data)
+        # the statistics only need the compact columns, the tables (and their side info) are kept for the JSON export
+        frame_records, frame_headers, frame_tables = [], [], []
+        for table in frame_table_windows:
+            frame_records.append(table.records)
+            frame_headers.append(table.headers)
+            if cache_writer is not None:
+                cache_writer.write_table(table)
+            if ndjson_writer is not None:
+                ndjson_writer.write_records(table)
+            elif columnar_writer is not None:
+                columnar_writer.write_table(table)
             else:
-                print("ERROR: Could parse any MPEG frames, sync word not found at expected position!")
-                sys.exit(1)
+                frame_tables.append(table)
+        if cached_analysis is not None:
+            parsed_frames = cached_analysis.meta["frames"]
+            id3v1_offset = cached_analysis.meta["end_offset"]
+        else:
+            parsed_frames = mp3_parser.num_of_parsed_frames
+            id3v1_offset = mp3_parser.offset
+        if cache_writer is not None:
+            analysis_cache.store(cache_writer, {"frames": parsed_frames, "end_offset": id3v1_offset, "detectors": [detector.tool for detector in STEGO_DETECTORS]})
+        print(f"{parsed_frames} mpeg frames parsed")
+        if parsed_frames > 0:
+            frame_records = np.concatenate(frame_records)
+            frame_headers = np.concatenate(frame_headers)
+            id3v1_decoder: ID3v1 = ID3v1(file_data[id3v1_offset:], SWITCH_DATA, SWITCH_HXDATA)
+            if id3v1_decoder.is_valid:
+                print(f"found {128} bytes ID3v1 data")
+                pbar(128, skipped=True)
+        else:
+            print("ERROR: Could parse any MPEG frames, sync word not found at expected position!")
+            if ndjson_writer is not None:
+                ndjson_writer.close()
+                ndjson_path.unlink(missing_ok=True)
+            if columnar_writer is not None:
+                shutil.rmtree(columnar_path, ignore_errors=True)
+            sys.exit(1)
+
+    json_dict = {
+        "file": INPUT_PATH.name,
+        "size": len(file_data),
+        "frames": parsed_frames,
+        "encoder": ENCODERS[frame_records["encoder"][np.argmax(frame_records["is_frame"])]],
+        "global_header_info": global_header_info(frame_records, frame_headers),
+        "structure": {
+            "id3v2": id3v2_dict,
+            "mpeg_frame_data": [frame for frame in FrameTable.concatenate(frame_tables)] if len(frame_tables) > 0 else None,
+            "id3v1.1": {
+                "position": id3v1_offset,
+                "length": 128,
+                "data": id3v1_decoder.json_dict
+            } if id3v1_decoder.is_valid else None
+        },
+    }
 
-        json_dict = {
-            "file": INPUT_PATH.name,
-            "size": len(hex_data),
-            "frames": parsed_frames,
-            "encoder": mp3_parser.frames[0]["main_data"]["encoder"],
-            "global_header_info": {
-                "length": mp3utils.default_statistics([frame["length"] for frame in mp3_parser.frames]),
-                "samples": mp3utils.default_statistics([frame["samples"] for frame in mp3_parser.frames if "samples" in frame]),
-                "version": mp3utils.default_categorical([frame["header"]["version"] for frame in mp3_parser.frames if "header" in frame], [1, 2, 2.5]),
-                "layer": mp3utils.default_categorical([frame["header"]["layer"] for frame in mp3_parser.frames if "header" in frame], [1, 2, 3]),
-                "crc": mp3utils.default_categorical([frame["header"]["crc"] for frame in mp3_parser.frames if "header" in frame], [0, 1]),
-                "bitrate": mp3utils.default_statistics([frame["header"]["bitrate"] for frame in mp3_parser.frames if "header" in frame]),
-                "samplerate": mp3utils.default_statistics([frame["header"]["samplerate"] for frame in mp3_parser.frames if "header" in frame]),
-                "padding": mp3utils.default_categorical([frame["header"]["padding"] for frame in mp3_parser.frames if "header" in frame], [0, 1]),
-                "private": mp3utils.default_categorical([frame["header"]["private"] for frame in mp3_parser.frames if "header" in frame], [0, 1]),
-                "mode": mp3utils.default_categorical([frame["header"]["mode"] for frame in mp3_parser.frames if "header" in frame], ["ChannelMode.Stereo", "ChannelMode.JointStereo", "ChannelMode.DualChannel", "ChannelMode.Mono"]),
-                "modeExt": mp3utils.default_categorical([frame["header"]["modeExt"] for frame in mp3_parser.frames if "header" in frame], ["ModeExtension.IntensityOffMSOff", "ModeExtension.IntensityOnMSOff", "ModeExtension.IntensityOffMSOn", "ModeExtension.IntensityOnMSOn", "ModeExtension.NONE"]),
-                "copyright": mp3utils.default_categorical([frame["header"]["copyright"] for frame in mp3_parser.frames if "header" in frame], [0, 1]),
-                "original": mp3utils.default_categorical([frame["header"]["original"] for frame in mp3_parser.frames if "header" in frame], [0, 1]),
-                "emphasis": mp3utils.default_categorical([frame["header"]["emphasis"] for frame in mp3_parser.frames if "header" in frame], ["Emphasis.NONE", "Emphasis.MS5015", "Emphasis.Reserved", "Emphasis.CCITJ17"])
-            },
-            "structure": {
-                "id3v2": {
-                    "length": id3v2_decoder.offset,
-                    "data": id3v2_decoder.json_dict,
-                    "tags": [{
-                        "id": tag.id,
-                        "position": tag.position,
-                        "payload": tag.position + 10,
-                        "length": len(tag.content),
-                        "flags": tag.frame_flags,
-                        "data": tag.json_dict
-                    } for tag in id3v2_decoder.id3_frames]
-                } if id3v2_decoder.is_valid else None,
-                "mpeg_frame_data": [frame for frame in mp3_parser.frames],
-                "id3v1.1": {
-                    "position": id3v1_offset,
-                    "length": 128,
-                    "data": id3v1_decoder.json_dict
-                } if id3v1_decoder.is_valid else None
-            },
-        }
+    # finish stego signatures (file level signatures and scores of the requested detectors)
+    json_dict["stego_signatures"], json_dict["stego_scores"] = summarize(frame_records, frame_headers, STEGO_DETECTORS)
 
-        # finish stego signatures
-        global_signatures_dict = {}
-        if json_dict["global_header_info"]["bitrate"]["min"] == json_dict["global_header_info"]["bitrate"]["max"]:
-            global_signatures_dict["mp3stego"] = {}
-            global_signatures_dict["mp3stego"]["mp3stego_constant_bitrate"] = 1
-        for frame in [f for f in mp3_parser.frames if "stego_signatures" in f]:
-            for sig in frame["stego_signatures"]:
-                tool = str(sig).split("_")[0]
-                if tool not in global_signatures_dict:
-                    global_signatures_dict[tool] = {}
-                if sig not in global_signatures_dict[tool]:
-                    global_signatures_dict[tool][sig] = 0
-                global_signatures_dict[tool][sig] += 1
-        json_dict["stego_signatures"] = global_signatures_dict
+    if ndjson_writer is not None:
+        ndjson_writer.write(NDJSON_TRAILER, {
+            "frames": json_dict["frames"],
+            "encoder": json_dict["encoder"],
+            "global_header_info": json_dict["global_header_info"],
+            "stego_signatures": json_dict["stego_signatures"],
+            "stego_scores": json_dict["stego_scores"],
+            "id3v1.1": json_dict["structure"]["id3v1.1"]
+        })
+        ndjson_writer.close()
+        ndjson_path.replace(OUTPUT_PATH)
+    if columnar_writer is not None:
+        print(f"Saving columnar output to '{OUTPUT_PATH}'...")
+        columnar_writer.close({key: value for key, value in json_dict.items() if key != "structure"} | {
+            "id3v2": json_dict["structure"]["id3v2"],
+            "id3v1.1": json_dict["structure"]["id3v1.1"]
+        })
+        if OUTPUT_PATH.is_dir():
+            shutil.rmtree(OUTPUT_PATH)
+        else:
+            OUTPUT_PATH.unlink(missing_ok=True)
+        columnar_path.rename(OUTPUT_PATH)
 
-        # build tables
-        print("\n############################### file structure ###############################\n")
-        print(f" - file: {json_dict['file']}")
-        print(f" - size: {json_dict['size']} bytes")
-        print(f" - frames: {json_dict['frames']}")
-        print(f" - encoder: {'Unknown' if json_dict['encoder'] is None else json_dict['encoder']}")
-        print(" - general structure:\n")
-        tab = Texttable()
-        tab.set_deco(Texttable.HEADER)
-        tab.set_cols_dtype(["t", "i", "i", "f"])
-        tab.set_cols_align(["l", "r", "r", "r"])
-        tab.header(["Identifier", "Position", "Length", "Percentage"])
-        if json_dict["structure"]["id3v2"] is not None:
-            tab.add_row([f"ID3v{id3v2_decoder.version}", 0, parsing_offset, round((parsing_offset/len(hex_data)) * 100, 3)])
-        tab.add_row(["MPEG frames", parsing_offset, id3v1_offset-parsing_offset, round(((id3v1_offset-parsing_offset)/len(hex_data)) * 100, 3)])
-        if json_dict["structure"]["id3v1.1"] is not None:
-            tab.add_row(["ID3v1.1", id3v1_offset, 128, round((128/len(hex_data)) * 100, 3)])
-        [print(f"   {l}") for l in tab.draw().split("\n")]
+    # build tables
+    print("\n############################### file structure ###############################\n")
+    print(f" - file: {json_dict['file']}")
+    print(f" - size: {json_dict['size']} bytes")
+    print(f" - frames: {json_dict['frames']}")
+    print(f" - encoder: {'Unknown' if json_dict['encoder'] is None else json_dict['encoder']}")
+    print(" - general structure:\n")
+    tab = Texttable()
+    tab.set_deco(Texttable.HEADER)
+    tab.set_cols_dtype(["t", "i", "i", "f"])
+    tab.set_cols_align(["l", "r", "r", "r"])
+    tab.header(["Identifier", "Position", "Length", "Percentage"])
+    if json_dict["structure"]["id3v2"] is not None:
+        tab.add_row([f"ID3v{id3v2_decoder.version}", 0, parsing_offset, round((parsing_offset/len(file_data)) * 100, 3)])
+    tab.add_row(["MPEG frames", parsing_offset, id3v1_offset-parsing_offset, round(((id3v1_offset-parsing_offset)/len(file_data)) * 100, 3)])
+    if json_dict["structure"]["id3v1.1"] is not None:
+        tab.add_row(["ID3v1.1", id3v1_offset, 128, round((128/len(file_data)) * 100, 3)])
+    [print(f"   {l}") for l in tab.draw().split("\n")]
 
-        print("\n########################## global frame header info ##########################\n")
-        tab = Texttable()
-        tab.set_deco(Texttable.HEADER)
-        tab.set_cols_dtype(["t", "t"])
-        tab.set_cols_align(["l", "l"])
-        ghi = json_dict['global_header_info']
-        tab.add_rows([
-            ["Metric", "Value(s)"],
-            ["frame length", f"{round(ghi['length']['min'], 3)}/{round(ghi['length']['avg'], 3)}/{round(ghi['length']['max'], 3)}"],
-            ["samples per frame", f"{round(ghi['samples']['avg'], 3)}"],
-            ["mpeg version", f"{mp3utils.key_max(ghi['version'])} ({round((ghi['version'][mp3utils.key_max(ghi['version'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["mpeg layer", f"{mp3utils.key_max(ghi['layer'])} ({round((ghi['layer'][mp3utils.key_max(ghi['layer'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["crc", f"{'Yes' if mp3utils.key_max(ghi['crc']) == 0 else 'No'} ({round((ghi['crc'][mp3utils.key_max(ghi['crc'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["bitrate", f"{round(ghi['bitrate']['min'], 3)}/{round(ghi['bitrate']['avg'], 3)}/{round(ghi['bitrate']['max'], 3)} ({'CBR' if ghi['bitrate']['min'] == ghi['bitrate']['max'] else 'VBR'})"],
-            ["sample rate", f"{round(ghi['samplerate']['min'], 3)}/{round(ghi['samplerate']['avg'], 3)}/{round(ghi['samplerate']['max'], 3)}"],
-            ["padding", f"{'Yes' if mp3utils.key_max(ghi['padding']) == 1 else 'No'} ({round((ghi['padding'][mp3utils.key_max(ghi['padding'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["private", f"{'Yes' if mp3utils.key_max(ghi['private']) == 1 else 'No'} ({round((ghi['private'][mp3utils.key_max(ghi['private'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["channel mode", f"{mp3utils.key_max(ghi['mode']).split('.')[1]} ({round((ghi['mode'][mp3utils.key_max(ghi['mode'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["mode extension", f"{mp3utils.key_max(ghi['modeExt']).split('.')[1]} ({round((ghi['modeExt'][mp3utils.key_max(ghi['modeExt'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["copyright", f"{'Yes' if mp3utils.key_max(ghi['copyright']) == 1 else 'No'} ({round((ghi['copyright'][mp3utils.key_max(ghi['copyright'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["original", f"{'Yes' if mp3utils.key_max(ghi['original']) == 1 else 'No'} ({round((ghi['original'][mp3utils.key_max(ghi['original'])] / json_dict['frames']) * 100, 3)}%)"],
-            ["emphasis", f"{mp3utils.key_max(ghi['emphasis']).split('.')[1]} ({round((ghi['emphasis'][mp3utils.key_max(ghi['emphasis'])] / json_dict['frames']) * 100, 3)}%)"],
-        ])
-        [print(f"   {l}") for l in tab.draw().split("\n")]
-        print("\n##############################################################################\n")
-        if OUTPUT_PATH is not None:
-            print(f"Saving JSON output to '{OUTPUT_PATH}'...")
-            with open(OUTPUT_PATH, "w") as f:
-                json.dump(json_dict, f, indent=2)
+    print("\n########################## global frame header info ##########################\n")
+    tab = Texttable()
+    tab.set_deco(Texttable.HEADER)
+    tab.set_cols_dtype(["t", "t"])
+    tab.set_cols_align(["l", "l"])
+    ghi = json_dict['global_header_info']
+    tab.add_rows([
+        ["Metric", "Value(s)"],
+        ["frame length", f"{round(ghi['length']['min'], 3)}/{round(ghi['length']['avg'], 3)}/{round(ghi['length']['max'], 3)}"],
+        ["samples per frame", f"{round(ghi['samples']['avg'], 3)}"],
+        ["mpeg version", f"{mp3utils.key_max(ghi['version'])} ({round((ghi['version'][mp3utils.key_max(ghi['version'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["mpeg layer", f"{mp3utils.key_max(ghi['layer'])} ({round((ghi['layer'][mp3utils.key_max(ghi['layer'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["crc", f"{'Yes' if mp3utils.key_max(ghi['crc']) == 0 else 'No'} ({round((ghi['crc'][mp3utils.key_max(ghi['crc'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["bitrate", f"{round(ghi['bitrate']['min'], 3)}/{round(ghi['bitrate']['avg'], 3)}/{round(ghi['bitrate']['max'], 3)} ({'CBR' if ghi['bitrate']['min'] == ghi['bitrate']['max'] else 'VBR'})"],
+        ["sample rate", f"{round(ghi['samplerate']['min'], 3)}/{round(ghi['samplerate']['avg'], 3)}/{round(ghi['samplerate']['max'], 3)}"],
+        ["padding", f"{'Yes' if mp3utils.key_max(ghi['padding']) == 1 else 'No'} ({round((ghi['padding'][mp3utils.key_max(ghi['padding'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["private", f"{'Yes' if mp3utils.key_max(ghi['private']) == 1 else 'No'} ({round((ghi['private'][mp3utils.key_max(ghi['private'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["channel mode", f"{mp3utils.key_max(ghi['mode']).split('.')[1]} ({round((ghi['mode'][mp3utils.key_max(ghi['mode'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["mode extension", f"{mp3utils.key_max(ghi['modeExt']).split('.')[1]} ({round((ghi['modeExt'][mp3utils.key_max(ghi['modeExt'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["copyright", f"{'Yes' if mp3utils.key_max(ghi['copyright']) == 1 else 'No'} ({round((ghi['copyright'][mp3utils.key_max(ghi['copyright'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["original", f"{'Yes' if mp3utils.key_max(ghi['original']) == 1 else 'No'} ({round((ghi['original'][mp3utils.key_max(ghi['original'])] / json_dict['frames']) * 100, 3)}%)"],
+        ["emphasis", f"{mp3utils.key_max(ghi['emphasis']).split('.')[1]} ({round((ghi['emphasis'][mp3utils.key_max(ghi['emphasis'])] / json_dict['frames']) * 100, 3)}%)"],
+    ])
+    [print(f"   {l}") for l in tab.draw().split("\n")]
+    print("\n##############################################################################\n")
+    if OUTPUT_PATH is not None and ndjson_writer is None and columnar_writer is None:
+        print(f"Saving JSON output to '{OUTPUT_PATH}'...")
+        with open(OUTPUT_PATH, "w") as f:
+            json.dump(json_dict, f, indent=2)
     print("Done!")
 sys.exit(0)
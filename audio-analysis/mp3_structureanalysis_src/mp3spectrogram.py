@@ -0,0 +1,467 @@
+#################### License #########################################
+#
+# BSD-3-Clause / “New BSD License”
+#
+# Copyright 2023 Otto-von-Guericke University Magdeburg, Advanced Multimedia and Security Lab (AMSL), Christian Kraetzer, Bernhard Birnbaum
+# All rights reserved
+#
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote products derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS “AS IS” AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+#
+#######################################################################
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from decoder.FrameSynthesis import NUM_OF_SUBBANDS, SUBBAND_SAMPLES, PCMDecoder
+from decoder.ID3_Parser import ID3
+from decoder.MP3_Parser import MP3Parser
+from decoder.util import map_file
+
+# size of the DFT (FFT_SIZE // 2 + 1 frequency rows per channel) and step between two windows (50 % overlap)
+FFT_SIZE = 512
+FFT_HOP = FFT_SIZE // 2
+# number of DFT windows transformed at once, bounds the memory of the framing
+FFT_BLOCK = 4096
+# width of the image in pixels and the range of levels shown in dB below full scale (as sox spectrogram)
+DEFAULT_WIDTH = 800
+DEFAULT_DYNAMIC_RANGE = 120
+# frequency bands of the summary of a difference, of equal width like the subbands of the filterbank
+DIFF_BANDS = NUM_OF_SUBBANDS
+# samples per channel of a frame, the unit of the alignment of two streams
+FRAME_SAMPLES = 2 * NUM_OF_SUBBANDS * SUBBAND_SAMPLES
+# colour map from the lowest to the highest level
+PALETTE = np.array([
+    [0, 0, 0],
+    [0, 0, 128],
+    [128, 0, 160],
+    [224, 32, 64],
+    [255, 160, 0],
+    [255, 255, 128],
+    [255, 255, 255],
+], dtype=np.float64)
+
+
+class StreamingSTFT:
+    """
+    Short-time Fourier transform of PCM that arrives in chunks. The Hann windows overlap by half; the samples of a
+    window that continues into the next chunk are kept, so the power of the windows does not depend on the chunking.
+
+    :param fft_size: size of the DFT
+    :type fft_size: int
+    :param hop: step between two windows in samples
+    :type hop: int
+    """
+
+    def __init__(self, fft_size: int = FFT_SIZE, hop: int = FFT_HOP):
+        self.__fft_size: int = fft_size
+        self.__hop: int = hop
+        self.__window: np.ndarray = np.hanning(fft_size + 1)[:-1].astype(np.float32)
+        # power of a full scale sine, the reference of the levels
+        self.__reference: float = float(self.__window.sum() / 2) ** 2
+        self.__tail: np.ndarray = None
+        self.__windows: int = 0
+
+    def feed(self, pcm: np.ndarray) -> np.ndarray:
+        """
+        :param pcm: the next samples, shape (samples, channels)
+        :type pcm: np.ndarray
+
+        :return: power relative to full scale of every window completed by the samples, float32 array of shape
+         (windows, channels, fft_size // 2 + 1)
+        :rtype: np.ndarray
+        """
+        samples = pcm if self.__tail is None else np.concatenate([self.__tail, pcm])
+        count = max(0, (len(samples) - self.__fft_size) // self.__hop + 1)
+        power = np.empty((count, samples.shape[1], self.__fft_size // 2 + 1), dtype=np.float32)
+        for start in range(0, count, FFT_BLOCK):
+            stop = min(start + FFT_BLOCK, count)
+            block = samples[start * self.__hop:(stop - 1) * self.__hop + self.__fft_size]
+            # windows of shape (windows, channels, fft_size)
+            frames = np.lib.stride_tricks.sliding_window_view(block, self.__fft_size, axis=0)[::self.__hop]
+            spectrum = np.fft.rfft(frames * self.__window, axis=2)
+            power[start:stop] = (spectrum.real ** 2 + spectrum.imag ** 2) / self.__reference
+        self.__tail = samples[count * self.__hop:].copy()
+        self.__windows += count
+        return power
+
+    @property
+    def windows(self) -> int:
+        return self.__windows
+
+    @property
+    def hop(self) -> int:
+        return self.__hop
+
+
+class SpectrogramColumns:
+    """
+    Average power of the STFT windows in a bounded number of image columns, whatever the duration of the audio. A
+    column holds span consecutive windows; when the columns run out, neighbouring columns are merged and the span is
+    doubled.
+
+    :param width: width of the final image, at most 2 * width columns are held
+    :type width: int
+    """
+
+    def __init__(self, width: int = DEFAULT_WIDTH):
+        self.__width: int = width
+        self.__sums: np.ndarray = None
+        self.__span: int = 1
+        self.__windows: int = 0
+
+    def __used(self, windows: int) -> int:
+        return -(-windows // self.__span)
+
+    def add(self, power: np.ndarray):
+        """
+        :param power: power of the next STFT windows, shape (windows, channels, bins), see StreamingSTFT.feed
+        :type power: np.ndarray
+        """
+        if len(power) == 0:
+            return
+        if self.__sums is None:
+            self.__sums = np.zeros((2 * self.__width,) + power.shape[1:], dtype=np.float64)
+        while self.__used(self.__windows + len(power)) > len(self.__sums):
+            used = self.__used(self.__windows)
+            merged = self.__sums[0:used:2].copy()
+            merged[:used // 2] += self.__sums[1:used:2]
+            self.__sums[:] = 0
+            self.__sums[:len(merged)] = merged
+            self.__span *= 2
+        columns = (self.__windows + np.arange(len(power))) // self.__span
+        starts = np.flatnonzero(np.diff(columns, prepend=-1))
+        self.__sums[columns[starts]] += np.add.reduceat(power, starts, axis=0)
+        self.__windows += len(power)
+
+    def levels(self) -> np.ndarray:
+        """
+        :return: level in dB of every pixel, shape (width, channels, bins); an empty array if no window was added
+        :rtype: np.ndarray
+        """
+        if self.__windows == 0:
+            return np.zeros((0, 0, 0))
+        used = self.__used(self.__windows)
+        counts = np.minimum(self.__span, self.__windows - np.arange(used) * self.__span)
+        mean = self.__sums[:used] / counts[:, None, None]
+        if used >= self.__width:
+            # average the columns down to the width of the image
+            starts = np.arange(self.__width) * used // self.__width
+            lengths = np.diff(np.append(starts, used))
+            mean = np.add.reduceat(mean, starts, axis=0) / lengths[:, None, None]
+        else:
+            mean = mean[np.arange(self.__width) * used // self.__width]
+        return 10 * np.log10(np.maximum(mean, 1e-30))
+
+
+def render(levels: np.ndarray, dynamic_range: float = DEFAULT_DYNAMIC_RANGE) -> np.ndarray:
+    """
+    :param levels: level in dB of every pixel, shape (width, channels, bins), see SpectrogramColumns.levels
+    :type levels: np.ndarray
+    :param dynamic_range: range of levels below 0 dB that is shown, lower levels are black
+    :type dynamic_range: float
+
+    :return: RGB image of shape (channels * bins, width, 3), the first channel on top and the highest frequency in
+     the first row of every channel
+    :rtype: np.ndarray
+    """
+    width, channels, bins = levels.shape
+    scaled = np.clip(1 + levels / dynamic_range, 0, 1)[:, :, ::-1].transpose(1, 2, 0).reshape(channels * bins, width)
+    steps = np.linspace(0, 1, len(PALETTE))
+    return np.stack([np.interp(scaled, steps, PALETTE[:, c]) for c in range(3)], axis=2).round().astype(np.uint8)
+
+
+def write_png(path: Path, image: np.ndarray):
+    """
+    Write an 8 bit RGB image as PNG (without filtering of the rows).
+
+    :param path: path of the output file
+    :type path: Path
+    :param image: uint8 array of shape (height, width, 3)
+    :type image: np.ndarray
+    """
+    height, width, _ = image.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # every row starts with its filter type 0
+    rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * 3)], axis=1)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def iter_pcm(file_data: memoryview, decoder: PCMDecoder = None):
+    """
+    :param file_data: view of the whole file
+    :type file_data: memoryview
+    :param decoder: decoder of the file, see MP3Parser.iter_pcm
+    :type decoder: PCMDecoder
+
+    :return: generator of the PCM chunks of the frames behind the ID3v2 tag, see MP3Parser.iter_pcm
+    """
+    id3v2 = ID3(file_data, False, False)
+    return MP3Parser(file_data, id3v2.offset if id3v2.is_valid else 0).iter_pcm(decoder=decoder)
+
+
+def spectrogram(file_data: memoryview, width: int = DEFAULT_WIDTH) -> tuple:
+    """
+    Decode an mp3 file chunk by chunk and reduce its STFT to the columns of the image.
+
+    :param file_data: view of the whole file
+    :type file_data: memoryview
+    :param width: width of the image in pixels
+    :type width: int
+
+    :return: the levels in dB (see SpectrogramColumns.levels) and the number of decoded samples per channel
+    :rtype: tuple
+    """
+    stft, columns = StreamingSTFT(), SpectrogramColumns(width)
+    samples = 0
+    # the messages of the parser go to stderr, stdout only carries the output of the script
+    with contextlib.redirect_stdout(sys.stderr):
+        for pcm in iter_pcm(file_data):
+            columns.add(stft.feed(pcm))
+            samples += len(pcm)
+    return columns.levels(), samples
+
+
+def iter_aligned(first, second):
+    """
+    Align two PCM streams by frame: both are cut into chunks of the same length, starting at their first decoded
+    frame. The rest of the longer stream is dropped. Streams with different channels are both mixed down to mono.
+
+    :param first: generator of PCM chunks, see MP3Parser.iter_pcm
+    :param second: generator of PCM chunks
+
+    :return: generator of pairs of PCM chunks of the same shape
+    """
+    second = iter(second)
+    pending_first, pending_second = None, None
+    for chunk in first:
+        pending_first = chunk if pending_first is None else np.concatenate([pending_first, chunk])
+        while pending_second is None or len(pending_second) < len(pending_first):
+            chunk = next(second, None)
+            if chunk is None:
+                break
+            pending_second = chunk if pending_second is None else np.concatenate([pending_second, chunk])
+        if pending_second is None:
+            return
+        length = min(len(pending_first), len(pending_second))
+        if length == 0:
+            return
+        a, b = pending_first[:length], pending_second[:length]
+        if a.shape[1] != b.shape[1]:
+            a, b = a.mean(axis=1, keepdims=True), b.mean(axis=1, keepdims=True)
+        yield a, b
+        pending_first, pending_second = pending_first[length:], pending_second[length:]
+
+
+def spectral_difference(cover_data: memoryview, stego_data: memoryview, width: int = DEFAULT_WIDTH) -> tuple:
+    """
+    Difference of the STFT magnitudes of two mp3 files (usually a cover and its stego file), computed chunk by chunk
+    on the streams aligned by frame (see iter_aligned).
+
+    :param cover_data: view of the whole cover file
+    :type cover_data: memoryview
+    :param stego_data: view of the whole stego file
+    :type stego_data: memoryview
+    :param width: width of the image in pixels
+    :type width: int
+
+    :return: the levels in dB of the power of the magnitude difference (see SpectrogramColumns.levels) and the
+     numeric summary: compared frames, mean and maximum deviation (with its time), and the energy of both files and
+     its change per frequency band
+    :rtype: tuple
+    """
+    decoders = PCMDecoder(cover_data), PCMDecoder(stego_data)
+    stfts = StreamingSTFT(), StreamingSTFT()
+    columns = SpectrogramColumns(width)
+    band_starts = np.arange(DIFF_BANDS) * (FFT_SIZE // 2) // DIFF_BANDS
+    energy = np.zeros((2, DIFF_BANDS))
+    deviation, max_deviation, max_window = 0.0, 0.0, 0
+    samples = 0
+    for cover, stego in iter_aligned(iter_pcm(cover_data, decoders[0]), iter_pcm(stego_data, decoders[1])):
+        cover_power, stego_power = stfts[0].feed(cover), stfts[1].feed(stego)
+        difference = (np.sqrt(cover_power) - np.sqrt(stego_power)) ** 2
+        columns.add(difference)
+        energy[0] += np.add.reduceat(cover_power.sum(axis=(0, 1)), band_starts)
+        energy[1] += np.add.reduceat(stego_power.sum(axis=(0, 1)), band_starts)
+        windows = difference.sum(axis=(1, 2))
+        deviation += float(windows.sum())
+        if len(windows) > 0 and windows.max() > max_deviation:
+            max_deviation = float(windows.max())
+            max_window = stfts[0].windows - len(windows) + int(windows.argmax())
+        samples += len(cover)
+
+    sampling_rate = decoders[0].sampling_rate or decoders[1].sampling_rate
+    windows = max(stfts[0].windows, 1)
+    band_hz = np.append(band_starts, FFT_SIZE // 2) * sampling_rate / FFT_SIZE
+
+    def level(power: float) -> float:
+        return round(10 * np.log10(max(power, 1e-30)), 3)
+
+    summary = {
+        "frames": samples // FRAME_SAMPLES,
+        "sampling_rate": sampling_rate,
+        "mean_deviation_db": level(deviation / windows),
+        "max_deviation": {
+            # center of the window
+            "time": round((max_window * stfts[0].hop + FFT_SIZE / 2) / sampling_rate, 3) if max_deviation > 0 else None,
+            "level_db": level(max_deviation)
+        },
+        "bands": [{
+            "low_hz": round(float(band_hz[band]), 1),
+            "high_hz": round(float(band_hz[band + 1]), 1),
+            "cover_db": level(energy[0, band] / windows),
+            "stego_db": level(energy[1, band] / windows),
+            "delta_db": round(level(energy[1, band] / windows) - level(energy[0, band] / windows), 3)
+        } for band in range(DIFF_BANDS)]
+    }
+    return columns.levels(), summary
+
+
+def diff_pair(task: tuple) -> dict:
+    """
+    Render the difference of one pair of files, runs in the worker processes of the pair mode.
+
+    :param task: paths of the cover, stego and PNG file, whether an existing PNG may be overwritten, width and dynamic
+     range of the image
+    :type task: tuple
+
+    :return: the summary of the difference (see spectral_difference) with the paths, or the error
+    :rtype: dict
+    """
+    cover_path, stego_path, png_path, force, width, dynamic_range = task
+    result = {"cover": str(cover_path), "stego": str(stego_path), "png": str(png_path)}
+    try:
+        if png_path.exists() and not force:
+            raise FileExistsError(f"output file '{png_path}' does already exist")
+        # the messages of the parser go to stderr, stdout only carries the JSON summary (also in the worker processes)
+        with contextlib.redirect_stdout(sys.stderr):
+            levels, summary = spectral_difference(map_file(cover_path), map_file(stego_path), width)
+        if summary["frames"] == 0:
+            raise ValueError("no MPEG-1 Layer III frames to compare")
+        write_png(png_path, render(levels, dynamic_range))
+        result.update(summary)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+    return result
+
+
+def read_pairs(path: Path) -> list:
+    """
+    :param path: text file with one pair per line: cover and stego path separated by a tab, empty lines and lines
+     starting with # are skipped
+    :type path: Path
+
+    :return: the pairs of paths
+    :rtype: list
+    """
+    pairs = []
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) != 2:
+                raise ValueError(f"{path}:{number}: expected cover and stego path separated by a tab")
+            pairs.append((Path(fields[0]).resolve(), Path(fields[1]).resolve()))
+    return pairs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="./mp3spectrogram",
+        description="renders the spectrogram of mp3 files as PNG (like sox <file> -n spectrogram), or the spectral difference of cover/stego pairs, without external tools"
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("-i", "--input", type=str, nargs="+", help="mp3 files to render")
+    mode.add_argument("--diff", type=str, nargs=2, metavar=("COVER", "STEGO"), help="render the difference of the STFT magnitudes of two mp3 files and print its summary as JSON")
+    mode.add_argument("--pairs", type=str, help="render the difference of every pair of a list (one cover and stego path per line, separated by a tab) in parallel")
+    parser.add_argument("-o", "--output", type=str, default=None, help="PNG file for a single input or pair, or directory for the PNG files of all inputs (<name>.png) or pairs (<line>-<cover>-<stego>.png) (default: next to the inputs)")
+    parser.add_argument("-f", "--force", action='store_true', help="allow overwriting of existing output files")
+    parser.add_argument("-x", "--width", type=int, default=DEFAULT_WIDTH, help="width of the image in pixels")
+    parser.add_argument("-z", "--dynamic-range", type=float, default=DEFAULT_DYNAMIC_RANGE, help="range of levels shown in dB below full scale")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes of the pair mode")
+    parser.add_argument("--summary", type=str, default=None, help="JSON file for the summaries of the pair mode (default: stdout)")
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve() if args.output is not None else None
+    failed = 0
+    if args.input is not None:
+        inputs = [Path(path).resolve() for path in args.input]
+        if output is not None and len(inputs) > 1:
+            output.mkdir(parents=True, exist_ok=True)
+        for number, input_path in enumerate(inputs, 1):
+            if output is None:
+                png_path = input_path.with_suffix(".png")
+            elif output.is_dir():
+                png_path = output / (input_path.stem + ".png")
+            else:
+                png_path = output
+            try:
+                if png_path.exists() and not args.force:
+                    raise FileExistsError(f"output file '{png_path}' does already exist")
+                levels, samples = spectrogram(map_file(input_path), args.width)
+                if samples == 0:
+                    raise ValueError("no MPEG-1 Layer III frames found")
+                write_png(png_path, render(levels, args.dynamic_range))
+                print(f"[{number}/{len(inputs)}] {input_path} -> {png_path}")
+            except (OSError, ValueError) as e:
+                failed += 1
+                print(f"[{number}/{len(inputs)}] ERROR: {input_path}: {e}", file=sys.stderr)
+    elif args.diff is not None:
+        cover_path, stego_path = (Path(path).resolve() for path in args.diff)
+        png_path = output if output is not None else stego_path.with_name(f"{stego_path.stem}-diff.png")
+        summary = diff_pair((cover_path, stego_path, png_path, args.force, args.width, args.dynamic_range))
+        failed = int("error" in summary)
+        print(json.dumps(summary, indent=2))
+    else:
+        try:
+            pairs = read_pairs(Path(args.pairs))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        if output is None:
+            output = Path(args.pairs).resolve().parent
+        output.mkdir(parents=True, exist_ok=True)
+        tasks = [(cover_path, stego_path, output / f"{number}-{cover_path.stem}-{stego_path.stem}.png", args.force, args.width, args.dynamic_range)
+                 for number, (cover_path, stego_path) in enumerate(pairs, 1)]
+        summaries = []
+        # the pairs are independent, the workers decode and transform them in parallel; the results keep the order
+        with multiprocessing.Pool(max(1, min(args.jobs, len(tasks)))) as pool:
+            for number, summary in enumerate(pool.imap(diff_pair, tasks), 1):
+                summaries.append(summary)
+                if "error" in summary:
+                    failed += 1
+                    print(f"[{number}/{len(tasks)}] ERROR: {summary['stego']}: {summary['error']}", file=sys.stderr)
+                else:
+                    print(f"[{number}/{len(tasks)}] {summary['stego']} -> {summary['png']}", file=sys.stderr)
+        if args.summary is not None:
+            with open(args.summary, "w") as f:
+                json.dump(summaries, f, indent=2)
+        else:
+            print(json.dumps(summaries, indent=2))
+    sys.exit(1 if failed > 0 else 0)
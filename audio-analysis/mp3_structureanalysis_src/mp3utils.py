@@ -19,8 +19,11 @@
 #
 #######################################################################
 
+import codecs
 from functools import reduce
 from statistics import mean, stdev
+
+import numpy as np
 @staticmethod
 def key_max(key):
     return max(zip(key.values(), key.keys()))[1]
@@ -45,6 +48,16 @@ def formatId3v2(id, data):
     except TypeError:
         return None
 @staticmethod
+def bitsToBytes(bitstring): #convert space separated 8-bit-strings (see byteToBits) back to bytes
+    bits = bitstring.replace(" ", "")
+    return int(bits, 2).to_bytes(len(bits) // 8, "big") if bits else b""
+@staticmethod
+def bytesLiteral(literal): #convert the repr of a bytes object (b'...' or b"...") back to bytes
+    return codecs.escape_decode(literal[2:-1])[0]
+@staticmethod
+def rawDecoder(raw): #function to convert exported raw data (repr of bytes or hex) back to bytes
+    return bytesLiteral if str(raw)[0:2] == "b'" or str(raw)[0:2] == "b\"" else bytes.fromhex
+@staticmethod
 def default_statistics(lst: list):
     return {
             "avg": mean(lst),
@@ -64,6 +77,25 @@ def default_categorical(lst: list, categories: list = None):
         dictionary[i] += 1
     return dictionary
 @staticmethod
+def array_statistics(arr: np.ndarray):
+    # like default_statistics, but on a numpy column (a single value has no deviation)
+    total = arr.sum(dtype=np.int64).item() if arr.dtype.kind in "biu" else float(arr.sum())
+    return {
+            "avg": (total // len(arr) if isinstance(total, int) and total % len(arr) == 0 else total / len(arr)) if len(arr) > 0 else 0.0,
+            "stdev": float(np.std(arr, ddof=1)) if len(arr) > 1 else 0.0,
+            "min": arr.min().item() if len(arr) > 0 else 0,
+            "max": arr.max().item() if len(arr) > 0 else 0
+        }
+@staticmethod
+def array_categorical(arr: np.ndarray, categories: list, labels: list = None):
+    # like default_categorical, but on a numpy column; labels replace the categories as keys (e.g. enum codes to names)
+    dictionary = {}
+    for i, category in enumerate(categories):
+        dictionary[category if labels is None else labels[i]] = int(np.count_nonzero(arr == category))
+    for value, count in zip(*np.unique(arr[~np.isin(arr, categories)], return_counts=True)):
+        dictionary[value.item()] = int(count)
+    return dictionary
+@staticmethod
 def matchId3v1genre(genreByte):
     genre_number = ord(genreByte)
     genre_mapping = {
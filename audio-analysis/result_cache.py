@@ -0,0 +1,80 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+DEFAULT_CACHE_FILE = Path.home() / ".cache" / "audio-analysis" / "results.sqlite"
+# results stored before the open transaction is committed
+COMMIT_INTERVAL = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    path TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    options TEXT NOT NULL,
+    result TEXT NOT NULL
+)
+"""
+
+
+def file_identity(filepath):
+    """The identity (path, inode, size, mtime_ns) of a file, a changed file gets a new identity."""
+    stat = os.stat(filepath)
+    return str(Path(filepath).resolve()), stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ResultCache:
+    """
+    SQLite file of analysis results, one row per file path. A stored result is only served while the inode, size and
+    modification time of the file are unchanged and it was computed with the same options (columns of the result).
+    Results holding an error are never stored, the next run tries again.
+
+    The connection is used by the thread that created the cache only, results computed by worker threads are looked up
+    and stored by the caller.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, options=None, refresh=False):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(SCHEMA)
+        self.options = json.dumps(options, sort_keys=True)
+        # every lookup misses, the new results replace the stored ones
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.pending = 0
+
+    def get(self, filepath, identity):
+        """The stored result of the file (with the given path as File), None if there is none for its identity."""
+        row = None
+        if not self.refresh:
+            row = self.connection.execute(
+                "SELECT result FROM results WHERE path = ? AND inode = ? AND size = ? AND mtime_ns = ? AND options = ?",
+                (*identity, self.options)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"File": filepath, **json.loads(row[0])}
+
+    def put(self, identity, result):
+        """Store the result of the file, identity is taken before the analysis (a file changed meanwhile misses)."""
+        if "Error" in result:
+            return
+        stored = {key: value for key, value in result.items() if key != "File"}
+        self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                                (*identity, self.options, json.dumps(stored)))
+        self.pending += 1
+        if self.pending >= COMMIT_INTERVAL:
+            self.connection.commit()
+            self.pending = 0
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def summary(self):
+        return f"cache: {self.hits} hits, {self.misses} misses"
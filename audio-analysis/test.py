@@ -1,50 +1,46 @@
-import json
+import sys
+from pathlib import Path
 
+import numpy as np
 
-with open("IT-Security-Project---Audio-Steganography/audio-analysis/mp3_structureanalysis_src/output/belvin-phone-stegoaa.json") as fp:
-    analysis = json.load(fp)
+# the columnar export is loaded with the analyser's own modules
+sys.path.insert(0, str(Path(__file__).resolve().parent / "mp3_structureanalysis_src"))
+from decoder.FrameHeader import ChannelMode
+from decoder.FrameTable import HEADER_SIZE
+from mp3export import ColumnarAnalysis
 
-structure = analysis.get("structure", {})
-mpeg_frame_data = structure.get("mpeg_frame_data", [])
+# directory written by: mp3filestructureanalyser.py -i <file> -o <directory> --columnar
+analysis = ColumnarAnalysis(sys.argv[1] if len(sys.argv) > 1 else "IT-Security-Project---Audio-Steganography/audio-analysis/mp3_structureanalysis_src/output/belvin-phone-stegoaa")
+
+records = analysis.table.records
+side_info = analysis.table.side_info
+frames = records["is_frame"]
 
 input("$ header-position")
-c1 = 0
-for i, frame in enumerate(mpeg_frame_data):
-    if i == len(mpeg_frame_data) - 1:
-        break
-    position = frame["position"]
-    length = frame["length"]
-    next_position = mpeg_frame_data[i + 1]["position"]
-    if (position + length != next_position):
-        print(i, position, length, next_position, end=" | ")
-        c1 += 1
+found = np.flatnonzero(records["position"][:-1] + records["length"][:-1] != records["position"][1:])
+for i in found:
+    print(i, records["position"][i], records["length"][i], records["position"][i + 1], end=" | ")
 print("End.")
-print(f"{c1} found.")
+print(f"{len(found)} found.")
 print()
 
 input("$ header-position-value")
-c2 = 0
-for i, frame in enumerate(mpeg_frame_data):
-    if frame["length"] - frame["side_info"]["length"] - frame["main_data"]["length"] != 4:
-        print(i, frame["length"], frame["side_info"]["length"], frame["main_data"]["length"], end=" | ")
-        c2 += 1
+side_info_length = side_info["side_info_length"].astype(np.int64)
+main_data_length = analysis.main_data["length"].astype(np.int64)
+found = np.flatnonzero(frames & (records["length"] - side_info_length - main_data_length != HEADER_SIZE))
+for i in found:
+    print(i, records["length"][i], side_info_length[i], main_data_length[i], end=" | ")
 print("End.")
-print(f"{c2} found.")
+print(f"{len(found)} found.")
 print()
 
 input("$ 1000 < part2_3 < 1400")
-c3_1 = 0
-c3_2 = 0
-for i, frame in enumerate(mpeg_frame_data):
-    frame_found = False
-    for j, granule in enumerate(frame["side_info"]["granule_info"]):
-        for length in granule["part2_3_length"]:
-            if 1000 < length < 1400:
-                print(f"({i}, {j})", length, end=" | ")
-                c3_1 += 1
-                frame_found = True
-    if frame_found:
-        c3_2 += 1
+part2_3_length = side_info["part2_3_length"]
+# only the channels of the frame count, mono frames have no second channel
+channels = np.where(analysis.table.headers["channel_mode"] == ChannelMode.Mono.value, 1, 2)
+in_range = (1000 < part2_3_length) & (part2_3_length < 1400) & (np.arange(2) < channels[:, None, None]) & frames[:, None, None]
+for i, j, c in zip(*np.nonzero(in_range)):
+    print(f"({i}, {j})", part2_3_length[i, j, c], end=" | ")
 
 print("End.")
-print(f"{c3_1} found, in {c3_2} frames.")
+print(f"{np.count_nonzero(in_range)} found, in {np.count_nonzero(in_range.any(axis=(1, 2)))} frames.")
@@ -0,0 +1,114 @@
+import fnmatch
+import glob
+import os
+import sys
+
+# bytes read from the start of every file for the magic-byte filter
+MAGIC_LENGTH = 16
+
+
+### ────────────────────── Arguments ────────────────────── ###
+def add_discovery_arguments(parser):
+    parser.add_argument("-r", "--recursive", action="store_true", help="Walk directories (and ** in patterns) recursively")
+    parser.add_argument("--ext", help="Comma separated file extensions to keep, e.g. .mp3,.wav (default: all files)")
+    parser.add_argument("--magic", action="store_true", help="Keep only files whose first bytes match a known file signature")
+    parser.add_argument("--exclude", action="append", default=[], help="Skip files and directories matching this pattern (repeatable)")
+    parser.add_argument("--from-file", help="Read paths to analyze from this file, one per line ('-' for stdin)")
+
+
+def discover_from_args(parser, args, signatures=()):
+    if not args.files and not args.from_file:
+        parser.error("no files given (paths, patterns or --from-file)")
+    if args.from_file and args.from_file != "-" and not os.path.isfile(args.from_file):
+        parser.error(f"file list not found: {args.from_file}")
+    extensions = None
+    if args.ext:
+        extensions = {ext.strip().lower() if ext.strip().startswith(".") else "." + ext.strip().lower()
+                      for ext in args.ext.split(",") if ext.strip()}
+    return discover(args.files, recursive=args.recursive, extensions=extensions,
+                    signatures=signatures if args.magic else None, excludes=args.exclude, file_list=args.from_file)
+
+
+### ────────────────────── Discovery ────────────────────── ###
+def discover(patterns, recursive=False, extensions=None, signatures=None, excludes=(), file_list=None):
+    # lazy: paths are yielded while the directories are walked, nothing is collected up front
+    for path in iter_candidates(patterns, recursive, excludes, file_list):
+        if extensions is not None and os.path.splitext(path)[1].lower() not in extensions:
+            continue
+        if signatures is not None and not matches_signature(path, signatures):
+            continue
+        yield path
+
+
+def iter_candidates(patterns, recursive, excludes, file_list):
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            yield from walk(pattern, recursive, excludes)
+        elif glob.has_magic(pattern):
+            # a recursive ** already matches every file below its directories, walking them would repeat the files
+            matches_subtree = recursive and "**" in pattern
+            for path in glob.iglob(pattern, recursive=recursive):
+                if os.path.isdir(path):
+                    if not matches_subtree:
+                        yield from walk(path, recursive, excludes)
+                elif not is_excluded(path, excludes):
+                    yield path
+        elif os.path.exists(pattern) and not is_excluded(pattern, excludes):
+            yield pattern
+    if file_list is not None:
+        for path in read_file_list(file_list):
+            if not is_excluded(path, excludes):
+                yield path
+
+
+def walk(directory, recursive, excludes):
+    # depth first with os.scandir, entries in name order; symlinked directories are not followed
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"[!] Skipping {current}: {e}", file=sys.stderr)
+            continue
+        subdirectories = []
+        for entry in entries:
+            if is_excluded(entry.path, excludes):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+        if recursive:
+            stack.extend(reversed(subdirectories))
+
+
+def read_file_list(file_list):
+    f = sys.stdin if file_list == "-" else open(file_list, "r", encoding="utf-8")
+    try:
+        for line in f:
+            path = line.rstrip("\r\n")
+            if path:
+                yield path
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def is_excluded(path, excludes):
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in excludes)
+
+
+def matches_signature(path, signatures):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(MAGIC_LENGTH)
+    except OSError:
+        # the analysis reports the error
+        return True
+    return any(head[offset:offset + len(magic)] == magic for offset, magic in signatures)
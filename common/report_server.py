@@ -0,0 +1,258 @@
+import gzip
+import html
+import http.server
+import json
+import re
+import threading
+import urllib.parse
+import webbrowser
+
+# rows returned by /api/results at most (and by default)
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 200
+# responses smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+# a leading number, cells like "320574 bytes (313.1 KB)" sort by it
+NUMBER_PREFIX = re.compile(r"\s*-?\d+(\.\d+)?")
+
+
+### ────────────────────── Result Store ────────────────────── ###
+class ResultStore:
+    """
+    The results behind the report. Every query filters, sorts and slices the rows on the server, the page only holds
+    the rows it shows. The order of the last queries is kept, scrolling through one view sorts once.
+    """
+
+    def __init__(self, results):
+        self.columns = get_all_keys(results)
+        self.raw = [[r.get(k, "") for k in self.columns] for r in results]
+        self.rows = [[str(value) for value in row] for row in self.raw]
+        self.text = ["\t".join(row).lower() for row in self.rows]
+        self.views = {}
+        self.lock = threading.Lock()
+
+    def query(self, offset=0, limit=DEFAULT_PAGE_SIZE, sort="", order="asc", q=""):
+        offset, limit = max(0, int(offset)), min(max(0, int(limit)), MAX_PAGE_SIZE)
+        if sort and sort not in self.columns:
+            raise ValueError(f"unknown column: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"unknown order: {order}")
+        view = self.view(sort, order, q.strip().lower())
+        return {
+            "columns": self.columns,
+            "total": len(self.rows),
+            "matched": len(view),
+            "offset": offset,
+            "rows": [self.rows[i] for i in view[offset:offset + limit]],
+        }
+
+    def view(self, sort, order, q):
+        key = (sort, order, q)
+        with self.lock:
+            if key not in self.views:
+                indices = [i for i, text in enumerate(self.text) if q in text] if q else list(range(len(self.rows)))
+                if sort:
+                    column = self.columns.index(sort)
+                    # numbers (and cells starting with one) come before text and empty cells last, in both orders
+                    keys = {i: sort_key(self.raw[i][column]) for i in indices if self.raw[i][column] not in ("", None)}
+                    numbers = sorted((i for i in keys if keys[i][0] == 0), key=keys.get, reverse=order == "desc")
+                    text = sorted((i for i in keys if keys[i][0] == 1), key=keys.get, reverse=order == "desc")
+                    indices = numbers + text + [i for i in indices if i not in keys]
+                # only the views of the last few queries are kept
+                if len(self.views) >= 8:
+                    self.views.pop(next(iter(self.views)))
+                self.views[key] = indices
+            return self.views[key]
+
+
+def get_all_keys(results):
+    seen, keys = set(), []
+    for r in results:
+        for k in r:
+            if k not in seen:
+                seen.add(k)
+                keys.append(k)
+    return keys
+
+
+def sort_key(value):
+    # group 0 for numbers (and cells starting with one), group 1 for text
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 0, float(value), ""
+    text = str(value)
+    if text in ("-inf", "inf"):
+        # silence in the level columns
+        return 0, float(text), text
+    number = NUMBER_PREFIX.match(text)
+    if number:
+        return 0, float(number.group()), text.lower()
+    return 1, 0.0, text.lower()
+
+
+### ────────────────────── HTTP Server ────────────────────── ###
+def make_handler(store, title):
+    page = SHELL_PAGE.replace("{title}", html.escape(title)).encode("utf-8")
+
+    class ReportHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path == "/":
+                self.send(page, "text/html; charset=utf-8")
+            elif url.path == "/api/results":
+                params = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()
+                          if k in ("offset", "limit", "sort", "order", "q")}
+                try:
+                    body = store.query(**params)
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                self.send(json.dumps(body).encode("utf-8"), "application/json")
+            else:
+                self.send_error(404)
+
+        def send(self, content, content_type):
+            compress = len(content) >= GZIP_MIN_SIZE and "gzip" in self.headers.get("Accept-Encoding", "")
+            if compress:
+                content = gzip.compress(content, compresslevel=5)
+            self.send_response(200)
+            self.send_header("Content-type", content_type)
+            self.send_header("Content-length", str(len(content)))
+            if compress:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass  # Suppress logging
+
+    return ReportHandler
+
+
+def serve_report(results, title, port=8000):
+    try:
+        with http.server.ThreadingHTTPServer(("", port), make_handler(ResultStore(results), title)) as httpd:
+            httpd.daemon_threads = True
+            url = f"http://localhost:{port}"
+            print(f"[✓] Serving report at {url} (Press Ctrl+C to stop)")
+            threading.Timer(1, lambda: webbrowser.open(url)).start()
+            try:
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                print("\n[✓] Server stopped cleanly.")
+    except OSError:
+        print(f"[!] Port {port} is in use. Try a different one.")
+
+
+### ────────────────────── Report Page ────────────────────── ###
+# the page renders only the rows in view (plus OVERSCAN), the rows are fetched page by page from /api/results
+SHELL_PAGE = """<!DOCTYPE html><html><head><meta charset='utf-8'>
+<title>{title}</title>
+<style>
+body { font-family: sans-serif; padding: 1em; margin: 0; }
+.bar { display: flex; gap: 1em; align-items: center; margin-bottom: 0.5em; }
+#scroller { overflow: auto; height: calc(100vh - 8em); border: 1px solid #ccc; }
+table { border-collapse: collapse; width: max-content; min-width: 100%; }
+th, td { border: 1px solid #ccc; padding: 0 6px; font-family: monospace; white-space: nowrap; }
+td { height: 28px; box-sizing: border-box; }
+th { position: sticky; top: 0; background: #f4f4f4; padding: 6px; cursor: pointer; user-select: none; }
+td:hover { background: #eef; cursor: pointer; }
+</style></head><body>
+<h2>{title}</h2>
+<div class='bar'><input id='filter' type='search' placeholder='Filter' size='40'><span id='status'></span></div>
+<div id='scroller'><table><thead><tr id='head'></tr></thead><tbody id='body'></tbody></table></div>
+<script>
+const ROW_HEIGHT = 28, PAGE_SIZE = 200, OVERSCAN = 20;
+const scroller = document.getElementById("scroller"), head = document.getElementById("head");
+const body = document.getElementById("body"), statusLine = document.getElementById("status");
+let columns = [], total = 0, matched = 0, sort = "", order = "asc", query = "";
+let pages = new Map(), generation = 0, scheduled = false;
+
+function escape(text) {
+  return text.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+}
+
+function loadPage(n) {
+  if (!pages.has(n)) {
+    const params = new URLSearchParams({offset: n * PAGE_SIZE, limit: PAGE_SIZE, sort, order, q: query});
+    const gen = generation;
+    pages.set(n, fetch("/api/results?" + params).then(r => r.json()).then(data => {
+      if (gen === generation) {
+        total = data.total;
+        matched = data.matched;
+        if (columns.join("\\t") !== data.columns.join("\\t")) {
+          columns = data.columns;
+          renderHead();
+        }
+      }
+      return data.rows;
+    }));
+  }
+  return pages.get(n);
+}
+
+function renderHead() {
+  head.innerHTML = columns.map(c => "<th data-column='" + escape(c).replace(/'/g, "&#39;") + "'>" + escape(c) +
+    (c === sort ? (order === "asc" ? " &#9650;" : " &#9660;") : "") + "</th>").join("");
+}
+
+async function render() {
+  scheduled = false;
+  const gen = generation;
+  await loadPage(0);
+  const first = Math.max(0, Math.floor(scroller.scrollTop / ROW_HEIGHT) - OVERSCAN);
+  const last = Math.min(matched, first + Math.ceil(scroller.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN);
+  const chunks = [];
+  for (let n = Math.floor(first / PAGE_SIZE); n * PAGE_SIZE < last; n++) chunks.push(loadPage(n));
+  const rows = (await Promise.all(chunks)).flat();
+  if (gen !== generation) return;
+  const offset = Math.floor(first / PAGE_SIZE) * PAGE_SIZE;
+  const html = ["<tr style='height:" + first * ROW_HEIGHT + "px'></tr>"];
+  for (let i = first; i < last; i++) {
+    html.push("<tr>" + rows[i - offset].map(v => "<td>" + escape(v) + "</td>").join("") + "</tr>");
+  }
+  html.push("<tr style='height:" + (matched - last) * ROW_HEIGHT + "px'></tr>");
+  body.innerHTML = html.join("");
+  statusLine.textContent = matched === total ? total + " files" : matched + " of " + total + " files";
+}
+
+function schedule() {
+  if (!scheduled) {
+    scheduled = true;
+    requestAnimationFrame(render);
+  }
+}
+
+function reset() {
+  generation++;
+  pages = new Map();
+  scroller.scrollTop = 0;
+  renderHead();
+  schedule();
+}
+
+scroller.addEventListener("scroll", schedule);
+window.addEventListener("resize", schedule);
+head.addEventListener("click", e => {
+  const th = e.target.closest("th");
+  if (!th) return;
+  const column = th.dataset.column;
+  order = column === sort && order === "asc" ? "desc" : "asc";
+  sort = column;
+  reset();
+});
+let timer = null;
+document.getElementById("filter").addEventListener("input", e => {
+  clearTimeout(timer);
+  timer = setTimeout(() => { query = e.target.value; reset(); }, 250);
+});
+body.addEventListener("click", e => {
+  const td = e.target.closest("td");
+  if (!td) return;
+  navigator.clipboard.writeText(td.innerText);
+  td.style.backgroundColor = "#cfc";
+  setTimeout(() => td.style.backgroundColor = "", 300);
+});
+schedule();
+</script></body></html>
+"""
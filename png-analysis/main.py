@@ -1,27 +1,31 @@
 import argparse
 import csv
-import glob
 import hashlib
-import http.server
 import json
 import os
-import socketserver
 import sys
-import threading
-import webbrowser
 import zlib
 from io import BytesIO
+from pathlib import Path
 
 import cv2
 from kaitaistruct import KaitaiStream
 
+# the file discovery and the report server are shared with the audio analyzer
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from discovery import add_discovery_arguments, discover_from_args
+from report_server import serve_report
 from png import Png
 
+# file signature accepted by --magic: (offset, bytes)
+PNG_SIGNATURES = [(0, b"\x89PNG\r\n\x1a\n")]
+
 
 ### ────────────────────── Argument Parsing ────────────────────── ###
 def parse_args():
     parser = argparse.ArgumentParser(description="Sherloq-compatible PNG forensic analyzer.")
-    parser.add_argument("files", nargs="+", help="Paths to one or more PNG files (supports wildcards)")
+    parser.add_argument("files", nargs="*", help="Paths to PNG files or directories (supports wildcards)")
+    add_discovery_arguments(parser)
 
     output_group = parser.add_mutually_exclusive_group()
     output_group.add_argument("--json", action="store_true", help="Output as JSON")
@@ -30,10 +34,7 @@ def parse_args():
     output_group.add_argument("--serve", action="store_true", help="Serve HTML report via localhost (default)")
 
     args = parser.parse_args()
-    expanded_files = []
-    for pattern in args.files:
-        expanded_files.extend(glob.glob(pattern))
-    args.files = expanded_files
+    args.files = discover_from_args(parser, args, PNG_SIGNATURES)
     return args
 
 
@@ -167,63 +168,7 @@ def output_pretty(results):
 
 
 def serve_html(results, port=8000):
-    headers = get_all_keys(results)
-
-    def escape(val):
-        return str(val).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-    html = [
-        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
-        "<style>",
-        "body { font-family: sans-serif; padding: 1em; margin: 0; }",
-        ".scroll-wrap { overflow-x: auto; padding-bottom: 0.5em; }",
-        "table { border-collapse: collapse; width: max-content; min-width: 100%; }",
-        "th, td { border: 1px solid #ccc; padding: 6px; font-family: monospace; white-space: nowrap; }",
-        "td:hover { background: #eef; cursor: pointer; }",
-        "</style>",
-        "<script>",
-        "function copyText(e) {",
-        "  const text = e.target.innerText;",
-        "  navigator.clipboard.writeText(text);",
-        "  e.target.style.backgroundColor = '#cfc';",
-        "  setTimeout(() => e.target.style.backgroundColor = '', 300);",
-        "}",
-        "</script></head><body>",
-        "<h2>PNG Analysis Report</h2>",
-        "<div class='scroll-wrap'><table><thead><tr>",
-    ]
-
-    html.extend(f"<th>{escape(k)}</th>" for k in headers)
-    html.append("</tr></thead><tbody>")
-    for row in results:
-        html.append("<tr>")
-        html.extend(f"<td onclick='copyText(event)'>{escape(row.get(k, ''))}</td>" for k in headers)
-        html.append("</tr>")
-    html.extend(["</tbody></table></div></body></html>"])
-    content = "\n".join(html).encode("utf-8")
-
-    class ReportHandler(http.server.SimpleHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.send_header("Content-type", "text/html; charset=utf-8")
-            self.send_header("Content-length", str(len(content)))
-            self.end_headers()
-            self.wfile.write(content)
-
-        def log_message(self, *args):
-            pass  # Suppress logging
-
-    try:
-        with socketserver.TCPServer(("", port), ReportHandler) as httpd:
-            url = f"http://localhost:{port}"
-            print(f"[✓] Serving report at {url} (Press Ctrl+C to stop)")
-            threading.Timer(1, lambda: webbrowser.open(url)).start()
-            try:
-                httpd.serve_forever()
-            except KeyboardInterrupt:
-                print("\n[✓] Server stopped cleanly.")
-    except OSError:
-        print(f"[!] Port {port} is in use. Try a different one.")
+    serve_report(results, "PNG Analysis Report", port)
 
 
 ### ─────────────────────────── Main ─────────────────────────── ###